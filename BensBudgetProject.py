@@ -28,10 +28,33 @@ Thank you for your consideration.
 
 from __future__ import print_function   # For users running Python 2.X
 import os
+import sys
+import csv
+import codecs
+import argparse
+import io
+import json
 import sqlite3
-import glob
 from datetime import date as dt
+from datetime import datetime
+from datetime import timedelta
 import re
+import math
+import heapq
+import random
+import calendar
+from timeit import default_timer as timer
+from contextlib import contextmanager
+from collections import OrderedDict
+try:
+    from collections.abc import Sequence    # Python 3.X
+except ImportError:
+    from collections import Sequence        # Python 2.X
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+try:
+    from sys import intern      # Python 3.X
+except ImportError:
+    pass                        # Python 2.X has intern() as a builtin
 
 # Bash uses ~ to mean the home directory, but Python doesn't know that.
 # That's why we use os.path.expanduser() in the following command.
@@ -47,9 +70,16 @@ WHICH_BUDGET_MENU_OPTIONS = ["make a new budget.",
 MAIN_MENU_OPTIONS = ["go to the category menu.",
                      "go to the transactions menu.",
                      "go to the accounts menu.",
+                     "go to the reports menu.",
                      "choose a different budget or quit the program.",
                      ]
 
+REPORT_MENU_OPTIONS = ["see each category's total, month by month.",
+                       "see each account's activity, month by month.",
+                       "see your income and spending, month by month.",
+                       "return to the main menu.",
+                       ]
+
 CATEGORY_MENU_OPTIONS = ["see your list of budget categories.",
                          "add a new category.",
                          "select an existing category.",
@@ -59,6 +89,9 @@ CATEGORY_MENU_OPTIONS = ["see your list of budget categories.",
 CATEGORY_INSTANCE_OPTIONS = ["edit the category's name.",
                              "edit the category's value.",
                              "view all transactions for this category.",
+                             "move all of its transactions to another"
+                             " category.",
+                             "merge it into another category.",
                              "delete the category.",
                              "return to the category menu.",
                              ]
@@ -71,16 +104,48 @@ ACCOUNT_MENU_OPTIONS = ["see your list of accounts.",
 
 ACCOUNT_INSTANCE_OPTIONS = ["edit the account's name.",
                             "view all transactions for this account.",
+                            "move all of its transactions to another"
+                            " account.",
+                            "merge it into another account.",
                             "delete the account.",
                             "return to the account menu.",
                             ]
 
 TRANSACTION_MENU_OPTIONS = ["view your transactions.",
                             "add a new transaction.",
+                            "transfer money from one account to another.",
                             "select an existing transaction.",
+                            "search your transactions by payee or memo.",
+                            "filter and sort your transactions.",
+                            "import transactions from a CSV or OFX file.",
+                            "export transactions to a CSV or JSON Lines file.",
+                            "manage your recurring transactions.",
                             "return to the main menu.",
                             ]
 
+RECURRING_MENU_OPTIONS = ["view your recurring transactions.",
+                          "add a recurring transaction.",
+                          "delete a recurring transaction.",
+                          "return to the transaction menu.",
+                          ]
+
+TRANSACTION_FILTER_OPTIONS = ["view the matching transactions.",
+                              "select one of the matching transactions.",
+                              "filter by account.",
+                              "filter by category.",
+                              "filter by date.",
+                              "filter by amount.",
+                              "filter by payee.",
+                              "change the order of the transactions.",
+                              "clear the filters.",
+                              "move every matching transaction to another"
+                              " category.",
+                              "move every matching transaction to another"
+                              " account.",
+                              "delete every matching transaction.",
+                              "return to the transaction menu.",
+                              ]
+
 TRANSACTION_INSTANCE_OPTIONS = ["edit the transaction's account.",
                                 "edit the transaction's category.",
                                 "edit the transaction's amount.",
@@ -91,102 +156,1240 @@ TRANSACTION_INSTANCE_OPTIONS = ["edit the transaction's account.",
                                 "return to the transaction menu.",
                                 ]
 
-# TODO: Add budget properties class that has conn variable, and has methods to change budget name,
-# TODO set gap and left_margin, and allow categories and/or accounts to go negative.
+# The number of records shown at a time when browsing a table.
+PAGE_SIZE = 20
+
+# The most months that a report can show at once.
+REPORT_MAX_MONTHS = 12
+
+# The number of rows which bulk operations (such as importing and exporting
+# transactions) insert or fetch at a time.
+BATCH_SIZE = 1000
+
+# Transactions refer to their account and category by id. New transactions
+# are given by name, so this statement looks the ids up as it inserts them.
+INSERT_TRANSACTION_SQL = "INSERT INTO Transactions(account_id, category_id," \
+    " amount, payee, date, memo) VALUES(" \
+    "(SELECT id FROM Accounts WHERE name=?)," \
+    "(SELECT id FROM Categories WHERE name=?),?,?,?,?)"
+
+# The most chunks of BATCH_SIZE objects which a RecordSequence keeps in
+# memory at once.
+SEQUENCE_CHUNKS_KEPT = 8
+
+# Set this environment variable to 1 to time every SQL statement and menu
+# action (the command line's --trace option does the same). A summary is
+# written to TRACE_FILE_NAME, in CONFIG_DIRECTORY, when the program exits.
+TRACE_ENVIRONMENT_VARIABLE = "BENS_BUDGET_TRACE"
+TRACE_FILE_NAME = "trace_summary.json"
+
+# The number of slowest single statements listed in a trace summary.
+TRACE_SLOWEST = 10
+
+# The most executions of each statement whose times are kept, as a random
+# sample, to work out its percentiles in a trace summary.
+TRACE_SAMPLE_SIZE = 1000
+
+# The catalog of budgets is kept in this file, in CONFIG_DIRECTORY.
+CATALOG_FILE_NAME = "catalog.db"
+
+# The ways in which the catalog of budgets can be sorted, as pairs of
+# (description, ORDER BY clause).
+CATALOG_SORT_ORDERS = [
+    ("most recently opened", "opened DESC"),
+    ("name", "name COLLATE NOCASE"),
+    ("largest", "size DESC"),
+    ("most transactions", "transactions DESC"),
+    ]
+
+# The orders in which a TransactionFilter can list transactions, as triples
+# of (description, column, descending). Transactions which tie are listed in
+# the order they were added.
+TRANSACTION_SORT_ORDERS = [
+    ("the order they were added", "uid", False),
+    ("date, oldest first", "date", False),
+    ("date, newest first", "date", True),
+    ("amount, largest expense first", "amount", False),
+    ("amount, largest deposit first", "amount", True),
+    ("payee", "payee", False),
+    ]
+
+# The units of time which a recurring transaction can repeat in.
+RECURRING_UNITS = ("day", "week", "month")
+
+# The schedules offered when adding a recurring transaction from the menus,
+# as triples of (description, unit, every). The command line accepts any
+# number of days, weeks or months.
+RECURRING_SCHEDULES = [
+    ("every week", "week", 1),
+    ("every two weeks", "week", 2),
+    ("every month, on the same day", "month", 1),
+    ("every three months, on the same day", "month", 3),
+    ("every year, on the same day", "month", 12),
+    ]
+
+# The oldest version of the SQLite library (not the sqlite3 module) which
+# budgets can be opened with. The monthly rollups are kept up to date with
+# upserts (INSERT ... ON CONFLICT DO UPDATE), which need 3.24.0, and pages
+# of records are found by comparing row values, which need 3.15.0.
+MINIMUM_SQLITE_VERSION = (3, 24, 0)
+
+# The number of prepared statements each budget's connection keeps, so that
+# SQL which is run again (with different parameters) isn't parsed again.
+# Paging through each table in either direction, with or without a filter,
+# produces its own statement, so this is well above sqlite3's default.
+STATEMENT_CACHE_SIZE = 256
+
+# Connection settings (PRAGMAs) applied to every budget when it is opened.
+# Choose a profile by setting the BENS_BUDGET_PROFILE environment variable;
+# if it isn't set, "default" is used.
+#   default: Write-ahead logging (WAL), so reading a budget never blocks
+#            writing to it, with synchronous=NORMAL so a commit doesn't wait
+#            for the disk. A power loss may undo the last few commits, but
+#            can't corrupt the budget.
+#   durable: Also WAL, but every commit waits until it's safely on disk,
+#            and the budget isn't memory-mapped.
+PROFILE_ENVIRONMENT_VARIABLE = "BENS_BUDGET_PROFILE"
+CONNECTION_PROFILES = {
+    "default": (
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("mmap_size", 268435456),       # 256 MiB
+        ("cache_size", -65536),         # Negative means KiB, so 64 MiB.
+        ("temp_store", "MEMORY"),
+        ),
+    "durable": (
+        ("journal_mode", "WAL"),
+        ("synchronous", "FULL"),
+        ("mmap_size", 0),
+        ("cache_size", -16384),         # 16 MiB
+        ("temp_store", "DEFAULT"),
+        ),
+    }
 
 # ____________________________________________________________________________#
 
 
-class BaseClass:
+class Money(int):
+    """An amount of money, held as a whole number of cents. Keeping money in
+    integers (both in memory and in the database) means that arithmetic and
+    SQL SUM() are exact, however large the amounts get. Arithmetic between
+    Money and whole numbers gives Money back."""
+
+    __slots__ = ()
+
+    # SQLite stores integers in 64 bits, so no amount (in cents) can be
+    # larger than this, or smaller than its negative.
+    LIMIT = 2 ** 63 - 1
 
     @classmethod
-    def choose_x(cls):
-        """Presents the user with a list of all records from the corresponding
-        table, asks for a selection, then instantiates the object and returns
-        it."""
+    def parse(cls, text):
+        """Convert a dollar amount entered as text (e.g. '-1,234.5' or
+        '$20') into Money, rounding to the nearest cent. Raises ValueError
+        if the text isn't a number, or is too large to be saved."""
 
-        # TODO: Use pagination.
+        text = text.replace(',', '').replace('$', '')
+        try:
+            dollars = Decimal(text)
+            if not dollars.is_finite():
+                raise ValueError("Not an amount of money: %r" % text)
+            # quantize raises InvalidOperation if the result has more
+            # digits than the decimal context allows.
+            cents = dollars.scaleb(2).quantize(
+                Decimal(1), rounding=ROUND_HALF_UP)
+        except InvalidOperation:
+            raise ValueError("Not an amount of money: %r" % text)
+        if abs(cents) > cls.LIMIT:
+            raise ValueError("Too large an amount of money: %r" % text)
+        return cls(int(cents))
 
-        name_lowercase = cls.__name__.lower()
-        object_list = cls.database_to_memory()
-        if object_list is None:
-            return None
-        print("Which {} do you want to select?\n".format(name_lowercase))
-        cls.print_rows(
-            object_list,
-            cls.display_col_names,
-            show_nums=True,
+    def to_text(self):
+        """The inverse of parse: a plain dollar amount such as '-1234.50',
+        for writing to files."""
+
+        dollars, cents = divmod(abs(self), 100)
+        return "{}{}.{:02d}".format("-" if self < 0 else "", dollars, cents)
+
+    def __repr__(self):
+        return "Money(%d)" % self
+
+    def __add__(self, other):
+        return Money.wrap(int.__add__(self, other))
+
+    def __radd__(self, other):
+        return Money.wrap(int.__radd__(self, other))
+
+    def __sub__(self, other):
+        return Money.wrap(int.__sub__(self, other))
+
+    def __rsub__(self, other):
+        return Money.wrap(int.__rsub__(self, other))
+
+    def __mul__(self, other):
+        return Money.wrap(int.__mul__(self, other))
+
+    def __rmul__(self, other):
+        return Money.wrap(int.__rmul__(self, other))
+
+    def __neg__(self):
+        return Money(int.__neg__(self))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money(int.__abs__(self))
+
+    @staticmethod
+    def wrap(result):
+        # int's operators return NotImplemented for floats etc., which
+        # must be passed along untouched so that Python can handle it.
+        return result if result is NotImplemented else Money(result)
+
+
+# sqlite3 stores Money as a plain INTEGER.
+sqlite3.register_adapter(Money, int)
+
+
+def format_money(amount):
+    """Format an amount of Money for display, e.g. Money(-123456) is
+    shown as '-$1,234.56'."""
+
+    dollars, cents = divmod(abs(amount), 100)
+    return "{}${:,}.{:02d}".format("-" if amount < 0 else "", dollars, cents)
+
+# ____________________________________________________________________________#
+
+
+# The dates which convert_date has already converted, keyed by their text.
+PARSED_DATES = {}
+
+
+def convert_date(text):
+    """Convert a DATE value, which sqlite3 stores as text such as
+    b'2018-03-27', into a datetime.date. A budget has far fewer distinct
+    dates than transactions, so each date is converted only once, and the
+    transactions on that date share the same object."""
+
+    date = PARSED_DATES.get(text)
+    if date is None:
+        year, month, day = text.split(b"-")
+        date = PARSED_DATES[text] = dt(int(year), int(month), int(day))
+    return date
+
+
+sqlite3.register_converter("DATE", convert_date)
+
+# ____________________________________________________________________________#
+
+
+class StatementTimings(object):
+    """The timings which a Tracer keeps of one SQL statement. Its count,
+    total and longest time cover every execution, but only a sample of the
+    executions is kept, so that a long trace doesn't use ever more
+    memory."""
+
+    __slots__ = ("count", "total", "longest", "sample")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+        # At most TRACE_SAMPLE_SIZE of the executions, each of which had
+        # the same chance of being kept (reservoir sampling).
+        self.sample = []
+
+    def add(self, execution):
+        """Count a new execution of the statement, which may be kept in the
+        sample."""
+
+        self.count += 1
+        if len(self.sample) < TRACE_SAMPLE_SIZE:
+            self.sample.append(execution)
+        else:
+            index = random.randrange(self.count)
+            if index < TRACE_SAMPLE_SIZE:
+                self.sample[index] = execution
+
+
+class Tracer(object):
+    """Collects timings of SQL statements and menu actions, if tracing is
+    enabled, and summarizes them when the program exits. Statements are
+    timed by TracedCursor; menu actions by the 'timed' decorator. Time spent
+    waiting for the user to type is left out of the menu actions' times."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = datetime.now()
+        # StatementTimings, keyed by the statement as written (with
+        # placeholders). Each execution is recorded as a list of [seconds,
+        # expanded_sql, sql].
+        self.statements = {}
+        # The TRACE_SLOWEST slowest executions so far, as a heap, with the
+        # fastest of them first.
+        self.slowest = []
+        # Lists of durations, keyed by menu action.
+        self.operations = {}
+        # The number of statements SQLite has run, including those run by
+        # triggers and by sqlite3 itself (such as BEGIN and COMMIT).
+        self.statements_run = 0
+        # The statement being executed, with its parameters filled in, as
+        # reported by SQLite. SQLite also reports the statements run by
+        # triggers, by full-text indexes and by sqlite3 itself (such as an
+        # implicit BEGIN), so it's picked out by its text up to the first
+        # placeholder.
+        self.expanded = None
+        self.prefix = None
+        # The total time spent waiting for input.
+        self.waited = 0.0
+
+    def trace(self, sql):
+        """The connections' trace callback."""
+        self.statements_run += 1
+        if self.expanded is None and self.prefix is not None and \
+                sql.lstrip().startswith(self.prefix):
+            self.expanded = sql
+
+    @contextmanager
+    def statement(self, sql):
+        """Time the statement run in the 'with' block. Yields the record of
+        this execution, so that the time taken to fetch its rows can be
+        added to it with add_time."""
+
+        self.expanded = None
+        self.prefix = sql.split("?", 1)[0].strip()
+        execution = [0.0, sql, sql]
+        timings = self.statements.get(sql)
+        if timings is None:
+            timings = self.statements[sql] = StatementTimings()
+        timings.add(execution)
+        start = timer()
+        try:
+            yield execution
+        finally:
+            if self.expanded is not None:
+                execution[1] = self.expanded
+            self.add_time(execution, timer() - start)
+
+    def add_time(self, execution, seconds):
+        """Add seconds to the time taken by an execution which statement()
+        yielded, such as the time taken to fetch its rows."""
+
+        execution[0] += seconds
+        timings = self.statements[execution[2]]
+        timings.total += seconds
+        timings.longest = max(timings.longest, execution[0])
+        # An execution's time only grows, so it belongs among the slowest
+        # once it's slower than the fastest of them.
+        if any(slow is execution for slow in self.slowest):
+            heapq.heapify(self.slowest)
+        elif len(self.slowest) < TRACE_SLOWEST:
+            heapq.heappush(self.slowest, execution)
+        elif execution[0] > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, execution)
+
+    @contextmanager
+    def operation(self, name):
+        """Time the menu action run in the 'with' block."""
+
+        start = timer()
+        waited = self.waited
+        try:
+            yield
+        finally:
+            self.record(name, timer() - start - (self.waited - waited))
+
+    def record(self, name, seconds):
+        """Record that a call of the named menu action took seconds."""
+        self.operations.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def waiting(self):
+        """Mark the 'with' block as time spent waiting for the user."""
+
+        start = timer()
+        try:
+            yield
+        finally:
+            self.waited += timer() - start
+
+    @staticmethod
+    def statistics(durations):
+        """Return the count, total, median, 99th percentile and maximum of a
+        list of durations, as a dict."""
+
+        ordered = sorted(durations)
+
+        def percentile(percent):
+            # The nearest-rank method.
+            rank = int(math.ceil(percent / 100.0 * len(ordered)))
+            return ordered[max(rank, 1) - 1]
+
+        return {
+            "count": len(ordered),
+            "total": sum(ordered),
+            "p50": percentile(50),
+            "p99": percentile(99),
+            "max": ordered[-1],
+            }
+
+    def summary(self):
+        """Return a summary of everything timed so far, as a dict."""
+
+        operations = []
+        for name, durations in self.operations.items():
+            entry = self.statistics(durations)
+            entry["name"] = name
+            operations.append(entry)
+        statements = []
+        for sql, timings in self.statements.items():
+            # The percentiles are worked out from the sample, and the rest
+            # from every execution.
+            entry = self.statistics(
+                [execution[0] for execution in timings.sample])
+            entry["count"] = timings.count
+            entry["total"] = timings.total
+            entry["max"] = timings.longest
+            entry["sql"] = sql
+            statements.append(entry)
+        return {
+            "started": self.started.isoformat(),
+            "finished": datetime.now().isoformat(),
+            "statements_run": self.statements_run,
+            "operations": sorted(
+                operations, key=lambda entry: entry["total"], reverse=True),
+            "statements": sorted(
+                statements, key=lambda entry: entry["total"], reverse=True),
+            "slowest_statements": [
+                {"seconds": seconds, "sql": expanded_sql}
+                for seconds, expanded_sql, sql in sorted(
+                    self.slowest, reverse=True)],
+            }
+
+    def write_summary(self):
+        """Write the summary to TRACE_FILE_NAME in CONFIG_DIRECTORY, and
+        return the file's path."""
+
+        path = os.path.join(CONFIG_DIRECTORY, TRACE_FILE_NAME)
+        with open(path, "w") as out_file:
+            json.dump(self.summary(), out_file, indent=2, sort_keys=True)
+        return path
+
+
+TRACER = Tracer(os.environ.get(TRACE_ENVIRONMENT_VARIABLE, "0") not in
+                ("", "0"))
+
+
+def timed(function):
+    """Decorator which times each call of a menu action, if tracing is
+    enabled."""
+
+    name = getattr(function, "__qualname__", function.__name__)
+
+    def wrapper(*args, **kwargs):
+        if not TRACER.enabled:
+            return function(*args, **kwargs)
+        with TRACER.operation(name):
+            return function(*args, **kwargs)
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+class TracedCursor(sqlite3.Cursor):
+    """A cursor which times its statements, including the time taken to
+    fetch their rows. Only used while tracing."""
+
+    execution = None
+
+    def execute(self, sql, params=()):
+        with TRACER.statement(sql) as self.execution:
+            return sqlite3.Cursor.execute(self, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        with TRACER.statement(sql) as self.execution:
+            return sqlite3.Cursor.executemany(self, sql, seq_of_params)
+
+    def fetch(self, method, *args):
+        start = timer()
+        try:
+            return method(self, *args)
+        finally:
+            if self.execution is not None:
+                TRACER.add_time(self.execution, timer() - start)
+
+    def fetchone(self):
+        return self.fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self.fetch(sqlite3.Cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self.fetch(sqlite3.Cursor.fetchall)
+
+    try:
+        step = sqlite3.Cursor.__next__     # Python 3.X
+    except AttributeError:
+        step = sqlite3.Cursor.next         # Python 2.X
+
+    def __next__(self):
+        return self.fetch(TracedCursor.step)
+
+    next = __next__     # Python 2.X
+
+
+class TracedConnection(sqlite3.Connection):
+    """A connection which hands out TracedCursors and reports every
+    statement SQLite runs to TRACER. Only used while tracing."""
+
+    def __init__(self, *args, **kwargs):
+        sqlite3.Connection.__init__(self, *args, **kwargs)
+        # Python 2.X has no trace callback.
+        if hasattr(self, "set_trace_callback"):
+            self.set_trace_callback(TRACER.trace)
+
+    def cursor(self, factory=TracedCursor):
+        return sqlite3.Connection.cursor(self, factory)
+
+    # sqlite3's shortcuts don't use cursor(), so they must be redirected.
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+# ____________________________________________________________________________#
+
+
+class BudgetError(Exception):
+    """Raised when a change can't be made because it breaks one of the
+    budget's rules, such as naming an account that doesn't exist or making
+    an account's balance negative. The message is meant for the user."""
+
+# ____________________________________________________________________________#
+
+
+class Budget:
+    """A budget (database) which has been opened. It owns the connection to
+    the database, hands out cursors, and keeps the totals which are worked
+    out from the budget's accounts and categories. Any number of budgets can
+    be open at once, since the Category, Account and Transaction classes work
+    with whichever budget they are given."""
+
+    def __init__(self, path, profile=None):
+        """Connect to the budget stored at path, creating it if it doesn't
+        exist yet, tune the connection according to the given entry of
+        CONNECTION_PROFILES, and bring the budget's schema up to date.
+        Raises BudgetError if the SQLite library is older than
+        MINIMUM_SQLITE_VERSION."""
+
+        if sqlite3.sqlite_version_info < MINIMUM_SQLITE_VERSION:
+            raise BudgetError(
+                "Budgets need version {} or later of SQLite, but this copy"
+                " of Python uses version {}.".format(
+                    ".".join(str(part) for part in MINIMUM_SQLITE_VERSION),
+                    sqlite3.sqlite_version))
+        if profile is None:
+            profile = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE, "default")
+        if profile not in CONNECTION_PROFILES:
+            print("\nThere is no connection profile called {}, so the"
+                  " default profile will be used.".format(profile))
+            profile = "default"
+
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+
+        # The 'detect_types' line allows the DATE type to survive the
+        # round-trip from Python to sqlite3 database to Python again.
+        self.connection = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=TracedConnection if TRACER.enabled else sqlite3.Connection,
             )
-        print()
-        choice_number = input_validation(
-            "Enter the number in front of the {} you wish to "
-            "select, or enter 0 to cancel: ".format(name_lowercase),
-            int,
-            num_lb=0,
-            num_ub=len(object_list)
+        # Python 2.X would otherwise return text as unicode, which had to be
+        # converted back to str one value at a time. Python 3.X already
+        # returns str.
+        self.connection.text_factory = str
+        with self.cursor() as cur:
+            for pragma, value in CONNECTION_PROFILES[profile]:
+                # PRAGMA statements can't take parameters.
+                cur.execute("PRAGMA {} = {}".format(pragma, value))
+        upgrade_budget(self.connection)
+        add_search_index(self.connection)
+        # This can't be changed inside a transaction, so it's only turned on
+        # once the schema is up to date.
+        with self.cursor() as cur:
+            cur.execute("PRAGMA foreign_keys = ON")
+
+        self.total_account_balance = Money(0)
+        # unassigned_funds is not ever allowed to become negative.
+        self.unassigned_funds = Money(0)
+        self.refresh_totals()
+
+    @contextmanager
+    def cursor(self):
+        """Yield a cursor, which is closed at the end of the 'with' block.
+        Use unit_of_work instead for anything that writes to the budget."""
+
+        cur = self.connection.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    @contextmanager
+    def unit_of_work(self):
+        """Make a user-level operation's database writes atomic. Yields a
+        cursor; everything executed with it is committed once at the end of
+        the 'with' block, or rolled back if the block raises an exception."""
+
+        cur = self.connection.cursor()
+        try:
+            yield cur
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        finally:
+            cur.close()
+
+    @contextmanager
+    def bulk_change(self, where_clause, params=(),
+                    totals=("account", "category")):
+        """Make a change to many transactions at once, as a single unit of
+        work. Yields a cursor, like unit_of_work.
+
+        The uids of the transactions matching where_clause (a 'WHERE ...'
+        clause on Transactions, with a placeholder for each of the values in
+        params) are listed in the BulkSelection table, which the 'with'
+        block should use to update or delete them. While it's filled in, the
+        database's triggers leave the balances, values and monthly rollups
+        alone. Instead, the selected transactions are taken out of those
+        totals before the 'with' block and whatever is left of them is added
+        back afterwards, with a grouped statement for each table, so that
+        the cost doesn't depend on how many transactions there are for each
+        account and category.
+
+        :param totals: Which totals the change affects: "account" for the
+        account balances and AccountMonths, "category" for the category
+        values and CategoryMonths. Moving transactions to another category
+        doesn't change any account's totals, for example.
+        """
+
+        with self.unit_of_work() as cur:
+            cur.execute("INSERT INTO BulkSelection SELECT uid FROM"
+                        " Transactions {}".format(where_clause), params)
+            self.adjust_totals(cur, -1, totals)
+            yield cur
+            self.adjust_totals(cur, 1, totals)
+            cur.execute("DELETE FROM BulkSelection")
+        self.refresh_totals()
+
+    @staticmethod
+    def adjust_totals(cur, sign, totals):
+        """Add (if sign is 1) or remove (if sign is -1) the transactions
+        listed in BulkSelection to or from the given totals. Used by
+        bulk_change.
+
+        :param cur: The cursor of the bulk change's unit of work.
+        :param sign: Either 1 or -1.
+        :param totals: Which totals to adjust, as for bulk_change.
+        """
+
+        for name, table_name, total, months_table in (
+                ("account", "Accounts", "balance", "AccountMonths"),
+                ("category", "Categories", "value", "CategoryMonths"),
+                ):
+            if name not in totals:
+                continue
+            # A single grouped pass gives the changes to the monthly
+            # rollups, and the balances (or values) are worked out from
+            # them. Transactions without a category are totalled under 0.
+            cur.execute("SELECT substr(date, 1, 7), COALESCE({}_id, 0),"
+                        " SUM(amount), COUNT(*) FROM Transactions"
+                        " WHERE uid IN (SELECT uid FROM BulkSelection)"
+                        " GROUP BY 1, 2".format(name))
+            months = [(month, row_id, sign * amount, sign * count)
+                      for month, row_id, amount, count in cur.fetchall()]
+            sums = {}
+            for month, row_id, amount, count in months:
+                sums[row_id] = sums.get(row_id, 0) + amount
+            cur.executemany(
+                "UPDATE {0} SET {1}={1}+? WHERE id=?".format(
+                    table_name, total),
+                [(amount, row_id) for row_id, amount in sums.items()
+                 if row_id != 0])
+            cur.executemany(
+                "INSERT INTO {0}(month, {1}_id, total, count)"
+                " VALUES(?,?,?,?) ON CONFLICT(month, {1}_id) DO UPDATE SET"
+                " total=total+excluded.total,"
+                " count=count+excluded.count".format(months_table, name),
+                months)
+            cur.execute("DELETE FROM {} WHERE count=0".format(months_table))
+
+    def insert_many(self, cur, rows):
+        """Insert many transactions as part of a unit of work. The totals
+        are adjusted once for the whole batch, with a grouped statement for
+        each table (see bulk_change), rather than by the triggers for every
+        transaction. Returns the uids of the new transactions.
+
+        :param cur: The cursor of the unit of work.
+        :param rows: A list of (account_id, category_id, amount, payee,
+        date, memo) tuples.
+        """
+
+        # The uids are chosen here, as SQLite would choose them, so that
+        # they can be listed in BulkSelection before the rows exist.
+        cur.execute("SELECT COALESCE(MAX(uid), 0) FROM Transactions")
+        first = cur.fetchone()[0] + 1
+        uids = list(range(first, first + len(rows)))
+        cur.executemany("INSERT INTO BulkSelection(uid) VALUES(?)",
+                        [(uid,) for uid in uids])
+        cur.executemany("INSERT INTO Transactions(uid, account_id,"
+                        " category_id, amount, payee, date, memo)"
+                        " VALUES(?,?,?,?,?,?,?)",
+                        [(uid,) + tuple(row) for uid, row in zip(uids, rows)])
+        self.adjust_totals(cur, 1, ("account", "category"))
+        cur.execute("DELETE FROM BulkSelection")
+        return uids
+
+    def fetch_value(self, sql, params=()):
+        """Run a query and return the first column of its first row, or
+        None if there are no rows."""
+
+        row = self.fetch_row(sql, params)
+        return None if row is None else row[0]
+
+    def fetch_row(self, sql, params=()):
+        """Run a query and return its first row, or None if there are no
+        rows."""
+
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone()
+
+    def fetch_rows(self, sql, params=()):
+        """Run a query and return all of its rows as a list."""
+
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def refresh_totals(self):
+        """Recalculate the total account balance and the unassigned funds
+        from the accounts and categories tables."""
+
+        temp = self.fetch_value("SELECT SUM(balance) FROM Accounts")
+        # A brand new budget has no data, so SUM returns None.
+        self.total_account_balance = Money(0 if temp is None else temp)
+
+        temp = self.fetch_value("SELECT SUM(value) FROM Categories")
+        if temp is None:
+            temp = Money(0)
+        self.unassigned_funds = self.total_account_balance - temp
+
+    @timed
+    def verify_ledger(self, repair=False):
+        """Recompute every account's balance and every category's value
+        from the Transactions table, and compare them with the stored
+        columns. All of the adding up is done by a single grouped pass over
+        Transactions, so this is quick enough to do every time a budget is
+        opened.
+
+        The monthly rollups in AccountMonths and CategoryMonths are checked
+        too, by comparing each account's (and category's) total and count
+        across all months with the same pass. Only the accounts and
+        categories which don't match have their transactions totalled month
+        by month, to find and fix the months which are wrong.
+
+        :param repair: If set, overwrite the stored balances, values and
+        monthly totals that don't match, as a single unit of work.
+        :return: A list of messages, one for each problem found.
+        """
+
+        # [total, count] of the transactions of each account and category,
+        # keyed by id. Transactions without a category are totalled under
+        # 0, as they are in CategoryMonths.
+        sums = {"account": {}, "category": {}}
+        rows = self.fetch_rows(
+            "SELECT account_id, COALESCE(category_id, 0), SUM(amount),"
+            " COUNT(*) FROM Transactions GROUP BY account_id, category_id")
+        for account_id, category_id, total, count in rows:
+            for name, row_id in (("account", account_id),
+                                 ("category", category_id)):
+                entry = sums[name].setdefault(row_id, [0, 0])
+                entry[0] += total
+                entry[1] += count
+        accounts = self.fetch_rows("SELECT id, name, balance FROM Accounts")
+        categories = self.fetch_rows(
+            "SELECT id, name, value, assigned FROM Categories")
+
+        problems = []
+        account_fixes = []
+        for account_id, name, balance in accounts:
+            expected = Money(sums["account"].get(account_id, [0])[0])
+            if balance != expected:
+                problems.append("The {} account's balance is {}, but its"
+                                " transactions add up to {}.".format(
+                                    name,
+                                    format_money(Money(balance)),
+                                    format_money(expected),
+                                    ))
+                account_fixes.append((expected, account_id))
+        category_fixes = []
+        for category_id, name, value, assigned in categories:
+            expected = Money(
+                assigned + sums["category"].get(category_id, [0])[0])
+            if value != expected:
+                problems.append("The {} category's value is {}, but its"
+                                " assigned funds and transactions add up to"
+                                " {}.".format(
+                                    name,
+                                    format_money(Money(value)),
+                                    format_money(expected),
+                                    ))
+                category_fixes.append((expected, category_id))
+
+        names = {
+            "account": dict((row[0], "the {} account".format(row[1]))
+                            for row in accounts),
+            "category": dict((row[0], "the {} category".format(row[1]))
+                             for row in categories),
+            }
+        names["category"][0] = "the transactions without a category"
+        # The correct months of each account or category whose rollups
+        # don't match, keyed by (months_table, name, id).
+        month_fixes = {}
+        for name, months_table in (("account", "AccountMonths"),
+                                   ("category", "CategoryMonths")):
+            stored = {}
+            for row_id, total, count in self.fetch_rows(
+                    "SELECT {}_id, SUM(total), SUM(count) FROM {}"
+                    " GROUP BY 1".format(name, months_table)):
+                stored[row_id] = [total, count]
+            for row_id in sorted(set(stored) | set(sums[name])):
+                if stored.get(row_id) == sums[name].get(row_id):
+                    continue
+                condition, params = ("{}_id=?".format(name), (row_id,))
+                if row_id == 0:
+                    condition, params = ("category_id IS NULL", ())
+                expected = dict(
+                    (month, [total, count]) for month, total, count in
+                    self.fetch_rows(
+                        "SELECT substr(date, 1, 7), SUM(amount), COUNT(*)"
+                        " FROM Transactions WHERE {} GROUP BY 1".format(
+                            condition), params))
+                stored_months = dict(
+                    (month, [total, count]) for month, total, count in
+                    self.fetch_rows(
+                        "SELECT month, total, count FROM {} WHERE"
+                        " {}_id=?".format(months_table, name), (row_id,)))
+                for month in sorted(set(stored_months) | set(expected)):
+                    if stored_months.get(month) != expected.get(month):
+                        problems.append(
+                            "The monthly totals for {} in {} don't match"
+                            " the transactions.".format(
+                                names[name].get(
+                                    row_id, "{} {}".format(name, row_id)),
+                                month))
+                month_fixes[(months_table, name, row_id)] = expected
+
+        if repair and len(problems) > 0:
+            with self.unit_of_work() as cur:
+                cur.executemany("UPDATE Accounts SET balance=? WHERE id=?",
+                                account_fixes)
+                cur.executemany("UPDATE Categories SET value=? WHERE id=?",
+                                category_fixes)
+                for (months_table, name, row_id), expected in \
+                        month_fixes.items():
+                    cur.execute("DELETE FROM {} WHERE {}_id=?".format(
+                        months_table, name), (row_id,))
+                    cur.executemany(
+                        "INSERT INTO {}(month, {}_id, total, count)"
+                        " VALUES(?,?,?,?)".format(months_table, name),
+                        [(month, row_id, total, count) for month,
+                         (total, count) in expected.items()])
+            self.refresh_totals()
+        return problems
+
+    def close(self):
+        self.connection.close()
+
+# ____________________________________________________________________________#
+
+
+class BudgetCatalog:
+    """The catalog of the user's budgets, which is a small database of its
+    own (CATALOG_FILE_NAME, in CONFIG_DIRECTORY). It has a row for each
+    budget with its file size, cached totals and when it was last opened, so
+    that budgets can be listed and sorted without opening any of them."""
+
+    def __init__(self, user_budgets):
+        self.user_budgets = user_budgets
+        self.connection = sqlite3.connect(
+            os.path.join(CONFIG_DIRECTORY, CATALOG_FILE_NAME))
+        upgrade_budget(self.connection, CATALOG_MIGRATIONS)
+
+    def path(self, name):
+        """Return the path of the budget with the given name."""
+        return os.path.join(self.user_budgets, name + '.db')
+
+    def synchronize(self):
+        """Add the budgets which aren't in the catalog yet (such as budgets
+        made before the catalog existed), and remove the budgets whose files
+        are gone."""
+
+        names = set(
+            os.path.splitext(file_name)[0]
+            for file_name in os.listdir(self.user_budgets)
+            if file_name.endswith('.db')
             )
-        return None if choice_number == 0 else object_list[choice_number - 1]
+        known = set(row[0] for row in self.connection.execute(
+            "SELECT name FROM Budgets"))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO Budgets(name, size) VALUES(?,?)",
+                [(name, os.path.getsize(self.path(name)))
+                 for name in names - known])
+            self.connection.executemany(
+                "DELETE FROM Budgets WHERE name=?",
+                [(name,) for name in known - names])
+
+    def record(self, budget, opened=False):
+        """Save the budget's current size and totals in the catalog (adding
+        the budget to the catalog if it isn't there yet).
+
+        :param budget: An open Budget.
+        :param opened: If set, also record that the budget was opened now.
+        """
+
+        transactions = budget.fetch_value(
+            "SELECT COUNT(*) FROM Transactions")
+        # Recent changes may still be in the write-ahead log.
+        size = os.path.getsize(budget.path)
+        if os.path.exists(budget.path + '-wal'):
+            size += os.path.getsize(budget.path + '-wal')
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO Budgets(name) VALUES(?)",
+                (budget.name,))
+            self.connection.execute(
+                "UPDATE Budgets SET transactions=?, balance=?, size=?"
+                " WHERE name=?", (
+                    transactions,
+                    budget.total_account_balance,
+                    size,
+                    budget.name,
+                    ))
+            if opened:
+                self.connection.execute(
+                    "UPDATE Budgets SET opened=? WHERE name=?",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                     budget.name))
+
+    def remove(self, name):
+        with self.connection:
+            self.connection.execute("DELETE FROM Budgets WHERE name=?",
+                                    (name,))
+
+    def count(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM Budgets").fetchone()[0]
+
+    def entries(self, sort_order=0, offset=0, limit=PAGE_SIZE):
+        """Return a page of the catalog as a list of CatalogEntry objects.
+
+        :param sort_order: The index of the entry of CATALOG_SORT_ORDERS to
+        sort by.
+        :param offset: The number of entries to skip.
+        :param limit: The most entries to return.
+        """
+
+        sql = "SELECT name, opened, transactions, balance, size" \
+              " FROM Budgets ORDER BY {}, name LIMIT ? OFFSET ?".format(
+                CATALOG_SORT_ORDERS[sort_order][1])
+        rows = self.connection.execute(sql, (limit, offset)).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    def close(self):
+        self.connection.close()
+
+
+class CatalogEntry:
+    """A single budget's row in the catalog, ready to be displayed."""
+
+    display_col_names = [
+        "name",
+        "opened",
+        "transactions",
+        "balance",
+        "size",
+        ]
+
+    def __init__(self, name, opened, transactions, balance, size):
+        self.name = str(name)   # str() is added for Python 2.X users
+        # Only the date on which the budget was opened is displayed.
+        self.opened = None if opened is None else dt(
+            *[int(part) for part in opened[:10].split('-')])
+        self.transactions = transactions
+        self.balance = None if balance is None else Money(balance)
+        self.size = None if size is None else format_size(size)
+
+
+def format_size(num_bytes):
+    """Return a file size (in bytes) as text, such as '12 KB'."""
+
+    for unit in ("bytes", "KB", "MB"):
+        if num_bytes < 1024:
+            return "{} {}".format(int(round(num_bytes)), unit)
+        num_bytes /= 1024.0
+    return "{:.1f} GB".format(num_bytes)
+
+# ____________________________________________________________________________#
+
+
+class BaseClass(object):
+
+    # The models declare their attributes in __slots__, so that instances
+    # don't each carry a __dict__. Loading a large table creates one
+    # instance per row, and this roughly halves the memory they take.
+    __slots__ = ()
 
     @classmethod
+    def record_name(cls):
+        """Return what a single record is called in messages to the user."""
+
+        return cls.__name__.lower()
+
+    @classmethod
+    @timed
+    def choose_x(cls, budget, query=None):
+        """Presents the user with a paginated list of records from the
+        corresponding table, asks for a selection, then instantiates the
+        object and returns it. If query (a TransactionFilter) is given, only
+        the records which match it are offered, in its order."""
+
+        name_lowercase = cls.record_name()
+        pager = RecordPager(cls, budget, query)
+        if len(pager.objects) == 0:
+            cls.report_none(query)
+            return None
+        print("Which {} do you want to select?\n".format(name_lowercase))
+        while True:
+            cls.print_rows(
+                pager.objects,
+                cls.display_col_names,
+                show_nums=True,
+                first_num=pager.offset + 1,
+                )
+            print()
+            choice_number = input_validation(
+                "Enter the number in front of the {} you wish to "
+                "select{}, or enter 0 to cancel: ".format(
+                    name_lowercase,
+                    pager.navigation_prompt(),
+                    ),
+                int,
+                num_lb=0,
+                num_ub=pager.offset + len(pager.objects),
+                str_options=pager.navigation_options(),
+                )
+            if choice_number == 'n':
+                pager.next_page()
+            elif choice_number == 'p':
+                pager.previous_page()
+            elif choice_number == 0:
+                return None
+            elif choice_number <= pager.offset:
+                # The selected row belongs to an earlier page, which the
+                # pager no longer holds, so it's looked up by its position.
+                # Only the chunk of records it's in is fetched.
+                return RecordSequence(cls, budget, query)[choice_number - 1]
+            else:
+                return pager.objects[choice_number - pager.offset - 1]
+
+    @classmethod
+    @timed
     def display_x(
             cls,
-            where_clause = '',
+            budget,
+            query=None,
             summary_attr=None,
             summary_attr_name=None
             ):
 
         # TODO: Use with statement to open and close the cursor.
-        # TODO: Fix floating point errors for large numbers. Use "decimal" module?
         # TODO: If categories have negative balances, alert the user.
 
-        name_lowercase = cls.__name__.lower()
-        object_list = cls.database_to_memory(where_clause)
-        if object_list is None:
+        name_lowercase = cls.record_name()
+        pager = RecordPager(cls, budget, query)
+        if len(pager.objects) == 0:
+            cls.report_none(query)
             return
         print("\nHere is your {} list:\n".format(name_lowercase))
-        cls.print_rows(
-            object_list,
-            cls.display_col_names,
-            )
-        print()
+        while True:
+            cls.print_rows(
+                pager.objects,
+                cls.display_col_names,
+                )
+            print()
+            options = pager.navigation_options()
+            if len(options) == 0:
+                # Everything fits on a single page.
+                break
+            choice = input_validation(
+                "Enter {}, or a blank line to stop browsing: ".format(
+                    pager.navigation_prompt().lstrip(", ")),
+                str,
+                empty_string_allowed=True,
+                str_options=options,
+                )
+            if choice == 'n':
+                pager.next_page()
+            elif choice == 'p':
+                pager.previous_page()
+            else:
+                break
+            print()
 
         # Now show an (optional) summary metric.
         if summary_attr is not None:
-            minus = "-$" if summary_attr < 0 else "$"
-            concat = minus + "{:,.2f}".format(abs(summary_attr))
             output = "Your {} is currently {}.".format(
                 summary_attr_name,
-                concat,
+                format_money(summary_attr),
                 )
             print(output)
         press_key_to_continue()
 
     @classmethod
-    def database_to_memory(cls, where_clause=''):
-        """Queries the entire database table corresponding to the class
-        which calls this method, instantiates objects for every record returned
-        from the database, and returns all the objects in a list."""
-        object_list = []
-
-        cur = conn.cursor()
-        sql = "SELECT * FROM {} {}".format(cls.table_name, where_clause)
-        cur.execute(sql)
-        query_results = cur.fetchall()
-
-        if len(query_results) == 0:
+    def report_none(cls, query=None):
+        """Tell the user that there are no records to show."""
+
+        if query is None:
             print("\nYou have none! Try again when you've created at"
-                  " least one {}.".format(cls.__name__.lower()))
-            press_key_to_continue()
-            cur.close()
-            return None
+                  " least one {}.".format(cls.record_name()))
+        else:
+            print("\nYou have no {}s which match.".format(
+                cls.record_name()))
+        press_key_to_continue()
 
-        for i in query_results:
-            object_list.append(cls.instantiate(i))
-        cur.close()
+    @classmethod
+    def fetch_page(
+            cls,
+            budget,
+            query=None,
+            after_key=None,
+            before_key=None,
+            page_size=PAGE_SIZE,
+            offset=0,
+            ):
+        """Fetch a single page of records using keyset pagination, rather
+        than loading the entire table.
+
+        :param budget: The budget to fetch the records from.
+        :param query: An optional TransactionFilter which restricts the
+        records returned and sets their order. Otherwise records are in
+        key_column order.
+        :param after_key: If given, fetch the page of records whose key
+        immediately follows this key.
+        :param before_key: If given, fetch the page of records whose key
+        immediately precedes this key.
+        :param page_size: The most records to fetch.
+        :param offset: The number of records to skip first. SQLite has to
+        step over the skipped records, so use after_key where possible.
+        :return: A tuple of (keys, objects, more), where 'keys' and 'objects'
+        are in display order and 'more' indicates whether there are further
+        records in the direction of travel. Each key is a tuple of the
+        values which the records are ordered by.
+        """
+
+        if query is None:
+            where_clause, params = "", []
+            columns, descending = [cls.key_column], False
+        else:
+            where_clause, params = query.where()
+            columns, descending = query.order()
+
+        # Going back a page means reading the rows in the opposite order.
+        backwards = before_key is not None
+        order = "DESC" if descending != backwards else "ASC"
+        keyset = ""
+        if after_key is not None or before_key is not None:
+            # Compare the keys as row values, so that a page may end in the
+            # middle of a run of equal dates or amounts.
+            keyset = "{} ({}) {} ({})".format(
+                "AND" if where_clause else "WHERE",
+                ", ".join(columns),
+                "<" if order == "DESC" else ">",
+                ", ".join("?" * len(columns)),
+                )
+            params = list(params) + list(
+                after_key if after_key is not None else before_key)
+        limit = ""
+        if offset > 0:
+            limit = "LIMIT -1 OFFSET ?"
+            params = list(params) + [offset]
+
+        sql = "SELECT {keys}, * FROM {table} {where} {keyset} " \
+              "ORDER BY {order_by} {limit}".format(
+                keys=", ".join(columns),
+                table=cls.table_name,
+                where=where_clause,
+                keyset=keyset,
+                order_by=", ".join(
+                    "{} {}".format(column, order) for column in columns),
+                limit=limit,
+                )
+        with budget.cursor() as cur:
+            cur.execute(sql, params)
+            # Ask for one extra row, to find out if there is another page.
+            rows = cur.fetchmany(page_size + 1)
+
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+        keys = [tuple(row[:len(columns)]) for row in rows]
+        objects = [cls.instantiate(budget, row[len(columns):])
+                   for row in rows]
+        return keys, objects, more
+
+    @classmethod
+    def find(cls, budget, name):
+        """Return the record with the given name as an object, or None if
+        there isn't one. Only for classes whose records have unique names."""
+
+        sql = "SELECT * FROM {} WHERE name=?".format(cls.table_name)
+        row = budget.fetch_row(sql, (name,))
+        return None if row is None else cls.instantiate(budget, row)
+
+    @classmethod
+    def count(cls, budget, query=None):
+        """Return the number of records in the corresponding table, or only
+        those which match query (a TransactionFilter) if it's given."""
+
+        where_clause, params = ("", []) if query is None else query.where()
+        sql = "SELECT COUNT(*) FROM {} {}".format(cls.table_name, where_clause)
+        return budget.fetch_value(sql, params)
+
+    @classmethod
+    def database_to_memory(cls, budget, query=None):
+        """Return every record of the database table corresponding to the
+        class which calls this method, as a RecordSequence of objects. If
+        query (a TransactionFilter) is given, only the records which match it
+        are included, in its order. The objects are only created when they
+        are looked up, so this costs a single COUNT(*) until then."""
+
+        object_list = RecordSequence(cls, budget, query)
+        if len(object_list) == 0:
+            cls.report_none(query)
+            return None
         return object_list
 
     @staticmethod
-    def print_rows(table, col_names, show_nums=False):
+    def print_rows(table, col_names, show_nums=False, first_num=1):
         """Given a table of data (implemented as a list of objects), print out
          the rows with proper formatting.
 
@@ -201,11 +1404,13 @@ class BaseClass:
          names appear in this parameter will be printed.
          :param show_nums: A flag that determines whether to display
          incrementing integers in front of each row (to assist user selection).
+         :param first_num: The number displayed in front of the first row, if
+         show_nums is set.
          """
 
         max_list = []
         top = ""
-        num = 1
+        num = first_num
 
         # The following variables can be tweaked to change the formatting
         # of the output.
@@ -221,9 +1426,8 @@ class BaseClass:
                 att = getattr(obj, col_names[i])
                 if type(att) == str or type(att) == int:
                     compare = str(att)
-                elif type(att) == float:
-                    minus = "-$" if att < 0 else "$"
-                    compare = minus + "{:,.2f}".format(abs(att))
+                elif type(att) == Money:
+                    compare = format_money(att)
                 elif type(att) == dt:
                     compare = "xx/xx/xxxx"
                 elif att is None:
@@ -253,9 +1457,8 @@ class BaseClass:
                 right_justified = False
                 if type(att) == str or type(att) == int:
                     concat = str(att)
-                elif type(att) == float:
-                    minus = "-$" if att < 0 else "$"
-                    concat = minus + "{:,.2f}".format(abs(att))
+                elif type(att) == Money:
+                    concat = format_money(att)
                     right_justified = True
                 elif type(att) == dt:
                     concat = att.strftime("%m/%d/%Y")
@@ -290,29 +1493,450 @@ class BaseClass:
 # ____________________________________________________________________________#
 
 
+class RecordPager:
+    """Keeps track of the user's position while paging through a table, one
+    page of PAGE_SIZE records at a time. Only the current page is held in
+    memory; the neighbouring pages are found by key (keyset pagination), so
+    every page costs the same to fetch no matter how deep into the table the
+    user has browsed."""
+
+    def __init__(self, cls, budget, query=None):
+        self.cls = cls
+        self.budget = budget
+        self.query = query
+        # The number of records which come before the current page.
+        self.offset = 0
+        self.keys, self.objects, self.has_next = cls.fetch_page(
+            budget,
+            query,
+            )
+
+    def next_page(self):
+        keys, objects, more = self.cls.fetch_page(
+            self.budget,
+            self.query,
+            after_key=self.keys[-1],
+            )
+        if len(objects) > 0:
+            self.offset += len(self.objects)
+            self.keys, self.objects = keys, objects
+        self.has_next = more
+
+    def previous_page(self):
+        keys, objects, more = self.cls.fetch_page(
+            self.budget,
+            self.query,
+            before_key=self.keys[0],
+            )
+        if len(objects) > 0:
+            self.offset = max(self.offset - len(objects), 0)
+            self.keys, self.objects = keys, objects
+            # We came from the page that follows this one.
+            self.has_next = True
+
+    def navigation_options(self):
+        """Return the navigation commands which are currently available."""
+        options = []
+        if self.has_next:
+            options.append('n')
+        if self.offset > 0:
+            options.append('p')
+        return options
+
+    def navigation_prompt(self):
+        """Describe the available navigation commands, for use in a prompt."""
+        output = ""
+        if self.has_next:
+            output += ", 'n' for the next page"
+        if self.offset > 0:
+            output += ", 'p' for the previous page"
+        return output
+
+# ____________________________________________________________________________#
+
+
+class RecordSequence(Sequence):
+    """A read-only list of the records in a table (or those which match a
+    TransactionFilter), which fetches and instantiates them BATCH_SIZE at a
+    time, as they are looked up. Its length comes from a COUNT(*), so
+    len() and looking up a single record never load the whole table. The
+    SEQUENCE_CHUNKS_KEPT most recently used chunks are kept in memory.
+
+    The length is counted when the sequence is made, so it doesn't take
+    account of records which are added or deleted afterwards."""
+
+    def __init__(self, cls, budget, query=None):
+        self.cls = cls
+        self.budget = budget
+        self.query = query
+        self.length = cls.count(budget, query)
+        # Chunks of objects, keyed by chunk number, least recently used
+        # first.
+        self.chunks = OrderedDict()
+        # The key of the last record in each chunk fetched so far, so that
+        # the following chunk can be found by key rather than by offset.
+        self.last_keys = {}
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("RecordSequence index out of range")
+        chunk = self.chunk(index // BATCH_SIZE)
+        if index % BATCH_SIZE >= len(chunk):
+            # Records have been deleted since the sequence was made.
+            raise IndexError("RecordSequence index out of range")
+        return chunk[index % BATCH_SIZE]
+
+    def __iter__(self):
+        for number in range((self.length + BATCH_SIZE - 1) // BATCH_SIZE):
+            for obj in self.chunk(number):
+                yield obj
+
+    def chunk(self, number):
+        """Return the list of objects in the given chunk, fetching it if it
+        isn't already in memory."""
+
+        if number in self.chunks:
+            # Mark the chunk as the most recently used.
+            objects = self.chunks.pop(number)
+            self.chunks[number] = objects
+            return objects
+
+        if number - 1 in self.last_keys:
+            keys, objects, more = self.cls.fetch_page(
+                self.budget,
+                self.query,
+                after_key=self.last_keys[number - 1],
+                page_size=BATCH_SIZE,
+                )
+        else:
+            keys, objects, more = self.cls.fetch_page(
+                self.budget,
+                self.query,
+                page_size=BATCH_SIZE,
+                offset=number * BATCH_SIZE,
+                )
+        if len(keys) > 0:
+            self.last_keys[number] = keys[-1]
+        self.chunks[number] = objects
+        if len(self.chunks) > SEQUENCE_CHUNKS_KEPT:
+            self.chunks.popitem(last=False)
+        return objects
+
+# ____________________________________________________________________________#
+
+
+class TransactionFilter:
+    """The conditions which restrict a list of transactions, and the order
+    to list them in. Every condition is optional; those which are None are
+    ignored.
+
+    where() turns the conditions into SQL with placeholders. The values are
+    never pasted into the SQL, so names containing quotes are harmless, and
+    the same statement is reused from the connection's cache whatever the
+    names, dates and amounts are."""
+
+    def __init__(
+            self,
+            account=None,
+            category=None,
+            start_date=None,
+            end_date=None,
+            min_amount=None,
+            max_amount=None,
+            payee=None,
+            sort_order=0,
+            ):
+        """
+        :param account: Only include this account's transactions.
+        :param category: Only include this category's transactions.
+        :param start_date: Skip transactions before this date.
+        :param end_date: Skip transactions after this date.
+        :param min_amount: Skip transactions for less than this Money.
+        :param max_amount: Skip transactions for more than this Money.
+        :param payee: Only include transactions whose payee contains this
+        text, ignoring case.
+        :param sort_order: The index of the entry of TRANSACTION_SORT_ORDERS
+        to list the transactions in.
+        """
+
+        self.account = account
+        self.category = category
+        self.start_date = start_date
+        self.end_date = end_date
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.payee = payee
+        self.sort_order = sort_order
+
+    def where(self):
+        """Return a tuple of (where_clause, params), where where_clause is
+        either empty or a 'WHERE ...' clause with a placeholder for each of
+        the values in the list params."""
+
+        conditions = []
+        params = []
+        for condition, value in (
+                ("account_id=(SELECT id FROM Accounts WHERE name=?)",
+                 self.account),
+                ("category_id=(SELECT id FROM Categories WHERE name=?)",
+                 self.category),
+                ("date>=?", self.start_date),
+                ("date<=?", self.end_date),
+                ("amount>=?", self.min_amount),
+                ("amount<=?", self.max_amount),
+                ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if self.payee is not None:
+            # Any wildcards in the text itself must be matched literally.
+            conditions.append("payee LIKE ? ESCAPE '\\'")
+            params.append("%{}%".format(
+                self.payee.replace("\\", "\\\\").replace(
+                    "%", "\\%").replace("_", "\\_")))
+        if len(conditions) == 0:
+            return "", params
+        return "WHERE " + " AND ".join(conditions), params
+
+    def order(self):
+        """Return a tuple of (columns, descending), where columns lists the
+        columns which the transactions are ordered by (ending with uid, so
+        that no two transactions tie)."""
+
+        column, descending = TRANSACTION_SORT_ORDERS[self.sort_order][1:]
+        if column == "uid":
+            return ["uid"], descending
+        return [column, "uid"], descending
+
+    def describe(self):
+        """Describe the filter, for use as a menu header."""
+
+        header = {"FILTERED TRANSACTIONS": ""}
+        for key, value in (
+                ("Account:", self.account),
+                ("Category:", self.category),
+                ("From:", self.start_date),
+                ("To:", self.end_date),
+                ("At least:", self.min_amount),
+                ("At most:", self.max_amount),
+                ("Payee contains:", self.payee),
+                ):
+            if value is not None:
+                header[key] = value
+        header["Sorted by:"] = TRANSACTION_SORT_ORDERS[self.sort_order][0]
+        return header
+
+# ____________________________________________________________________________#
+
+
+class BulkEdit:
+    """A change to every transaction which matches a TransactionFilter:
+    moving them to another category or account, or deleting them.
+
+    preview() works out how many transactions would change and what would
+    happen to each balance and value, with a single grouped query, so that
+    the user can see the impact before anything is written. apply() then
+    makes the change with one statement, inside Budget.bulk_change, which
+    adjusts the totals by account and category instead of row by row."""
+
+    # The tables of the categories and accounts which transactions can be
+    # moved to.
+    table_names = {"category": "Categories", "account": "Accounts"}
+
+    # The totals which each action affects, as for Budget.bulk_change.
+    totals = {
+        "category": ("category",),
+        "account": ("account",),
+        "delete": ("account", "category"),
+        }
+
+    def __init__(self, budget, query, action, target=None):
+        """
+        :param budget: The budget whose transactions are edited.
+        :param query: The TransactionFilter which picks the transactions.
+        :param action: "category" or "account" to move the transactions to
+        the category or account called target, or "delete" to delete them.
+        :param target: The name of the category or account to move the
+        transactions to. Not used when deleting.
+        """
+
+        self.budget = budget
+        self.query = query
+        self.action = action
+        self.target = target
+
+    def where(self):
+        """Return a tuple of (where_clause, params) in the same form as
+        TransactionFilter.where, selecting the transactions which the edit
+        would change. Those already in the target are left out, as are
+        transfers when changing categories, since they don't have one.
+        Deleting one leg of a transfer deletes the other as well. When
+        changing accounts, a leg of a transfer is left out if the other leg
+        is in the target or would move there too, since both legs can't be
+        in one account."""
+
+        where_clause, params = self.query.where()
+        if self.action == "delete":
+            if where_clause == "":
+                return where_clause, params
+            return "{0} OR uid IN (SELECT transfer_uid FROM Transactions" \
+                   " {0} AND transfer_uid IS NOT NULL)".format(
+                    where_clause), params + params
+        condition = "{}_id IS NOT (SELECT id FROM {} WHERE name=?)".format(
+            self.action, self.table_names[self.action])
+        condition_params = [self.target]
+        if self.action == "category":
+            condition += " AND transfer_uid IS NULL"
+        else:
+            condition += " AND (transfer_uid IS NULL OR (transfer_uid NOT" \
+                         " IN (SELECT uid FROM Transactions WHERE" \
+                         " account_id=(SELECT id FROM Accounts WHERE" \
+                         " name=?)) AND transfer_uid NOT IN (SELECT uid" \
+                         " FROM Transactions {})))".format(where_clause)
+            condition_params += [self.target] + params
+        params = params + condition_params
+        if where_clause == "":
+            return "WHERE " + condition, params
+        return where_clause + " AND " + condition, params
+
+    def preview(self):
+        """Return a tuple of (count, changes), where count is the number of
+        transactions which would change, and changes is a list of
+        ReportRows, one for each balance or value which would change (and
+        for the unassigned funds), with the columns total, change and after,
+        and kind ("account", "category" or "unassigned"). Raises BudgetError
+        if the target doesn't exist."""
+
+        if self.action != "delete" and self.budget.fetch_value(
+                "SELECT id FROM {} WHERE name=?".format(
+                    self.table_names[self.action]),
+                (self.target,)) is None:
+            raise BudgetError("There is no {} called {}.".format(
+                self.action, self.target))
+
+        where_clause, params = self.where()
+        rows = self.budget.fetch_rows(
+            "SELECT account, category, SUM(amount), COUNT(*)"
+            " FROM TransactionDetails {} GROUP BY account_id,"
+            " category_id".format(where_clause), params)
+        count = 0
+        accounts = {}
+        categories = {}
+        for account, category, amount, group_count in rows:
+            count += group_count
+            if self.action == "account":
+                accounts[self.target] = accounts.get(self.target, 0) + amount
+            if self.action == "category":
+                categories[self.target] = \
+                    categories.get(self.target, 0) + amount
+            if self.action != "category":
+                accounts[account] = accounts.get(account, 0) - amount
+            if self.action != "account" and category is not None:
+                categories[category] = categories.get(category, 0) - amount
+
+        changes = []
+        for kind, total, deltas in (
+                ("account", "balance", accounts),
+                ("category", "value", categories),
+                ):
+            for name in sorted(deltas):
+                if deltas[name] == 0:
+                    continue
+                before = self.budget.fetch_value(
+                    "SELECT {} FROM {} WHERE name=?".format(
+                        total, self.table_names[kind]), (name,))
+                changes.append(ReportRow(
+                    kind=kind,
+                    total="{} {}".format(name, kind),
+                    change=Money(deltas[name]),
+                    after=Money(before + deltas[name]),
+                    ))
+        unassigned = sum(accounts.values()) - sum(categories.values())
+        if unassigned != 0:
+            changes.append(ReportRow(
+                kind="unassigned",
+                total=Category.unassigned_funds_name,
+                change=Money(unassigned),
+                after=Money(self.budget.unassigned_funds + unassigned),
+                ))
+        return count, changes
+
+    def check(self, changes):
+        """Raise BudgetError if the changes from preview() would leave an
+        account's balance, or the unassigned funds, negative."""
+
+        for row in changes:
+            if row.after >= 0 or row.kind == "category":
+                continue
+            if row.kind == "unassigned":
+                raise BudgetError("Your unassigned funds would become"
+                                  " negative.")
+            raise BudgetError("The balance of {} would become"
+                              " negative.".format(row.total))
+
+    def apply(self):
+        """Make the change, without prompting the user, as a single bulk
+        change. Returns the number of transactions changed. Raises
+        BudgetError, and changes nothing, if the target doesn't exist or
+        the change would leave a balance or the unassigned funds negative.
+        """
+
+        count, changes = self.preview()
+        self.check(changes)
+        if count == 0:
+            return 0
+        where_clause, params = self.where()
+        with self.budget.bulk_change(
+                where_clause, params, self.totals[self.action]) as cur:
+            if self.action == "delete":
+                cur.execute("DELETE FROM Transactions WHERE uid IN ("
+                            "SELECT uid FROM BulkSelection)")
+            else:
+                if self.action == "account":
+                    Transaction.rename_transfer_payees(cur, self.target)
+                cur.execute(
+                    "UPDATE Transactions SET {0}_id=(SELECT id FROM {1}"
+                    " WHERE name=?) WHERE uid IN (SELECT uid FROM"
+                    " BulkSelection)".format(
+                        self.action, self.table_names[self.action]),
+                    (self.target,))
+            count = cur.rowcount
+        return count
+
+# ____________________________________________________________________________#
+
+
 class Category(BaseClass):
 
-    # unassigned_funds is not ever allowed to become negative.
-    unassigned_funds = 0
     unassigned_funds_name = "Unassigned Funds"
     table_name = "Categories"
+    key_column = "rowid"
     display_col_names = [
         "name",
         "value",
         ]
+    __slots__ = ("budget", "name", "value")
 
-
-    def __init__(self, name, value):
+    def __init__(self, budget, name, value):
+        self.budget = budget
         self.name = name
         self.value = value
 
     @classmethod
-    def new_category(cls):
+    @timed
+    def new_category(cls, budget):
         """Prompt the user for a name and then create a category with that
         name. User can't enter a negative value in this method, but some
         transactions can make the value negative."""
 
-        cur = conn.cursor()
+        cur = budget.connection.cursor()
         print()
         while True:
             name = input_validation(
@@ -340,58 +1964,81 @@ class Category(BaseClass):
         # Category name has been approved, so now ask if user would like
         # to assign a value.
         print("\nOkay! You added a new category called %s." % name)
-        if cls.unassigned_funds > 0:
-            output = "There is ${:,.2f} available to be assigned to " \
+        if budget.unassigned_funds > 0:
+            output = "There is {} available to be assigned to " \
                      "categories. How much would you like to assign to {} " \
-                     "now? Enter a number: ".format(cls.unassigned_funds, name)
+                     "now? Enter a number: ".format(
+                        format_money(budget.unassigned_funds),
+                        name,
+                        )
             value = input_validation(
                 output,
-                float,
+                Money,
                 num_lb=0,
-                num_ub=cls.unassigned_funds,
+                num_ub=budget.unassigned_funds,
                 )
-            # value is valid, but may have extra decimal places (beyond 2).
-            value = round(value, 2)
-            print("\n${:,.2f} has been added to {}.".format(value, name))
+            print("\n{} has been added to {}.".format(
+                format_money(value), name))
 
         else:
             # Unassigned funds = 0, so value must also be set to 0.
-            value = 0
+            value = Money(0)
             output = "There is $0 available to be assigned to categories," \
                      " so {}'s value will be $0 for now.".format(name)
             print(output)
 
         # Category name and value have been approved, so add them
         # to the Categories table in the database.
-        cur.execute('INSERT INTO Categories VALUES(?,?)', (name, value))
-        conn.commit()
         cur.close()
-
-        # Finally, update the class attribute for total account balance.
-        cls.unassigned_funds -= value
+        cls.add_category(budget, name, value)
 
         press_key_to_continue()
 
+    @classmethod
+    def add_category(cls, budget, name, value=Money(0)):
+        """Create a category without prompting the user. Raises BudgetError
+        if the name is taken, or if the value is negative or more than the
+        unassigned funds."""
+
+        if value < 0 or value > budget.unassigned_funds:
+            raise BudgetError(
+                "A new category's value must be between $0.00 and {}.".format(
+                    format_money(max(budget.unassigned_funds, Money(0)))))
+
+        with budget.unit_of_work() as cur:
+            cur.execute("SELECT COUNT(*) FROM Categories WHERE name=?",
+                        (name,))
+            if cur.fetchone()[0] > 0:
+                raise BudgetError(
+                    "A category already exists with that name.")
+            cur.execute('INSERT INTO Categories(name, value, assigned)'
+                        ' VALUES(?,?,?)', (name, value, value))
+
+        # Finally, update the class attribute for unassigned funds.
+        budget.unassigned_funds -= value
+
+    @timed
     def delete_category(self):
         """Ask user for confirmation before deleting, and then delete."""
 
         # First check to see if there are any transactions for this category.
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM Transactions WHERE Category=?",
-                    (self.name,))
+        cur = self.budget.connection.cursor()
+        cur.execute("SELECT COUNT(*) FROM Transactions WHERE category_id=("
+                    "SELECT id FROM Categories WHERE name=?)", (self.name,))
         temp = cur.fetchone()[0]
         if temp > 0:
             # There are transactions assigned to this category.
             if temp == 1:
-                output = "There is 1 transaction assigned to {}. Reassign" \
-                         " that transaction to another category or delete" \
-                         " it, and then try again.".format(self.name)
+                output = "There is 1 transaction assigned to {}. Move it" \
+                         " to another category (or merge {} into another" \
+                         " category) first.".format(self.name, self.name)
             else:
-                output = "There are {} transactions assigned to {}. Reassign" \
-                        " those transactions to other categories or delete" \
-                         " them, and then try again.".format(
+                output = "There are {} transactions assigned to {}. Move" \
+                         " them to another category (or merge {} into" \
+                         " another category) first.".format(
                             temp,
                             self.name,
+                            self.name,
                             )
             print("\n%s" % output)
             cur.close()
@@ -408,20 +2055,22 @@ class Category(BaseClass):
             num_lb=0,
             num_ub=1,
             )
+        cur.close()
         if confirmation == 1:
             # Delete the category.
-            Category.unassigned_funds += self.value
-            cur.execute("DELETE FROM Categories WHERE name=?", (self.name,))
-            conn.commit()
+            with self.budget.unit_of_work() as cur:
+                cur.execute("DELETE FROM Categories WHERE name=?",
+                            (self.name,))
+            self.budget.unassigned_funds += self.value
             print("\nYou have successfully deleted %s from your"
                   " list of categories." % self.name)
-            cur.close()
             press_key_to_continue()
         return confirmation
 
+    @timed
     def update_category_name(self):
 
-        cur = conn.cursor()
+        cur = self.budget.connection.cursor()
 
         text = "Your category's name is currently {}.".format(self.name)
         print("\n%s" % text)
@@ -457,50 +2106,175 @@ class Category(BaseClass):
                 continue
             break
 
-        # Update the database for this record.
-        sql = "UPDATE Categories SET name=? WHERE name=?"
-        cur.execute(sql, (new_name, self.name))
-        conn.commit()
-
-        # Also update the database for other records which depend
-        # on this record.
-        sql = "UPDATE Transactions SET category=? WHERE category=?"
-        cur.execute(sql, (new_name, self.name))
-        conn.commit()
+        cur.close()
+        old_name = self.name
+        self.rename(new_name)
 
         # Inform the user of the result.
         output = "You have changed the category name from {} to {}.".format(
-            self.name,
+            old_name,
             new_name,
             )
         print("\n%s" % output)
 
+        press_key_to_continue()
+
+    def rename(self, new_name):
+        """Rename this category without prompting the user. Its transactions
+        refer to it by id, so they don't change. Raises BudgetError if the
+        name is taken."""
+
+        with self.budget.unit_of_work() as cur:
+            cur.execute("SELECT COUNT(*) FROM Categories WHERE name=?",
+                        (new_name,))
+            if cur.fetchone()[0] > 0:
+                raise BudgetError(
+                    "A category already exists with that name.")
+
+            # Update the database for this record.
+            sql = "UPDATE Categories SET name=? WHERE name=?"
+            cur.execute(sql, (new_name, self.name))
+
         # Update variable in memory
         self.name = new_name
 
-        cur.close()
-        press_key_to_continue()
+    @timed
+    def reassign_category_transactions(self):
+        """Ask the user for another category, then move every transaction
+        assigned to this one into it. The category itself (and its assigned
+        funds) is kept."""
 
-    def update_category_value(self):
+        print("\nChoose the category to move the transactions of {}"
+              " to.\n".format(self.name))
+        target = Category.choose_x(self.budget)
+        if target is None:
+            # User wants to cancel.
+            return
+        try:
+            count = self.reassign_transactions(target.name)
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+        else:
+            print("\nYou have moved {} transaction{} from {} to {}.".format(
+                count, "" if count == 1 else "s", self.name, target.name))
+        press_key_to_continue()
 
-        cur = conn.cursor()
+    @timed
+    def merge_category(self):
+        """Ask the user for another category, then merge this one into it.
+        Returns 1 if this category was merged (and so no longer exists), or
+        0 otherwise."""
 
-        old_minus = "-$" if self.value < 0 else "$"
-        text = "Your category's value is currently {}{:,.2f}.".format(
-            old_minus,
-            abs(self.value),
+        print("\nChoose the category to merge {} into.\n".format(self.name))
+        target = Category.choose_x(self.budget)
+        if target is None:
+            # User wants to cancel.
+            return 0
+        if target.name == self.name:
+            print("\nA category can't be merged into itself.")
+            press_key_to_continue()
+            return 0
+        text = "\nAre you sure that you want to merge the {} category into" \
+               " {}? Its transactions and assigned funds will be moved," \
+               " and then {} will be deleted. ".format(
+                    self.name, target.name, self.name)
+        confirmation = input_validation(
+            text + "Enter 1 for yes, 0 for no: ",
+            int,
+            num_lb=0,
+            num_ub=1,
             )
+        if confirmation == 1:
+            try:
+                count = self.merge_into(target.name)
+            except BudgetError as error:
+                print("\n{} No change was made.".format(error))
+                confirmation = 0
+            else:
+                print("\nYou have merged {} (with {} transaction{}) into"
+                      " {}.".format(self.name, count,
+                                    "" if count == 1 else "s", target.name))
+        press_key_to_continue()
+        return confirmation
+
+    def reassign_transactions(self, target_name, merge=False):
+        """Move every transaction assigned to this category into the one
+        called target_name, without prompting the user, as a single bulk
+        change. Returns the number of transactions moved. Raises BudgetError
+        if there is no such category, or it's this one.
+
+        :param target_name: The name of the category to move them to.
+        :param merge: If set, also move this category's assigned funds and
+        then delete it, in the same unit of work.
+        """
+
+        if target_name == self.name and merge:
+            raise BudgetError("A category can't be merged into itself.")
+        if target_name == self.name:
+            raise BudgetError("The transactions are already in that"
+                              " category.")
+        with self.budget.bulk_change(
+                "WHERE category_id=(SELECT id FROM Categories WHERE name=?)",
+                (self.name,),
+                totals=("category",),
+                ) as cur:
+            cur.execute("SELECT id FROM Categories WHERE name=?",
+                        (target_name,))
+            row = cur.fetchone()
+            if row is None:
+                raise BudgetError(
+                    "There is no category called {}.".format(target_name))
+            cur.execute("UPDATE Transactions SET category_id=? WHERE uid IN ("
+                        "SELECT uid FROM BulkSelection)", (row[0],))
+            count = cur.rowcount
+            if merge:
+                # The transactions have already been taken out of this
+                # category's value, so what's left is its assigned funds.
+                cur.execute("UPDATE Categories SET"
+                            " value=value+(SELECT value FROM Categories"
+                            " WHERE name=:source),"
+                            " assigned=assigned+(SELECT assigned"
+                            " FROM Categories WHERE name=:source)"
+                            " WHERE id=:target",
+                            {"source": self.name, "target": row[0]})
+                # Its recurring transactions would otherwise be deleted
+                # with it.
+                cur.execute("UPDATE RecurringTransactions SET category_id=?"
+                            " WHERE category_id=(SELECT id FROM Categories"
+                            " WHERE name=?)", (row[0], self.name))
+                cur.execute("DELETE FROM Categories WHERE name=?",
+                            (self.name,))
+
+        # Update variable in memory
+        if not merge:
+            self.value = Money(self.budget.fetch_value(
+                "SELECT value FROM Categories WHERE name=?", (self.name,)))
+        return count
+
+    def merge_into(self, target_name):
+        """Move every transaction assigned to this category, and its
+        assigned funds, into the one called target_name, then delete this
+        category. Nothing is prompted, and it's done as a single bulk change.
+        Returns the number of transactions moved. Raises BudgetError if there
+        is no such category, or it's this one."""
+
+        return self.reassign_transactions(target_name, merge=True)
+
+    @timed
+    def update_category_value(self):
+
+        text = "Your category's value is currently {}.".format(
+            format_money(self.value))
         print("\n%s" % text)
-        text = "Your total amount of unassigned funds is ${:,.2f}.".format(
-            Category.unassigned_funds)
+        text = "Your total amount of unassigned funds is {}.".format(
+            format_money(self.budget.unassigned_funds))
         print(text)
 
-        if self.value <= 0 and Category.unassigned_funds == 0:
+        if self.value <= 0 and self.budget.unassigned_funds == 0:
             # In this special case, user can't make any changes.
             print("Since neither of these are positive, you can't update"
                   " the value right now.")
             press_key_to_continue()
-            cur.close()
             return
 
         if self.value < 0:
@@ -514,51 +2288,47 @@ class Category(BaseClass):
 
         new_value = input_validation(
             output,
-            float,
+            Money,
             num_lb=min(0, self.value),
-            num_ub=Category.unassigned_funds + self.value,
+            num_ub=self.budget.unassigned_funds + self.value,
             empty_string_allowed=True,
             )
 
         if new_value == '':
             # User wants to cancel.
-            cur.close()
             return
 
         if new_value == self.value:
             # Input is the same as the current value.
             print("\nNo change was made.")
             press_key_to_continue()
-            cur.close()
             return
 
-        # Update unassigned_funds.
-        Category.unassigned_funds -= (new_value - self.value)
+        # Update the database for this record. The change in value is
+        # also a change in the funds assigned to the category.
+        with self.budget.unit_of_work() as cur:
+            sql = "UPDATE Categories SET assigned=assigned+?-value, value=?" \
+                  " WHERE name=?"
+            cur.execute(sql, (new_value, new_value, self.name))
 
-        # Update the database for this record.
-        sql = "UPDATE Categories SET value=? WHERE name=?"
-        cur.execute(sql, (new_value, self.name))
-        conn.commit()
+        # Update unassigned_funds.
+        self.budget.unassigned_funds -= (new_value - self.value)
 
         # Inform the user of the result.
-        new_minus = "-$" if new_value < 0 else "$"
-        output = "You have changed the category value from {}{:,.2f} to" \
-                 " {}{:,.2f}.".format(
-                    old_minus,
-                    abs(self.value),
-                    new_minus,
-                    abs(new_value),
+        output = "You have changed the category value from {} to" \
+                 " {}.".format(
+                    format_money(self.value),
+                    format_money(new_value),
                     )
         print("\n%s" % output)
 
         # Update variable in memory
         self.value = new_value
 
-        cur.close()
         press_key_to_continue()
 
     @classmethod
-    def menu_for_categories(cls):
+    def menu_for_categories(cls, budget):
         """Provide user with information regarding the category menu then
         direct them to the appropriate functions."""
 
@@ -570,14 +2340,15 @@ class Category(BaseClass):
             choice = recite_menu_options(CATEGORY_MENU_OPTIONS)
             if choice == 1:
                 Category.display_x(
-                    summary_attr=cls.unassigned_funds,
+                    budget,
+                    summary_attr=budget.unassigned_funds,
                     summary_attr_name=cls.unassigned_funds_name,
                     )
             elif choice == 2:
-                Category.new_category()
+                Category.new_category(budget)
             elif choice == 3:
                 print()
-                instance = Category.choose_x()
+                instance = Category.choose_x(budget)
                 if instance is not None:
                     # Object instance is now in memory.
                     # Present user with category instance menu.
@@ -597,12 +2368,18 @@ class Category(BaseClass):
                             instance.update_category_value()
                         elif choice2 == 3:
                             Transaction.display_x(
-                                'WHERE category="{}"'.format(instance.name))
+                                budget,
+                                TransactionFilter(category=instance.name))
                         elif choice2 == 4:
+                            instance.reassign_category_transactions()
+                        elif choice2 == 5:
+                            if instance.merge_category():
+                                break
+                        elif choice2 == 6:
                             confirmation = instance.delete_category()
                             if confirmation:
                                 break
-                        elif choice2 == 5:
+                        elif choice2 == 7:
                             break
                     print("\n~~You are now returning to the categories"
                           " menu.~~")
@@ -610,7 +2387,7 @@ class Category(BaseClass):
                 break
 
     @staticmethod
-    def instantiate(attributes):
+    def instantiate(budget, attributes):
         """Given the attribute fields as input, this method instantiates a
         single object and returns it. The database query that produces the
         input is performed elsewhere. The order of the attributes in the
@@ -618,8 +2395,9 @@ class Category(BaseClass):
         order of the attributes in the code below."""
 
         return Category(
-            name=str(attributes[0]),    # str() is added for Python 2.X users
-            value=attributes[1],
+            budget=budget,
+            name=attributes[0],
+            value=Money(attributes[1]),
             )
 
 # ____________________________________________________________________________#
@@ -627,7 +2405,10 @@ class Category(BaseClass):
 
 class Transaction(BaseClass):
 
-    table_name = "Transactions"
+    # Transactions are read through a view which adds the names of their
+    # accounts and categories. Changes are made to Transactions itself.
+    table_name = "TransactionDetails"
+    key_column = "uid"
     display_col_names = [
         "payee",
         "amount",
@@ -636,8 +2417,31 @@ class Transaction(BaseClass):
         "category",
         "memo",
         ]
+    __slots__ = (
+        "budget",
+        "uid",
+        "account",
+        "category",
+        "amount",
+        "payee",
+        "date",
+        "memo",
+        "transfer_uid",
+        )
 
-    def __init__(self, uid, account, category, amount, payee, date, memo):
+    def __init__(
+            self,
+            budget,
+            uid,
+            account,
+            category,
+            amount,
+            payee,
+            date,
+            memo,
+            transfer_uid=None,
+            ):
+        self.budget = budget
         self.uid = uid
         self.account = account
         self.category = category
@@ -645,9 +2449,12 @@ class Transaction(BaseClass):
         self.payee = payee
         self.date = date
         self.memo = memo
+        # The uid of the other leg, if this is one leg of a transfer.
+        self.transfer_uid = transfer_uid
 
     @staticmethod
-    def new_transaction():
+    @timed
+    def new_transaction(budget):
         """Prompt the user to complete the fields and then create a transaction
         with that information. By design, this method does not restrict the
         user from entering an amount that would cause the category's value
@@ -655,7 +2462,7 @@ class Transaction(BaseClass):
         amount that would cause the account's balance to become negative."""
 
         # Verify that at least one account and at least one category exist.
-        cur = conn.cursor()
+        cur = budget.connection.cursor()
         cur.execute("SELECT COUNT(*) FROM Accounts")
         if cur.fetchone()[0] == 0:
             # Accounts table is empty. Direct user back to transactions menu.
@@ -677,7 +2484,8 @@ class Transaction(BaseClass):
 
 
         # Instantiate the Transactions class, to be filled in piece by piece.
-        instance = Transaction(None, None, None, None, None, None, None)
+        instance = Transaction(budget, None, None, None, None, None, None,
+                               None)
 
 
         # Determine whether transaction is an inflow or an outflow.
@@ -711,7 +2519,7 @@ class Transaction(BaseClass):
                  " Enter a blank line to cancel: "
         amount = input_validation(
             output,
-            float,
+            Money,
             num_lb=0,
             empty_string_allowed=True,
             )
@@ -721,16 +2529,14 @@ class Transaction(BaseClass):
             cur.close()
             press_key_to_continue()
             return
-        # Amount is valid, but may have extra decimal places (beyond 2).
-        amount = round(amount, 2)
-        output = "Amount entered: ${:,.2f}.".format(amount)
+        output = "Amount entered: {}.".format(format_money(amount))
         print("\n%s" % output)
         instance.amount = amount * -1 if is_expense else amount
 
 
         # Ask user to choose an account.
         print("Choose an account to fund this transaction with.")
-        account_choice = Account.choose_x()
+        account_choice = Account.choose_x(budget)
         if account_choice is None:
             # User wants to cancel.
             print("\nCanceling this transaction.")
@@ -740,10 +2546,11 @@ class Transaction(BaseClass):
         else:
             if abs(instance.amount) > account_choice.balance and is_expense:
                 output = "\nThe selected account's balance is too low" \
-                         " (${:,.2f}). Please add at least ${:,.2f} to the" \
+                         " ({}). Please add at least {} to the" \
                          " account and then try again.".format(
-                            account_choice.balance,
-                            abs(instance.amount) - account_choice.balance,
+                            format_money(account_choice.balance),
+                            format_money(
+                                abs(instance.amount) - account_choice.balance),
                             )
                 print(output)
                 print("Canceling this transaction.")
@@ -777,7 +2584,7 @@ class Transaction(BaseClass):
                 )
         if assign_category:
             print("Assign a category to this transaction.")
-            category_choice = Category.choose_x()
+            category_choice = Category.choose_x(budget)
             if category_choice is None:
                 # User wants to cancel.
                 print("\nCanceling this transaction.")
@@ -841,76 +2648,268 @@ class Transaction(BaseClass):
             instance.memo = memo
 
 
-        # Now assign a UID to the transaction.
-        cur.execute("SELECT MAX(uid) FROM Transactions")
-        uid_max = cur.fetchone()[0]
-        instance.uid = 1 if uid_max is None else uid_max + 1
+        # It's finally time to add this record to the database. The
+        # balances it affects are updated by the database's triggers.
+        cur.close()
+        with budget.unit_of_work() as cur:
+            # SQLite assigns the UID, since uid is an alias for the
+            # table's rowid.
+            cur.execute(INSERT_TRANSACTION_SQL, (
+                instance.account,
+                instance.category,
+                instance.amount,
+                instance.payee,
+                instance.date,
+                instance.memo
+                )
+            )
+            instance.uid = cur.lastrowid
+
+        # The transaction has been saved, so update the totals in memory.
+        budget.refresh_totals()
+
+
+        # Inform the user of success.
+        print("\nYour transaction has been successfully added!")
+        press_key_to_continue()
+
+    @staticmethod
+    @timed
+    def new_transfer(budget):
+        """Prompt the user for two accounts, an amount, a date and a memo,
+        then move the money from one account to the other. No category is
+        involved, so the unassigned funds don't change."""
+
+        if budget.fetch_value("SELECT COUNT(*) FROM Accounts") < 2:
+            print("\nYou need at least two accounts to make a transfer.")
+            press_key_to_continue()
+            return
 
+        print("\nChoose the account to transfer money from.")
+        from_account = Account.choose_x(budget)
+        if from_account is None:
+            # User wants to cancel.
+            print("\nCanceling this transfer.")
+            press_key_to_continue()
+            return
+        print("\nChoose the account to transfer money to.")
+        while True:
+            to_account = Account.choose_x(budget)
+            if to_account is None:
+                # User wants to cancel.
+                print("\nCanceling this transfer.")
+                press_key_to_continue()
+                return
+            if to_account.name == from_account.name:
+                print("\nChoose a different account from the one the money"
+                      " comes from.")
+                continue
+            break
 
-        # It's finally time to add this record to the database.
-        cur.execute('INSERT INTO Transactions VALUES(?,?,?,?,?,?,?)', (
-            instance.uid,
-            instance.account,
-            instance.category,
-            instance.amount,
-            instance.payee,
-            instance.date,
-            instance.memo
+        output = "How much do you want to transfer from {} to {}? Enter a" \
+                 " blank line to cancel: ".format(
+                    from_account.name, to_account.name)
+        amount = input_validation(
+            output,
+            Money,
+            num_lb=0,
+            empty_string_allowed=True,
             )
-        )
-        conn.commit()
+        if amount == '':
+            # User wants to cancel.
+            print("\nCanceling this transfer.")
+            press_key_to_continue()
+            return
+        if amount > from_account.balance:
+            output = "\nThe balance of {} is too low ({}). Please add at" \
+                     " least {} to the account and then try again.".format(
+                        from_account.name,
+                        format_money(from_account.balance),
+                        format_money(amount - from_account.balance),
+                        )
+            print(output)
+            print("Canceling this transfer.")
+            press_key_to_continue()
+            return
+
+        output = "Enter a date for this transfer (MM/DD/YYYY), or a blank" \
+                 " line to cancel: "
+        date = input_validation(
+            output,
+            dt,
+            empty_string_allowed=True
+            )
+        if date == '':
+            # User wants to cancel.
+            print("\nCanceling this transfer.")
+            press_key_to_continue()
+            return
 
+        output = "Add an (optional) memo here: "
+        memo = input_validation(
+            output,
+            str,
+            empty_string_allowed=True,
+            )
 
-        # Update the category's value (or unassigned_funds value).
-        if instance.category is not None:
-            cur.execute("UPDATE Categories SET value=value+? WHERE name=?",
-                        (instance.amount, instance.category))
-            conn.commit()
+        try:
+            Transaction.add_transfer(budget, from_account.name,
+                                     to_account.name, amount, date,
+                                     memo or None)
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
         else:
-            # Since the transaction doesn't deduct funds from any category,
-            # it must instead deduct funds from unassigned_funds.
-            # This only happens when transaction is income, not expense.
-            Category.unassigned_funds += instance.amount
+            print("\nYou have transferred {} from {} to {}.".format(
+                format_money(amount), from_account.name, to_account.name))
+        press_key_to_continue()
+
+    @staticmethod
+    def add_transfer(budget, from_account, to_account, amount, date,
+                     memo=None):
+        """Move money from one account to another, without prompting the
+        user. Both legs of the transfer (an outflow from from_account and an
+        inflow to to_account, neither with a category) are written as a
+        single unit of work, each referring to the other by its uid.
+        Returns the uids of the two legs, outflow first. Raises BudgetError
+        if the accounts are the same or don't exist, the amount isn't
+        positive, or from_account's balance is too low.
+
+        :param from_account: The name of the account to take money from.
+        :param to_account: The name of the account to put it in.
+        :param amount: The Money to move.
+        :param date: The date of the transfer.
+        :param memo: An optional memo for both legs.
+        """
+
+        if from_account == to_account:
+            raise BudgetError("Money can't be transferred to the account it"
+                              " comes from.")
+        if amount <= 0:
+            raise BudgetError("The amount of a transfer must be more than"
+                              " {}.".format(format_money(Money(0))))
+        with budget.unit_of_work() as cur:
+            balances = {}
+            for name in (from_account, to_account):
+                cur.execute("SELECT balance FROM Accounts WHERE name=?",
+                            (name,))
+                row = cur.fetchone()
+                if row is None:
+                    raise BudgetError(
+                        "There is no account called {}.".format(name))
+                balances[name] = row[0]
+            if balances[from_account] < amount:
+                raise BudgetError("The balance of {} is too low.".format(
+                    from_account))
+
+            # The legs are linked once both exist, since each one's
+            # transfer_uid must refer to a transaction that's already there.
+            cur.execute(INSERT_TRANSACTION_SQL, (
+                from_account, None, -amount,
+                Transaction.transfer_payee(-amount, to_account), date, memo))
+            outflow = cur.lastrowid
+            cur.execute(INSERT_TRANSACTION_SQL, (
+                to_account, None, amount,
+                Transaction.transfer_payee(amount, from_account), date,
+                memo))
+            inflow = cur.lastrowid
+            cur.executemany(
+                "UPDATE Transactions SET transfer_uid=? WHERE uid=?",
+                [(inflow, outflow), (outflow, inflow)])
+
+        # The total balance, and so the unassigned funds, haven't changed.
+        return outflow, inflow
 
+    @staticmethod
+    def transfer_payee(amount, other_account):
+        """Return the payee given to a leg of a transfer, which names the
+        account of the other leg.
 
-        # Update the account's value, as well as total_account_balance.
-        cur.execute('UPDATE Accounts SET balance=balance+? WHERE name=?',
-                    (instance.amount, instance.account))
-        conn.commit()
-        Account.total_account_balance += instance.amount
+        :param amount: The amount of the leg, which is negative for the
+        outflow.
+        :param other_account: The name of the other leg's account.
+        """
 
+        if amount < 0:
+            return "Transfer To {}".format(other_account)
+        return "Transfer From {}".format(other_account)
 
-        # Inform the user of success.
-        print("\nYour transaction has been successfully added!")
-        cur.close()
-        press_key_to_continue()
+    @staticmethod
+    def rename_transfer_payees(cur, account_name):
+        """Before the transactions listed in BulkSelection are moved to the
+        account called account_name, give the other leg of each transfer
+        among them the payee which names that account, unless the user has
+        changed it. Used by bulk changes.
+
+        :param cur: The cursor of the bulk change's unit of work.
+        :param account_name: The name of the account they're moving to.
+        """
+
+        cur.execute("SELECT transfer_uid, -amount, account FROM"
+                    " TransactionDetails WHERE uid IN (SELECT uid FROM"
+                    " BulkSelection) AND transfer_uid IS NOT NULL")
+        cur.executemany(
+            "UPDATE Transactions SET payee=? WHERE uid=? AND payee=?",
+            [(Transaction.transfer_payee(amount, account_name), uid,
+              Transaction.transfer_payee(amount, old_account))
+             for uid, amount, old_account in cur.fetchall()])
+
+    def transfer_account(self):
+        """Return the name of the account of the other leg of this
+        transfer, or None if this transaction isn't part of one."""
+
+        if self.transfer_uid is None:
+            return None
+        return self.budget.fetch_value(
+            "SELECT account FROM TransactionDetails WHERE uid=?",
+            (self.transfer_uid,))
 
+    @timed
     def delete_transaction(self):
         """Ask user for confirmation before deleting, and then delete."""
 
-        cur = conn.cursor()
+        cur = self.budget.connection.cursor()
         cur.execute("SELECT balance FROM Accounts WHERE name=?",
                     (self.account,))
-        account_bal = cur.fetchall()[0][0]
+        account_bal = Money(cur.fetchall()[0][0])
+        other_account = self.transfer_account()
+        if other_account is not None:
+            cur.execute("SELECT balance FROM Accounts WHERE name=?",
+                        (other_account,))
+            other_bal = Money(cur.fetchone()[0])
         if account_bal < self.amount:
             # Account balance would become negative, not allowed.
             output = "Deleting this transaction would cause the {}" \
                      " account's balance to become negative. Try again" \
-                     " once at least ${:,.2f} is added to the account's" \
+                     " once at least {} is added to the account's" \
                      " current balance.".format(
                         self.account,
-                        self.amount - account_bal,
+                        format_money(self.amount - account_bal),
+                        )
+            print("\n%s" % output)
+            press_key_to_continue()
+            confirmation = 0
+
+        elif other_account is not None and other_bal < -self.amount:
+            # Deleting a transfer also takes the money back out of the
+            # account it went into.
+            output = "Deleting this transfer would cause the {} account's" \
+                     " balance to become negative. Try again once at least" \
+                     " {} is added to the account's current balance.".format(
+                        other_account,
+                        format_money(-self.amount - other_bal),
                         )
             print("\n%s" % output)
             press_key_to_continue()
             confirmation = 0
 
-        elif self.category is None and Category.unassigned_funds < self.amount:
+        elif self.category is None and other_account is None and \
+                self.budget.unassigned_funds < self.amount:
             # unassigned_funds would become negative, not allowed.
             output = "Deleting this transaction would cause the Unassigned" \
                      " Funds to become negative. Try again once at least" \
-                     " ${:,.2f}  is added to the Unassigned Funds.".format(
-                        self.amount - Category.unassigned_funds)
+                     " {} is added to the Unassigned Funds.".format(
+                        format_money(
+                            self.amount - self.budget.unassigned_funds))
             print("\n%s" % output)
             press_key_to_continue()
             confirmation = 0
@@ -919,6 +2918,11 @@ class Transaction(BaseClass):
             # Ask the user to confirm that the transaction should be deleted.
             output = "\nAre you sure that you want to delete this" \
                      " transaction? Enter 1 for yes, 0 for no: "
+            if other_account is not None:
+                output = "\nAre you sure that you want to delete this" \
+                         " transfer? The transaction in {} will be deleted" \
+                         " as well. Enter 1 for yes, 0 for no: ".format(
+                            other_account)
             confirmation = input_validation(
                 output,
                 int,
@@ -926,33 +2930,24 @@ class Transaction(BaseClass):
                 num_ub=1,
                 )
 
+        cur.close()
         if confirmation:
-            # Delete the transaction.
-            cur.execute("UPDATE Accounts SET balance=balance-? WHERE name=?",
-                        (self.amount, self.account))
-            conn.commit()
-            Account.total_account_balance -= self.amount
-
-            if self.category is None:
-                # Funds were originally added to unassigned_funds (income).
-                Category.unassigned_funds -= self.amount
-            else:
-                # Funds were originally taken from self.category.
-                cur.execute("UPDATE Categories SET value=value-? WHERE name=?",
-                            (self.amount, self.category))
-                conn.commit()
-
-            cur.execute("DELETE FROM Transactions WHERE uid=?", (self.uid,))
-            conn.commit()
+            # Delete the transaction. Its effect on balances is undone by
+            # the database's triggers.
+            with self.budget.unit_of_work() as cur:
+                # A transfer's two legs are deleted together.
+                cur.execute("DELETE FROM Transactions WHERE uid IN (?,?)",
+                            (self.uid, self.transfer_uid))
+            self.budget.refresh_totals()
             print("\nYou have successfully deleted this transaction.")
             press_key_to_continue()
 
-        cur.close()
         return confirmation
 
+    @timed
     def update_transaction_account(self):
 
-        cur = conn.cursor()
+        cur = self.budget.connection.cursor()
 
         text = "Your transaction's account is currently {}.".format(
             self.account)
@@ -962,7 +2957,7 @@ class Transaction(BaseClass):
         # afford to lose the transaction (if it is income).
         cur.execute("SELECT balance FROM Accounts WHERE name=?",
                     (self.account,))
-        old_account_bal = cur.fetchone()[0]
+        old_account_bal = Money(cur.fetchone()[0])
         if old_account_bal < self.amount:
             # The old account's balance is too low.
             print("The balance of this transaction's current account "
@@ -975,8 +2970,9 @@ class Transaction(BaseClass):
 
         # User will choose an account (or will choose to cancel).
         # Make sure the account the user selects won't become negative.
+        other_account = self.transfer_account()
         while True:
-            obj = Account.choose_x()
+            obj = Account.choose_x(self.budget)
             if obj is None:
                 # User wants to cancel.
                 cur.close()
@@ -987,6 +2983,11 @@ class Transaction(BaseClass):
                 press_key_to_continue()
                 cur.close()
                 return
+            if obj.name == other_account:
+                # Both legs of a transfer can't be in the same account.
+                print("\nThe other side of this transfer is in that"
+                      " account, so you can't select it.")
+                continue
             if obj.balance < abs(self.amount) and self.amount < 0:
                 # The new account's balance is too low.
                 print("\nThe balance of the account you selected is"
@@ -995,20 +2996,23 @@ class Transaction(BaseClass):
             break
         new_account = obj.name
 
-        # Update old account balance.
-        cur.execute('UPDATE Accounts SET balance=balance-? WHERE name=?',
-                    (self.amount, self.account))
-        conn.commit()
-
-        # Update new account balance.
-        cur.execute('UPDATE Accounts SET balance=balance+? WHERE name=?',
-                    (self.amount, new_account))
-        conn.commit()
-
-        # Update the database for this record.
-        sql = "UPDATE Transactions SET account=? WHERE uid=?"
-        cur.execute(sql, (new_account, self.uid))
-        conn.commit()
+        cur.close()
+        with self.budget.unit_of_work() as cur:
+            # Update the database for this record. The database's triggers
+            # move the amount from the old account to the new one.
+            sql = "UPDATE Transactions SET account_id=(" \
+                  "SELECT id FROM Accounts WHERE name=?) WHERE uid=?"
+            cur.execute(sql, (new_account, self.uid))
+            if other_account is not None:
+                # The other leg's payee names this leg's account, unless
+                # the user has changed it.
+                sql = "UPDATE Transactions SET payee=? WHERE uid=? AND" \
+                      " payee=?"
+                cur.execute(sql, (
+                    Transaction.transfer_payee(-self.amount, new_account),
+                    self.transfer_uid,
+                    Transaction.transfer_payee(-self.amount, self.account),
+                    ))
 
         # Inform the user of the result.
         output = "You have changed the transaction account" \
@@ -1021,12 +3025,15 @@ class Transaction(BaseClass):
         # Update variable in memory
         self.account = new_account
 
-        cur.close()
         press_key_to_continue()
 
+    @timed
     def update_transaction_category(self):
 
-        cur = conn.cursor()
+        if self.transfer_uid is not None:
+            print("\nA transfer between accounts doesn't have a category.")
+            press_key_to_continue()
+            return
 
         old_display = 'not set' if self.category is None else self.category
         text = "Your transaction's category is currently {}.".format(
@@ -1056,48 +3063,29 @@ class Transaction(BaseClass):
             elif choice == 1:
                 # Create a temporary Categories object whose
                 # attributes are all None.
-                obj = Category.instantiate((None, None))
-                obj.name = None     # Nonetype instead of string 'None'.
+                obj = Category(self.budget, name=None, value=None)
             else:
-                obj = Category.choose_x()
+                obj = Category.choose_x(self.budget)
         else:
-            obj = Category.choose_x()
+            obj = Category.choose_x(self.budget)
 
         if obj is None:
             # User wants to cancel.
-            cur.close()
             return
         if obj.name == self.category:
             # Input is the same as the current value.
             print("\nNo change was made.")
             press_key_to_continue()
-            cur.close()
             return
         new_category = obj.name
 
-        if self.category is None:
-            # Update unassigned_funds.
-            # Transaction is income, so self.amount is always > 0.
-            Category.unassigned_funds -= self.amount
-        else:
-            # Update old category value.
-            cur.execute('UPDATE Categories SET value=value-? WHERE name=?',
-                        (self.amount, self.category))
-            conn.commit()
-
-        if new_category is None:
-            # Transaction is income (not expense).
-            Category.unassigned_funds += self.amount
-        else:
-            # Update new category value.
-            cur.execute('UPDATE Categories SET value=value+? WHERE name=?',
-                        (self.amount, new_category))
-            conn.commit()
-
-        # Update the database for this record.
-        sql = "UPDATE Transactions SET category=? WHERE uid=?"
-        cur.execute(sql, (new_category, self.uid))
-        conn.commit()
+        with self.budget.unit_of_work() as cur:
+            # Update the database for this record. The database's triggers
+            # move the amount from the old category to the new one.
+            sql = "UPDATE Transactions SET category_id=(" \
+                  "SELECT id FROM Categories WHERE name=?) WHERE uid=?"
+            cur.execute(sql, (new_category, self.uid))
+        self.budget.refresh_totals()
 
         # Inform the user of the result.
         new_display = 'not set' if new_category is None else new_category
@@ -1111,28 +3099,29 @@ class Transaction(BaseClass):
         # Update variable in memory
         self.category = new_category
 
-        cur.close()
         press_key_to_continue()
 
+    @timed
     def update_transaction_amount(self):
 
-        cur = conn.cursor()
+        if self.transfer_uid is not None:
+            self.update_transfer_amount()
+            return
+
+        cur = self.budget.connection.cursor()
 
-        old_minus = "-$" if self.amount < 0 else "$"
-        text = "Your transaction's amount is currently {}{:,.2f}.".format(
-            old_minus,
-            abs(self.amount),
-            )
+        text = "Your transaction's amount is currently {}.".format(
+            format_money(self.amount))
         print("\n%s" % text)
 
         sql = "SELECT balance FROM Accounts WHERE name=?"
         cur.execute(sql, (self.account,))
-        trans_account_bal = cur.fetchone()[0]
+        trans_account_bal = Money(cur.fetchone()[0])
         output = "Enter a new amount for this transaction (or enter a " \
                  "blank line to cancel): "
         new_amount = input_validation(
             output,
-            float,
+            Money,
             num_lb=((-1) * trans_account_bal) + self.amount,
             empty_string_allowed=True
             )
@@ -1149,80 +3138,111 @@ class Transaction(BaseClass):
             cur.close()
             return
 
-        # Update associated category value (if there is one).
-        sql = "SELECT value FROM Categories WHERE name=?"
-        cur.execute(sql, (self.category,))
-        if len(cur.fetchall()) > 0:
-            # Update associated category value.
-            sql = "UPDATE Categories SET value=value+? WHERE name=?"
-            cur.execute(sql, (new_amount - self.amount, self.category))
-            conn.commit()
-        else:
-            # There is no associated Category for this transaction, meaning
-            # transaction was originally income (not an expense).
-            if new_amount >= 0:
-                # Transaction remains an income transaction.
-                # Update unassigned_funds.
-                Category.unassigned_funds += (new_amount - self.amount)
-            else:
-                # Transaction was switched from income to expense, and
-                # it has no category assigned to it.
-                text = "Since you are changing this transaction from" \
-                       " income to an expense, it now needs a category" \
-                       " assigned to it."
-                print("\n%s" % text)
-
-                cat_obj = Category.choose_x()
-                if cat_obj is None:
-                    # User wants to cancel.
-                    cur.close()
-                    return
-
-                # Assign category to transaction in database and memory.
-                sql = "UPDATE Transactions SET category=? WHERE uid=?"
-                cur.execute(sql, (cat_obj.name, self.uid))
-                conn.commit()
-                self.category = cat_obj.name
-
-                # Update category value in database.
-                sql = 'UPDATE Categories SET value=value+? WHERE name=?'
-                cur.execute(sql, (new_amount, cat_obj.name))
-                conn.commit()
+        cur.close()
 
-                # Update unassigned_funds.
-                Category.unassigned_funds -= self.amount
+        # Work out which category (if any) the change in amount belongs to.
+        new_category = self.category
+        if self.category is None and new_amount < 0:
+            # Transaction was switched from income to expense, and
+            # it has no category assigned to it.
+            text = "Since you are changing this transaction from" \
+                   " income to an expense, it now needs a category" \
+                   " assigned to it."
+            print("\n%s" % text)
 
-        # Update associated account balance.
-        sql = "UPDATE Accounts SET balance=balance+? WHERE name=?"
-        cur.execute(sql, (new_amount - self.amount, self.account))
-        conn.commit()
-        Account.total_account_balance += (new_amount - self.amount)
+            cat_obj = Category.choose_x(self.budget)
+            if cat_obj is None:
+                # User wants to cancel.
+                return
+            new_category = cat_obj.name
 
-        # Update the database for this record.
-        sql = "UPDATE Transactions SET amount=? WHERE uid=?"
-        cur.execute(sql, (new_amount, self.uid))
-        conn.commit()
+        with self.budget.unit_of_work() as cur:
+            # Update the database for this record. The database's triggers
+            # adjust the account's balance and the category's value.
+            sql = "UPDATE Transactions SET amount=?, category_id=(" \
+                  "SELECT id FROM Categories WHERE name=?) WHERE uid=?"
+            cur.execute(sql, (new_amount, new_category, self.uid))
+        self.budget.refresh_totals()
 
         # Inform the user of the result.
-        new_minus = "-$" if new_amount < 0 else "$"
         output = "You have changed the transaction amount" \
-                 " from {}{:,.2f} to {}{:,.2f}.".format(
-                    old_minus,
-                    abs(self.amount),
-                    new_minus,
-                    abs(new_amount),
+                 " from {} to {}.".format(
+                    format_money(self.amount),
+                    format_money(new_amount),
                     )
         print("\n%s" % output)
 
-        # Update variable in memory
+        # Update variables in memory
         self.amount = new_amount
+        self.category = new_category
 
-        cur.close()
         press_key_to_continue()
 
-    def update_transaction_payee(self):
+    def update_transfer_amount(self):
+        """Ask the user for a new amount for this transfer, and change both
+        of its legs, so that the money still leaves one account and arrives
+        in the other."""
+
+        text = "This transfer's amount is currently {}.".format(
+            format_money(abs(self.amount)))
+        print("\n%s" % text)
+        output = "Enter a new amount for this transfer (or enter a blank" \
+                 " line to cancel): "
+        new_amount = input_validation(
+            output,
+            Money,
+            num_lb=0,
+            empty_string_allowed=True
+            )
+
+        if new_amount == '':
+            # User wants to cancel.
+            return
+        if new_amount == abs(self.amount):
+            # Input is the same as the current value.
+            print("\nNo change was made.")
+            press_key_to_continue()
+            return
+
+        try:
+            self.change_transfer_amount(new_amount)
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+        else:
+            print("\nYou have changed the transfer's amount to {}.".format(
+                format_money(new_amount)))
+        press_key_to_continue()
+
+    def change_transfer_amount(self, amount):
+        """Change the amount of this transfer, without prompting the user.
+        Both legs are changed as a single unit of work. Raises BudgetError,
+        and changes nothing, if the amount isn't positive or either
+        account's balance would become negative.
+
+        :param amount: The new amount, as a positive Money.
+        """
+
+        if amount <= 0:
+            raise BudgetError("The amount of a transfer must be more than"
+                              " {}.".format(format_money(Money(0))))
+        with self.budget.unit_of_work() as cur:
+            # The database's triggers adjust both accounts' balances.
+            cur.execute("UPDATE Transactions SET amount=CASE WHEN amount<0"
+                        " THEN ? ELSE ? END WHERE uid IN (?,?)",
+                        (-amount, amount, self.uid, self.transfer_uid))
+            cur.execute("SELECT name FROM Accounts WHERE balance<0 AND id IN"
+                        " (SELECT account_id FROM Transactions"
+                        " WHERE uid IN (?,?))", (self.uid, self.transfer_uid))
+            row = cur.fetchone()
+            if row is not None:
+                raise BudgetError("The balance of {} would become"
+                                  " negative.".format(row[0]))
 
-        cur = conn.cursor()
+        # Update variable in memory
+        self.amount = Money(-amount if self.amount < 0 else amount)
+
+    @timed
+    def update_transaction_payee(self):
 
         text = "Your transaction's payee is currently {}.".format(self.payee)
         print("\n%s" % text)
@@ -1237,19 +3257,17 @@ class Transaction(BaseClass):
 
         if new_payee == '':
             # User wants to cancel.
-            cur.close()
             return
         if new_payee == self.payee:
             # Input is the same as the current value.
             print("\nNo change was made.")
             press_key_to_continue()
-            cur.close()
             return
 
         # Update the database for this record.
-        sql = "UPDATE Transactions SET payee=? WHERE uid=?"
-        cur.execute(sql, (new_payee, self.uid))
-        conn.commit()
+        with self.budget.unit_of_work() as cur:
+            sql = "UPDATE Transactions SET payee=? WHERE uid=?"
+            cur.execute(sql, (new_payee, self.uid))
 
         # Inform the user of the result.
         output = "You have changed the account payee from {} to {}.".format(
@@ -1261,13 +3279,11 @@ class Transaction(BaseClass):
         # Update variable in memory
         self.payee = new_payee
 
-        cur.close()
         press_key_to_continue()
 
+    @timed
     def update_transaction_date(self):
 
-        cur = conn.cursor()
-
         text = "Your transaction's date is currently {}.".format(
             self.date.strftime('%m/%d/%Y'))
         print("\n%s" % text)
@@ -1281,19 +3297,18 @@ class Transaction(BaseClass):
 
         if new_date == '':
             # User wants to cancel.
-            cur.close()
             return
         if new_date == self.date:
             # Input is the same as the current value.
             print("\nNo change was made.")
             press_key_to_continue()
-            cur.close()
             return
 
-        # Update the database for this record.
-        sql = "UPDATE Transactions SET date=? WHERE uid=?"
-        cur.execute(sql, (new_date, self.uid))
-        conn.commit()
+        # Update the database for this record, and for the other leg if
+        # it's a transfer.
+        with self.budget.unit_of_work() as cur:
+            sql = "UPDATE Transactions SET date=? WHERE uid IN (?,?)"
+            cur.execute(sql, (new_date, self.uid, self.transfer_uid))
 
         # Inform the user of the result.
         output = "You have changed the transaction date from {} to {}.".format(
@@ -1305,13 +3320,11 @@ class Transaction(BaseClass):
         # Update variable in memory
         self.date = new_date
 
-        cur.close()
         press_key_to_continue()
 
+    @timed
     def update_transaction_memo(self):
 
-        cur = conn.cursor()
-
         old_display = 'not set' if self.memo is None else self.memo
         text = "Your transaction's memo is currently {}.".format(
             old_display)
@@ -1331,7 +3344,6 @@ class Transaction(BaseClass):
         if new_memo == '':
             if self.memo is None:
                 # The field can't be cleared, so cancel this decision.
-                cur.close()
                 return
             else:
                 # User either wants to cancel this decision, or
@@ -1352,20 +3364,18 @@ class Transaction(BaseClass):
                     new_memo = None
                 else:
                     # Cancel.
-                    cur.close()
                     return
 
         if new_memo == self.memo:
             # Input is the same as the current value.
             print("\nNo change was made.")
             press_key_to_continue()
-            cur.close()
             return
 
         # Update the database for this record.
-        sql = "UPDATE Transactions SET memo=? WHERE uid=?"
-        cur.execute(sql, (new_memo, self.uid))
-        conn.commit()
+        with self.budget.unit_of_work() as cur:
+            sql = "UPDATE Transactions SET memo=? WHERE uid=?"
+            cur.execute(sql, (new_memo, self.uid))
 
         # Inform the user of the result.
         new_display = 'not set' if new_memo is None else new_memo
@@ -1378,200 +3388,796 @@ class Transaction(BaseClass):
         # Update variable in memory
         self.memo = new_memo
 
-        cur.close()
         press_key_to_continue()
 
     @staticmethod
-    def menu_for_transactions():
+    def menu_for_transactions(budget):
         """Provide user with information regarding the transactions menu then
          direct them to the appropriate functions."""
 
-        # TODO: Add option for new_transfer (separate method from new_transaction).
-
         print("\n~~You are now in the transactions menu.~~")
         while True:
             menu_header({"TRANSACTIONS MENU": ""})
             choice = recite_menu_options(TRANSACTION_MENU_OPTIONS)
             if choice == 1:
-                Transaction.display_x()
+                Transaction.display_x(budget)
             elif choice == 2:
-                Transaction.new_transaction()
+                Transaction.new_transaction(budget)
             elif choice == 3:
+                Transaction.new_transfer(budget)
+            elif choice == 4:
                 print()
-                instance = Transaction.choose_x()
+                instance = Transaction.choose_x(budget)
                 if instance is not None:
-                    # Object instance is now in memory.
-                    # Present user with transaction instance menu.
-                    print("\nYou have selected your transaction.")
-                    press_key_to_continue()
-                    while True:
-                        # Display the selected transaction's attributes at the
-                        # top of the menu.
-                        menu_header({
-                            "Payee:": instance.payee,
-                            "Amount:": instance.amount,
-                            "Date:": instance.date,
-                            "Account:": instance.account,
-                            "Category:": instance.category,
-                            "Memo:": instance.memo,
-                            })
-                        choice2 = recite_menu_options(
-                            TRANSACTION_INSTANCE_OPTIONS)
-                        if choice2 == 1:
-                            instance.update_transaction_account()
-                        elif choice2 == 2:
-                            instance.update_transaction_category()
-                        elif choice2 == 3:
-                            instance.update_transaction_amount()
-                        elif choice2 == 4:
-                            instance.update_transaction_payee()
-                        elif choice2 == 5:
-                            instance.update_transaction_date()
-                        elif choice2 == 6:
-                            instance.update_transaction_memo()
-                        elif choice2 == 7:
-                            confirmation = instance.delete_transaction()
-                            if confirmation:
-                                break
-                        elif choice2 == 8:
-                            break
-                    print("\n~~You are now returning to the "
-                          "transaction menu.~~")
-            elif choice == 4:
+                    instance.menu_for_transaction()
+            elif choice == 5:
+                instance = Transaction.search_x(budget)
+                if instance is not None:
+                    instance.menu_for_transaction()
+            elif choice == 6:
+                Transaction.menu_for_filter(budget)
+            elif choice == 7:
+                Transaction.import_file(budget)
+            elif choice == 8:
+                Transaction.export_file(budget)
+            elif choice == 9:
+                RecurringTransaction.menu_for_recurring(budget)
+            elif choice == 10:
                 break
 
     @staticmethod
-    def instantiate(attributes):
-        """Given the attribute fields as input, this method instantiates a
-        single object and returns it. The database query that produces the
-        input is performed elsewhere. The order of the attributes in the
-        inputs (represented by the index subscript) must match up with the
-        order of the attributes in the code below."""
-
-        # The below two lines are added for Python 2.X users.
-        temp_c = attributes[2] if attributes[2] is None else str(attributes[2])
-        temp_m = attributes[6] if attributes[6] is None else str(attributes[6])
-
-        return Transaction(
-            uid=attributes[0],
-            account=str(attributes[1]),   # str() is added for Python 2.X users
-            category=temp_c,
-            amount=attributes[3],
-            payee=str(attributes[4]),     # str() is added for Python 2.X users
-            date=attributes[5],
-            memo=temp_m,
-            )
-
-# ____________________________________________________________________________#
+    def menu_for_filter(budget):
+        """Let the user build up a TransactionFilter, then browse or select
+        the transactions which match it."""
 
+        query = TransactionFilter()
+        print("\n~~You are now filtering your transactions.~~")
+        while True:
+            menu_header(query.describe())
+            choice = recite_menu_options(TRANSACTION_FILTER_OPTIONS)
+            if choice == 1:
+                Transaction.display_x(budget, query)
+            elif choice == 2:
+                print()
+                instance = Transaction.choose_x(budget, query)
+                if instance is not None:
+                    instance.menu_for_transaction()
+            elif choice == 3:
+                print("\nCancel to include every account.\n")
+                account_choice = Account.choose_x(budget)
+                query.account = None if account_choice is None \
+                    else account_choice.name
+            elif choice == 4:
+                print("\nCancel to include every category.\n")
+                category_choice = Category.choose_x(budget)
+                query.category = None if category_choice is None \
+                    else category_choice.name
+            elif choice == 5:
+                output = "\nEnter the earliest date to include" \
+                         " (MM/DD/YYYY), or a blank line for no limit: "
+                start_date = input_validation(
+                    output, dt, empty_string_allowed=True)
+                output = "Enter the latest date to include (MM/DD/YYYY)," \
+                         " or a blank line for no limit: "
+                end_date = input_validation(
+                    output, dt, empty_string_allowed=True)
+                query.start_date = start_date or None
+                query.end_date = end_date or None
+            elif choice == 6:
+                output = "\nEnter the smallest amount to include (negative" \
+                         " for an expense), or a blank line for no limit: "
+                min_amount = input_validation(
+                    output, Money, empty_string_allowed=True)
+                output = "Enter the largest amount to include, or a blank" \
+                         " line for no limit: "
+                max_amount = input_validation(
+                    output, Money, empty_string_allowed=True)
+                # Zero is a valid limit, so only the empty string means none.
+                query.min_amount = None if min_amount == '' else min_amount
+                query.max_amount = None if max_amount == '' else max_amount
+            elif choice == 7:
+                output = "\nEnter text which the payee must contain, or a" \
+                         " blank line to include every payee: "
+                payee = input_validation(
+                    output, str, empty_string_allowed=True)
+                query.payee = payee or None
+            elif choice == 8:
+                print("\nHow should the transactions be ordered?")
+                for i in range(len(TRANSACTION_SORT_ORDERS)):
+                    print("Press {} for {}.".format(
+                        i + 1, TRANSACTION_SORT_ORDERS[i][0]))
+                query.sort_order = input_validation(
+                    "Enter your choice here: ",
+                    int,
+                    num_lb=1,
+                    num_ub=len(TRANSACTION_SORT_ORDERS),
+                    ) - 1
+            elif choice == 9:
+                query = TransactionFilter()
+            elif choice == 10:
+                Transaction.bulk_edit_x(budget, query, "category")
+            elif choice == 11:
+                Transaction.bulk_edit_x(budget, query, "account")
+            elif choice == 12:
+                Transaction.bulk_edit_x(budget, query, "delete")
+            elif choice == 13:
+                break
+        print("\n~~You are now returning to the transaction menu.~~")
 
-class Account(BaseClass):
+    @staticmethod
+    @timed
+    def bulk_edit_x(budget, query, action):
+        """Move every transaction matching query to another category or
+        account (asking the user which), or delete them all, after showing
+        the user how many would change and the impact on each balance.
+
+        :param action: "category", "account" or "delete", as for BulkEdit.
+        """
+
+        target = None
+        if action != "delete":
+            print("\nChoose the {} to move the matching transactions"
+                  " to.\n".format(action))
+            if action == "category":
+                obj = Category.choose_x(budget)
+            else:
+                obj = Account.choose_x(budget)
+            if obj is None:
+                # User wants to cancel.
+                return
+            target = obj.name
 
-    total_account_balance = 0
-    tot_account_bal_name = "Total Account Balance"
-    table_name = "Accounts"
-    display_col_names = [
-        "name",
-        "balance",
-        ]
+        edit = BulkEdit(budget, query, action, target)
+        try:
+            count, changes = edit.preview()
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+            press_key_to_continue()
+            return
+        if count == 0:
+            print("\nNo transactions would change.")
+            press_key_to_continue()
+            return
+        plural = "" if count == 1 else "s"
+        if action == "delete":
+            print("\n{} transaction{} will be deleted.".format(count, plural))
+        else:
+            print("\n{} transaction{} will be moved to the {} {}.".format(
+                count, plural, target, action))
+        if len(changes) > 0:
+            print("These totals will change:\n")
+            Transaction.print_rows(changes, ["total", "change", "after"])
+        try:
+            edit.check(changes)
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+            press_key_to_continue()
+            return
 
-    def __init__(self, name, balance):
-        self.name = name
-        self.balance = balance
+        confirmation = input_validation(
+            "\nAre you sure? Enter 1 for yes, 0 for no: ",
+            int,
+            num_lb=0,
+            num_ub=1,
+            )
+        if confirmation == 1:
+            try:
+                count = edit.apply()
+            except BudgetError as error:
+                print("\n{} No change was made.".format(error))
+            else:
+                print("\nYou have {} {} transaction{}.".format(
+                    "deleted" if action == "delete" else "moved",
+                    count, "" if count == 1 else "s"))
+        press_key_to_continue()
 
-    @classmethod
-    def new_account(cls):
-        """Prompt the user for a name and a number, then create an account
-         with that name and balance."""
+    def menu_for_transaction(self):
+        """Present the user with the transaction instance menu for this
+        transaction, which is now in memory."""
 
-        cur = conn.cursor()
-        print()
+        print("\nYou have selected your transaction.")
+        press_key_to_continue()
         while True:
-            name = input_validation(
-                "What do you want to call your new account?"
-                " Enter a blank line to cancel: ",
-                str,
-                empty_string_allowed=True,
-                )
-            if name == '':
-                # User wants to cancel this decision.
-                cur.close()
-                return
-            cur.execute("SELECT COUNT(*) FROM Accounts WHERE name=?", (name,))
-            check = cur.fetchone()[0]
-            if check == 0:
-                # The name which the user entered is not already
-                # in the Accounts table.
+            # Display the selected transaction's attributes at the
+            # top of the menu.
+            header = {
+                "Payee:": self.payee,
+                "Amount:": self.amount,
+                "Date:": self.date,
+                "Account:": self.account,
+                "Category:": self.category,
+                "Memo:": self.memo,
+                }
+            if self.transfer_uid is not None:
+                header["Transfer with:"] = self.transfer_account()
+            menu_header(header)
+            choice = recite_menu_options(TRANSACTION_INSTANCE_OPTIONS)
+            if choice == 1:
+                self.update_transaction_account()
+            elif choice == 2:
+                self.update_transaction_category()
+            elif choice == 3:
+                self.update_transaction_amount()
+            elif choice == 4:
+                self.update_transaction_payee()
+            elif choice == 5:
+                self.update_transaction_date()
+            elif choice == 6:
+                self.update_transaction_memo()
+            elif choice == 7:
+                confirmation = self.delete_transaction()
+                if confirmation:
+                    break
+            elif choice == 8:
                 break
-            else:
-                print("\nAn account already exists with that name. "
-                      "Please choose a different name.")
-                continue
+        print("\n~~You are now returning to the transaction menu.~~")
 
-        # Now that the name is accepted, prompt the user to add
-        # a starting account balance.
-        print("\nOkay! You added a new account called %s." % name)
-        balance = input_validation(
-            "Please enter a starting account balance (must be non-negative): ",
-            float,
-            num_lb=0,
-            )
+    @staticmethod
+    @timed
+    def search_x(budget):
+        """Ask the user what to search for, then present the best matching
+        transactions and ask for a selection.
 
-        # Balance is valid, but may have extra decimal places (beyond 2).
-        balance = round(balance, 2)
-        print("\nStarting account balance for {} is ${:,.2f}.".format(
-            name, balance))
+        :return: The selected Transaction, or None if the user cancels or
+        nothing matches.
+        """
 
-        # Account name and balance have been approved, so add them to the
-        # accounts table in the database.
-        cur.execute('INSERT INTO Accounts VALUES(?,?)', (name, balance))
-        conn.commit()
-
-        # Create a transaction for the starting balance.
-        cur.execute("SELECT MAX(uid) FROM Transactions")
-        uid_max = cur.fetchone()[0]
-        temp_uid = 1 if uid_max is None else uid_max + 1
-        cur.execute("INSERT INTO Transactions Values(?,?,?,?,?,?,?)", (
-            temp_uid,
-            name,
-            None,
-            balance,
-            "Starting Balance",
-            dt.today(),
-            None,
+        output = "\nEnter words to look for in payees and memos, or a blank" \
+                 " line to cancel: "
+        text = input_validation(output, str, empty_string_allowed=True)
+        if text == '':
+            # User wants to cancel.
+            return None
+        matches = Transaction.search(budget, text)
+        if len(matches) == 0:
+            print("\nNo transactions match your search.")
+            press_key_to_continue()
+            return None
+
+        print("\nHere are the best matches:\n")
+        Transaction.print_rows(
+            matches,
+            Transaction.display_col_names,
+            show_nums=True,
             )
-        )
-        conn.commit()
+        print()
+        choice_number = input_validation(
+            "Enter the number in front of the transaction you wish to"
+            " select, or enter 0 to cancel: ",
+            int,
+            num_lb=0,
+            num_ub=len(matches),
+            )
+        if choice_number == 0:
+            return None
+        return matches[choice_number - 1]
+
+    @staticmethod
+    def search(budget, text, limit=PAGE_SIZE):
+        """Find the transactions whose payee or memo contains every word of
+        text (or a word beginning with it), best matches first. The
+        TransactionSearch full-text index is used if the budget has one;
+        otherwise the payees and memos are scanned.
+
+        :param budget: The budget to search.
+        :param text: The words to look for.
+        :param limit: The most transactions to return.
+        :return: A list of Transaction objects.
+        """
+
+        words = text.split()
+        if len(words) == 0:
+            return []
+        if budget.fetch_value(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name=?",
+                ("TransactionSearch",)):
+            # Quote each word, so that it's never taken for FTS5 syntax,
+            # and let it match the beginning of a longer word.
+            query = " ".join(
+                '"{}"*'.format(word.replace('"', '""')) for word in words)
+            rows = budget.fetch_rows(
+                "SELECT TransactionDetails.* FROM TransactionSearch"
+                " JOIN TransactionDetails"
+                " ON TransactionDetails.uid=TransactionSearch.rowid"
+                " WHERE TransactionSearch MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit))
+        else:
+            conditions = []
+            params = []
+            for word in words:
+                conditions.append("(payee LIKE ? OR memo LIKE ?)")
+                pattern = "%{}%".format(word)
+                params += [pattern, pattern]
+            rows = budget.fetch_rows(
+                "SELECT * FROM TransactionDetails WHERE {} ORDER BY date DESC"
+                " LIMIT ?".format(" AND ".join(conditions)),
+                params + [limit])
+        return [Transaction.instantiate(budget, row) for row in rows]
+
+    @staticmethod
+    @timed
+    def import_file(budget):
+        """Ask the user for a CSV, OFX or QFX file and add every transaction
+        in it to the budget. Nothing is added unless the whole file is
+        valid."""
+
+        output = "Enter the path of the CSV, OFX or QFX file to import, or" \
+                 " enter a blank line to cancel: "
+        path = input_validation(
+            output,
+            str,
+            empty_string_allowed=True,
+            )
+        if path == '':
+            # User wants to cancel.
+            return
+        path = os.path.expanduser(path)
+        extension = os.path.splitext(path)[1].lower()
+        if not os.path.isfile(path):
+            print("\nThere is no file at {}.".format(path))
+            press_key_to_continue()
+            return
+        if extension not in ('.csv', '.ofx', '.qfx'):
+            print("\nOnly CSV, OFX and QFX files can be imported.")
+            press_key_to_continue()
+            return
+
+        default_account = None
+        default_category = None
+        if extension != '.csv':
+            # Bank statements don't know the names of the budget's accounts
+            # and categories, so ask for them.
+            print("\nChoose the account that these transactions belong to.")
+            account_choice = Account.choose_x(budget)
+            if account_choice is None:
+                # User wants to cancel.
+                return
+            default_account = account_choice.name
+            print("\nChoose a category for the expenses in this file.")
+            category_choice = Category.choose_x(budget)
+            if category_choice is None:
+                # User wants to cancel.
+                return
+            default_category = category_choice.name
+
+        try:
+            if extension == '.csv':
+                with open_data_file(path, 'r') as csv_file:
+                    count = Transaction.import_records(
+                        budget,
+                        read_csv_transactions(csv_file))
+            else:
+                with io.open(path, encoding='utf-8', errors='replace') \
+                        as ofx_file:
+                    count = Transaction.import_records(
+                        budget,
+                        read_ofx_transactions(ofx_file),
+                        default_account,
+                        default_category,
+                        )
+        except BudgetError as error:
+            print("\n{} No transactions were imported.".format(error))
+        else:
+            print("\nYou have successfully imported {} transaction{}.".format(
+                count, "" if count == 1 else "s"))
+        press_key_to_continue()
+
+    @staticmethod
+    def import_records(
+            budget,
+            records,
+            default_account=None,
+            default_category=None,
+            ):
+        """Validate a stream of transactions read from a file and add them to
+        the database as a single unit of work. Transactions are inserted in
+        batches of BATCH_SIZE, and the database's triggers update the
+        balances they affect.
+
+        :param records: An iterable of (location, record) pairs, such as
+        read_csv_transactions produces. Each record is a dict of raw text
+        keyed by field name (date, payee, amount, account, category, memo).
+        :param default_account: The account for records that don't name one.
+        :param default_category: The category for expenses that don't name
+        one.
+        :return: The number of transactions imported.
+        Raises BudgetError, having saved nothing, if any record breaks the
+        rules that apply to new transactions.
+        """
+
+        count = 0
+        batch = []
+        accounts_used = set()
+        sql = INSERT_TRANSACTION_SQL
+
+        with budget.unit_of_work() as cur:
+            cur.execute("SELECT name FROM Accounts")
+            account_names = set(row[0] for row in cur.fetchall())
+            cur.execute("SELECT name FROM Categories")
+            category_names = set(row[0] for row in cur.fetchall())
+
+            for location, record in records:
+                row, error_output = Transaction.validate_record(
+                    record,
+                    account_names,
+                    category_names,
+                    default_account,
+                    default_category,
+                    )
+                if error_output is not None:
+                    raise BudgetError("There is a problem with {} of the"
+                                      " file: {}".format(location,
+                                                         error_output))
+                accounts_used.add(row[0])
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    cur.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if len(batch) > 0:
+                cur.executemany(sql, batch)
+                count += len(batch)
+
+            # Account balances aren't allowed to become negative.
+            for name in accounts_used:
+                cur.execute("SELECT balance FROM Accounts WHERE name=?",
+                            (name,))
+                if cur.fetchone()[0] < 0:
+                    raise BudgetError("The {} account's balance would become"
+                                      " negative.".format(name))
+
+        # The transactions have been saved, so update the totals in memory.
+        budget.refresh_totals()
+        return count
+
+    @staticmethod
+    @timed
+    def export_file(budget):
+        """Ask the user for a file name and (optional) filters, then write
+        the matching transactions to a CSV or JSON Lines file."""
+
+        output = "Enter the path of the file to export to (ending in .csv" \
+                 " or .jsonl), or enter a blank line to cancel: "
+        while True:
+            path = input_validation(
+                output,
+                str,
+                empty_string_allowed=True,
+                )
+            if path == '':
+                # User wants to cancel.
+                return
+            path = os.path.expanduser(path)
+            extension = os.path.splitext(path)[1].lower()
+            if extension not in EXPORT_FORMATS:
+                print("\nThe file name must end in .csv or .jsonl.")
+                continue
+            break
+        if os.path.exists(path):
+            output = "\nThere is already a file at {}. Do you want to" \
+                     " replace it? Enter 1 for yes, 0 for no: ".format(path)
+            if not input_validation(output, int, num_lb=0, num_ub=1):
+                return
+
+        # Ask for the (optional) filters.
+        output = "\nEnter the earliest date to export (MM/DD/YYYY), or a" \
+                 " blank line to start from the beginning: "
+        start_date = input_validation(output, dt, empty_string_allowed=True)
+        output = "Enter the latest date to export (MM/DD/YYYY), or a" \
+                 " blank line to continue to the end: "
+        end_date = input_validation(output, dt, empty_string_allowed=True)
+        account = None
+        output = "Do you want to export a single account's transactions?" \
+                 " Enter 1 for yes, 0 for no: "
+        if input_validation(output, int, num_lb=0, num_ub=1):
+            account_choice = Account.choose_x(budget)
+            if account_choice is None:
+                # User wants to cancel.
+                return
+            account = account_choice.name
+        category = None
+        output = "Do you want to export a single category's transactions?" \
+                 " Enter 1 for yes, 0 for no: "
+        if input_validation(output, int, num_lb=0, num_ub=1):
+            category_choice = Category.choose_x(budget)
+            if category_choice is None:
+                # User wants to cancel.
+                return
+            category = category_choice.name
+
+        query = TransactionFilter(
+            account=account,
+            category=category,
+            start_date=start_date or None,
+            end_date=end_date or None,
+            )
+        with open_data_file(path, 'w') as out_file:
+            count = Transaction.export_records(
+                budget,
+                out_file,
+                EXPORT_FORMATS[extension],
+                query,
+                )
+        print("\nYou have successfully exported {} transaction{}.".format(
+            count, "" if count == 1 else "s"))
+        press_key_to_continue()
+
+    @staticmethod
+    def export_records(
+            budget,
+            out_file,
+            file_format,
+            query=None,
+            ):
+        """Write transactions straight from the database to a file, BATCH_SIZE
+        rows at a time, so memory use stays the same however many
+        transactions there are.
+
+        :param out_file: A file opened with open_data_file.
+        :param file_format: Either 'csv', which uses the layout that
+        read_csv_transactions expects, or 'jsonl' (one JSON object per line).
+        :param query: If given, a TransactionFilter which restricts the
+        transactions exported. They are always exported in date order.
+        :return: The number of transactions exported.
+        """
+
+        where_clause, params = ("", []) if query is None else query.where()
+
+        if file_format == 'csv':
+            writer = csv.writer(out_file)
+            writer.writerow(
+                ['Date', 'Payee', 'Amount', 'Account', 'Category', 'Memo'])
+
+        count = 0
+        cur = budget.connection.cursor()
+        cur.execute(
+            "SELECT uid, account, category, amount, payee, date, memo"
+            " FROM TransactionDetails {} ORDER BY date, uid".format(
+                where_clause),
+            params,
+            )
+        while True:
+            rows = cur.fetchmany(BATCH_SIZE)
+            if len(rows) == 0:
+                break
+            for uid, account, category, amount, payee, date, memo in rows:
+                amount = Money(amount).to_text()
+                if file_format == 'csv':
+                    writer.writerow([
+                        date.strftime("%m/%d/%Y"),
+                        payee,
+                        amount,
+                        account,
+                        '' if category is None else category,
+                        '' if memo is None else memo,
+                        ])
+                else:
+                    # Amounts are written as text so that they stay exact.
+                    out_file.write(json.dumps({
+                        'uid': uid,
+                        'date': date.isoformat(),
+                        'payee': payee,
+                        'amount': amount,
+                        'account': account,
+                        'category': category,
+                        'memo': memo,
+                        }, sort_keys=True) + "\n")
+            count += len(rows)
         cur.close()
+        return count
+
+    @staticmethod
+    def validate_record(
+            record,
+            account_names,
+            category_names,
+            default_account=None,
+            default_category=None,
+            ):
+        """Check a transaction read from a file against the same rules as
+        new_transaction, converting its fields along the way.
+
+        :param record: A dict of raw text keyed by field name.
+        :param account_names: The names of all accounts in the budget.
+        :param category_names: The names of all categories in the budget.
+        :param default_account: The account to use if none is given.
+        :param default_category: The category to use for an expense if none
+        is given.
+        :return: A tuple of (row, error_output). If the record is valid, row
+        is a tuple of (account, category, amount, payee, date, memo) and
+        error_output is None; otherwise row is None and error_output
+        explains the problem.
+        """
+
+        def field(name):
+            value = record.get(name)
+            return '' if value is None else value.strip()
+
+        if field('date') == '':
+            return None, "A date is required."
+        date, error_output = validate_input(field('date'), dt)
+        if error_output is not None:
+            return None, error_output
+
+        if field('payee') == '':
+            return None, "A payee is required."
+        payee, error_output = validate_input(
+            field('payee'),
+            str,
+            is_titlecased=True,
+            )
+        if error_output is not None:
+            return None, error_output
+
+        if field('amount') == '':
+            return None, "An amount is required."
+        amount, error_output = validate_input(field('amount'), Money)
+        if error_output is not None:
+            return None, error_output
+
+        account = field('account') or default_account
+        if account is None:
+            return None, "An account is required."
+        if account not in account_names:
+            return None, "There is no account called {}.".format(account)
+
+        category = field('category') or None
+        if category is None and amount < 0:
+            # Expenses must have a category.
+            category = default_category
+            if category is None:
+                return None, "Expenses must have a category."
+        if category is not None and category not in category_names:
+            return None, "There is no category called {}.".format(category)
+
+        memo = field('memo') or None
+        return (account, category, amount, payee, date, memo), None
 
-        # Finally, update the class attribute for total account balance.
-        cls.total_account_balance += balance
-        Category.unassigned_funds += balance
+    @staticmethod
+    def instantiate(budget, attributes):
+        """Given the attribute fields as input, this method instantiates a
+        single object and returns it. The database query that produces the
+        input is performed elsewhere. The order of the attributes in the
+        inputs (represented by the index subscript) must match up with the
+        order of the attributes in the code below."""
+
+        # Names and payees repeat from one transaction to the next, so
+        # interning them keeps a single copy of each in memory.
+        account, category, payee = attributes[1], attributes[2], attributes[4]
+        return Transaction(
+            budget,
+            attributes[0],
+            intern(account),
+            category if category is None else intern(category),
+            Money(attributes[3]),
+            payee if payee is None else intern(payee),
+            attributes[5],
+            attributes[6],
+            attributes[9],
+            )
+
+# ____________________________________________________________________________#
+
+
+class Account(BaseClass):
+
+    tot_account_bal_name = "Total Account Balance"
+    table_name = "Accounts"
+    key_column = "rowid"
+    display_col_names = [
+        "name",
+        "balance",
+        ]
+    __slots__ = ("budget", "name", "balance")
+
+    def __init__(self, budget, name, balance):
+        self.budget = budget
+        self.name = name
+        self.balance = balance
+
+    @classmethod
+    @timed
+    def new_account(cls, budget):
+        """Prompt the user for a name and a number, then create an account
+         with that name and balance."""
+
+        cur = budget.connection.cursor()
+        print()
+        while True:
+            name = input_validation(
+                "What do you want to call your new account?"
+                " Enter a blank line to cancel: ",
+                str,
+                empty_string_allowed=True,
+                )
+            if name == '':
+                # User wants to cancel this decision.
+                cur.close()
+                return
+            cur.execute("SELECT COUNT(*) FROM Accounts WHERE name=?", (name,))
+            check = cur.fetchone()[0]
+            if check == 0:
+                # The name which the user entered is not already
+                # in the Accounts table.
+                break
+            else:
+                print("\nAn account already exists with that name. "
+                      "Please choose a different name.")
+                continue
+
+        # Now that the name is accepted, prompt the user to add
+        # a starting account balance.
+        print("\nOkay! You added a new account called %s." % name)
+        balance = input_validation(
+            "Please enter a starting account balance (must be non-negative): ",
+            Money,
+            num_lb=0,
+            )
+        print("\nStarting account balance for {} is {}.".format(
+            name, format_money(balance)))
+
+        # Account name and balance have been approved, so add them to the
+        # accounts table in the database.
+        cur.close()
+        cls.add_account(budget, name, balance)
         press_key_to_continue()
 
+    @classmethod
+    def add_account(cls, budget, name, balance=Money(0)):
+        """Create an account, along with a transaction for its starting
+        balance, without prompting the user. Raises BudgetError if the name
+        is taken or the balance is negative."""
+
+        if balance < 0:
+            raise BudgetError("A starting account balance can't be negative.")
+
+        with budget.unit_of_work() as cur:
+            cur.execute("SELECT COUNT(*) FROM Accounts WHERE name=?", (name,))
+            if cur.fetchone()[0] > 0:
+                raise BudgetError("An account already exists with that name.")
+            # The starting balance is added to the account by the database's
+            # triggers, when its transaction is created.
+            cur.execute("INSERT INTO Accounts(name, balance) VALUES(?,?)",
+                        (name, Money(0)))
+
+            # Create a transaction for the starting balance.
+            cur.execute(INSERT_TRANSACTION_SQL, (
+                name,
+                None,
+                balance,
+                "Starting Balance",
+                dt.today(),
+                None,
+                )
+            )
+
+        # Finally, update the totals in memory.
+        budget.refresh_totals()
+
+    @timed
     def delete_account(self):
         """Present user with list of existing accounts, then delete the one
          corresponding to the user's selection."""
 
         # Confirm that there are zero transactions assigned to this account.
-        cur = conn.cursor()
-        sql = "SELECT COUNT(*) FROM Transactions WHERE Account=?"
+        cur = self.budget.connection.cursor()
+        sql = "SELECT COUNT(*) FROM Transactions WHERE account_id=(" \
+              "SELECT id FROM Accounts WHERE name=?)"
         cur.execute(sql, (self.name,))
         temp = cur.fetchone()[0]
         if temp > 0:
             # There are transactions assigned to this account.
             if temp == 1:
-                output = "There is 1 transaction assigned to {}." \
-                         " Reassign that transaction to another" \
-                         " account or delete it, and then try" \
-                         " again.".format(self.name)
+                output = "There is 1 transaction assigned to {}. Move it" \
+                         " to another account (or merge {} into another" \
+                         " account) first.".format(self.name, self.name)
             else:
-                output = "There are {} transactions assigned to {}." \
-                         " Reassign those transactions to other" \
-                         " accounts or delete them, and then try" \
-                         " again.".format(
+                output = "There are {} transactions assigned to {}. Move" \
+                         " them to another account (or merge {} into" \
+                         " another account) first.".format(
                             temp,
                             self.name,
+                            self.name,
                             )
             print("\n%s" % output)
             cur.close()
@@ -1588,20 +4194,22 @@ class Account(BaseClass):
             num_lb=0,
             num_ub=1,
             )
+        cur.close()
         if confirmation == 1:
             # Delete the account.
-            cur.execute("DELETE FROM Accounts WHERE name=?", (self.name,))
-            conn.commit()
+            with self.budget.unit_of_work() as cur:
+                cur.execute("DELETE FROM Accounts WHERE name=?",
+                            (self.name,))
             text = "You have successfully deleted %s from your " \
                    "list of accounts." % self.name
             print("\n%s" % text)
-            cur.close()
             press_key_to_continue()
         return confirmation
 
+    @timed
     def update_account_name(self):
 
-        cur = conn.cursor()
+        cur = self.budget.connection.cursor()
 
         text = "Your account's name is currently {}.".format(self.name)
         print("\n%s" % text)
@@ -1637,32 +4245,179 @@ class Account(BaseClass):
                 continue
             break
 
-        # Update the database for this record.
-        sql = "UPDATE Accounts SET name=? WHERE name=?"
-        cur.execute(sql, (new_name, self.name))
-        conn.commit()
-
-        # Also update the database for other records which depend
-        # on this record.
-        sql = "UPDATE Transactions SET account=? WHERE account=?"
-        cur.execute(sql, (new_name, self.name))
-        conn.commit()
+        cur.close()
+        old_name = self.name
+        self.rename(new_name)
 
         # Inform the user of the result.
         output = "You have changed the account name from {} to {}.".format(
-            self.name,
+            old_name,
             new_name,
         )
         print("\n%s" % output)
 
+        press_key_to_continue()
+
+    def rename(self, new_name):
+        """Rename this account without prompting the user. Its transactions
+        refer to it by id, so they don't change, but the other leg of each
+        of its transfers is given the payee which names the new name, unless
+        the user has changed it. Raises BudgetError if the name is taken."""
+
+        with self.budget.unit_of_work() as cur:
+            cur.execute("SELECT COUNT(*) FROM Accounts WHERE name=?",
+                        (new_name,))
+            if cur.fetchone()[0] > 0:
+                raise BudgetError(
+                    "An account already exists with that name.")
+
+            # Update the database for this record.
+            sql = "UPDATE Accounts SET name=? WHERE name=?"
+            cur.execute(sql, (new_name, self.name))
+
+            cur.execute("SELECT uid, amount FROM Transactions WHERE"
+                        " transfer_uid IN (SELECT uid FROM Transactions"
+                        " WHERE account_id=(SELECT id FROM Accounts WHERE"
+                        " name=?))", (new_name,))
+            cur.executemany(
+                "UPDATE Transactions SET payee=? WHERE uid=? AND payee=?",
+                [(Transaction.transfer_payee(amount, new_name), uid,
+                  Transaction.transfer_payee(amount, self.name))
+                 for uid, amount in cur.fetchall()])
+
         # Update variable in memory
         self.name = new_name
 
-        cur.close()
+    @timed
+    def reassign_account_transactions(self):
+        """Ask the user for another account, then move every transaction
+        assigned to this one into it. The account itself is kept, with a
+        balance of zero."""
+
+        print("\nChoose the account to move the transactions of {}"
+              " to.\n".format(self.name))
+        target = Account.choose_x(self.budget)
+        if target is None:
+            # User wants to cancel.
+            return
+        try:
+            count = self.reassign_transactions(target.name)
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+        else:
+            print("\nYou have moved {} transaction{} from {} to {}.".format(
+                count, "" if count == 1 else "s", self.name, target.name))
         press_key_to_continue()
 
+    @timed
+    def merge_account(self):
+        """Ask the user for another account, then merge this one into it.
+        Returns 1 if this account was merged (and so no longer exists), or 0
+        otherwise."""
+
+        print("\nChoose the account to merge {} into.\n".format(self.name))
+        target = Account.choose_x(self.budget)
+        if target is None:
+            # User wants to cancel.
+            return 0
+        if target.name == self.name:
+            print("\nAn account can't be merged into itself.")
+            press_key_to_continue()
+            return 0
+        text = "\nAre you sure that you want to merge the {} account into" \
+               " {}? Its transactions will be moved, and then {} will be" \
+               " deleted. ".format(self.name, target.name, self.name)
+        confirmation = input_validation(
+            text + "Enter 1 for yes, 0 for no: ",
+            int,
+            num_lb=0,
+            num_ub=1,
+            )
+        if confirmation == 1:
+            try:
+                count = self.merge_into(target.name)
+            except BudgetError as error:
+                print("\n{} No change was made.".format(error))
+                confirmation = 0
+            else:
+                print("\nYou have merged {} (with {} transaction{}) into"
+                      " {}.".format(self.name, count,
+                                    "" if count == 1 else "s", target.name))
+        press_key_to_continue()
+        return confirmation
+
+    def reassign_transactions(self, target_name, merge=False):
+        """Move every transaction assigned to this account into the one
+        called target_name, without prompting the user, as a single bulk
+        change. Returns the number of transactions moved. Transfers between
+        the two accounts are deleted instead, and aren't counted. Raises
+        BudgetError if there is no such account, or it's this one.
+
+        :param target_name: The name of the account to move them to.
+        :param merge: If set, also delete this account, in the same unit of
+        work.
+        """
+
+        if target_name == self.name and merge:
+            raise BudgetError("An account can't be merged into itself.")
+        if target_name == self.name:
+            raise BudgetError("The transactions are already in that"
+                              " account.")
+        target_id = self.budget.fetch_value(
+            "SELECT id FROM Accounts WHERE name=?", (target_name,))
+        if target_id is None:
+            raise BudgetError(
+                "There is no account called {}.".format(target_name))
+        # The transfers between the two accounts are selected as well, with
+        # both legs, so that they can be deleted: both legs can't be in one
+        # account, and each transfer comes to nothing once they would be.
+        transfers = "account_id=? AND transfer_uid IN (SELECT uid FROM" \
+                    " Transactions WHERE account_id=(SELECT id FROM" \
+                    " Accounts WHERE name=?))"
+        totals = ("account",)
+        if self.budget.fetch_value(
+                "SELECT COUNT(*) FROM Transactions WHERE " + transfers,
+                (target_id, self.name)) > 0:
+            # Deleting them takes them out of the monthly rollups of the
+            # categories as well (transfers are totalled under 0 there).
+            totals = ("account", "category")
+        with self.budget.bulk_change(
+                "WHERE account_id=(SELECT id FROM Accounts WHERE name=?) OR"
+                " ({})".format(transfers),
+                (self.name, target_id, self.name),
+                totals=totals,
+                ) as cur:
+            cur.execute("DELETE FROM Transactions WHERE uid IN (SELECT uid"
+                        " FROM BulkSelection) AND transfer_uid IN (SELECT"
+                        " uid FROM BulkSelection)")
+            Transaction.rename_transfer_payees(cur, target_name)
+            cur.execute("UPDATE Transactions SET account_id=? WHERE uid IN ("
+                        "SELECT uid FROM BulkSelection)", (target_id,))
+            count = cur.rowcount
+            if merge:
+                # Its recurring transactions would otherwise be deleted
+                # with it.
+                cur.execute("UPDATE RecurringTransactions SET account_id=?"
+                            " WHERE account_id=(SELECT id FROM Accounts"
+                            " WHERE name=?)", (target_id, self.name))
+                cur.execute("DELETE FROM Accounts WHERE name=?", (self.name,))
+
+        # Update variable in memory
+        self.balance = Money(0)
+        return count
+
+    def merge_into(self, target_name):
+        """Move every transaction assigned to this account into the one
+        called target_name, then delete this account. An account's balance
+        is the total of its transactions, so the balance moves with them.
+        Nothing is prompted, and it's done as a single bulk change. Returns
+        the number of transactions moved. Raises BudgetError if there is no
+        such account, or it's this one."""
+
+        return self.reassign_transactions(target_name, merge=True)
+
     @classmethod
-    def menu_for_accounts(cls):
+    def menu_for_accounts(cls, budget):
         """Provide user with information regarding the accounts menu then
         direct them to the appropriate functions."""
 
@@ -1672,14 +4427,15 @@ class Account(BaseClass):
             choice = recite_menu_options(ACCOUNT_MENU_OPTIONS)
             if choice == 1:
                 Account.display_x(
-                    summary_attr=cls.total_account_balance,
+                    budget,
+                    summary_attr=budget.total_account_balance,
                     summary_attr_name=cls.tot_account_bal_name,
                     )
             elif choice == 2:
-                Account.new_account()
+                Account.new_account(budget)
             elif choice == 3:
                 print()
-                instance = Account.choose_x()
+                instance = Account.choose_x(budget)
                 if instance is not None:
                     # Object instance is now in memory.
                     # Present user with transaction instance menu.
@@ -1699,30 +4455,757 @@ class Account(BaseClass):
                             instance.update_account_name()
                         elif choice2 == 2:
                             Transaction.display_x(
-                                'WHERE account="{}"'.format(instance.name))
+                                budget,
+                                TransactionFilter(account=instance.name))
                         elif choice2 == 3:
+                            instance.reassign_account_transactions()
+                        elif choice2 == 4:
+                            if instance.merge_account():
+                                break
+                        elif choice2 == 5:
                             confirmation = instance.delete_account()
                             if confirmation:
                                 break
-                        elif choice2 == 4:
+                        elif choice2 == 6:
                             break
                     print("\n~~You are now returning to the account menu.~~")
             elif choice == 4:
                 break
 
     @staticmethod
-    def instantiate(attributes):
-        """Given the attribute fields as input, this method instantiates a
-        single object and returns it. The database query that produces the
-        input is performed elsewhere. The order of the attributes in the
-        inputs (represented by the index subscript) must match up with the
-        order of the attributes in the code below."""
+    def instantiate(budget, attributes):
+        """Given the attribute fields as input, this method instantiates a
+        single object and returns it. The database query that produces the
+        input is performed elsewhere. The order of the attributes in the
+        inputs (represented by the index subscript) must match up with the
+        order of the attributes in the code below."""
+
+        return Account(
+            budget=budget,
+            name=attributes[0],
+            balance=Money(attributes[1]),
+            )
+
+# ____________________________________________________________________________#
+
+
+class RecurringTransaction(BaseClass):
+
+    # Rules are read through a view which adds the names of their accounts
+    # and categories. Changes are made to RecurringTransactions itself.
+    table_name = "RecurringDetails"
+    key_column = "id"
+    display_col_names = [
+        "payee",
+        "amount",
+        "account",
+        "category",
+        "schedule",
+        "due",
+        ]
+    __slots__ = (
+        "budget",
+        "rule_id",
+        "account",
+        "category",
+        "amount",
+        "payee",
+        "memo",
+        "schedule",
+        "due",
+        "end_date",
+        )
+
+    def __init__(
+            self,
+            budget,
+            rule_id,
+            account,
+            category,
+            amount,
+            payee,
+            memo,
+            schedule,
+            due,
+            end_date,
+            ):
+        self.budget = budget
+        self.rule_id = rule_id
+        self.account = account
+        self.category = category
+        self.amount = amount
+        self.payee = payee
+        self.memo = memo
+        # A description of how often the transaction repeats.
+        self.schedule = schedule
+        # The date of the next transaction, or None if there are no more.
+        self.due = due
+        self.end_date = end_date
+
+    @classmethod
+    def record_name(cls):
+        return "recurring transaction"
+
+    @staticmethod
+    def describe_schedule(unit, every, day):
+        """Return a description of a rule's schedule, such as 'every 2
+        weeks' or 'monthly on day 15'."""
+
+        if every == 1:
+            text = {"day": "daily", "week": "weekly", "month": "monthly"}[unit]
+        else:
+            text = "every {} {}s".format(every, unit)
+        if unit == "month":
+            text += " on day {}".format(day)
+        return text
+
+    @staticmethod
+    def advance(date, unit, every, day):
+        """Return the date which follows date in a rule's schedule.
+
+        :param date: The date of one of the rule's transactions.
+        :param unit: One of RECURRING_UNITS.
+        :param every: The number of units between transactions.
+        :param day: For monthly rules, the day of the month. Months which
+        are too short for it use their last day instead.
+        """
+
+        if unit == "day":
+            return date + timedelta(days=every)
+        if unit == "week":
+            return date + timedelta(weeks=every)
+        year, month = divmod(date.year * 12 + date.month - 1 + every, 12)
+        month += 1
+        return dt(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+    @staticmethod
+    def add_rule(
+            budget,
+            account,
+            category,
+            amount,
+            payee,
+            start_date,
+            unit,
+            every,
+            end_date=None,
+            memo=None,
+            ):
+        """Create a recurring transaction, without prompting the user.
+        Nothing is added to the budget's transactions until catch_up is
+        called. Returns the id of the new rule. Raises BudgetError if the
+        account or category doesn't exist, or the rule breaks the rules
+        that apply to new transactions.
+
+        :param account: The name of the account of each transaction.
+        :param category: The name of the category of each transaction, or
+        None. Expenses must have one.
+        :param amount: The Money of each transaction, negative for expenses.
+        :param payee: The payee of each transaction.
+        :param start_date: The date of the first transaction. Monthly rules
+        repeat on this day of the month.
+        :param unit: One of RECURRING_UNITS.
+        :param every: The number of units between transactions.
+        :param end_date: If given, no transactions are created after it.
+        :param memo: An optional memo for each transaction.
+        """
+
+        if unit not in RECURRING_UNITS:
+            raise BudgetError("A recurring transaction must repeat every so"
+                              " many days, weeks or months.")
+        if every < 1:
+            raise BudgetError("A recurring transaction must repeat at least"
+                              " one {} apart.".format(unit))
+        if category is None and amount < 0:
+            raise BudgetError("An expense must have a category.")
+        if payee == "":
+            raise BudgetError("A recurring transaction must have a payee.")
+        if end_date is not None and end_date < start_date:
+            raise BudgetError("A recurring transaction can't end before it"
+                              " starts.")
+
+        with budget.unit_of_work() as cur:
+            cur.execute("SELECT id FROM Accounts WHERE name=?", (account,))
+            account_row = cur.fetchone()
+            if account_row is None:
+                raise BudgetError(
+                    "There is no account called {}.".format(account))
+            category_id = None
+            if category is not None:
+                cur.execute("SELECT id FROM Categories WHERE name=?",
+                            (category,))
+                category_row = cur.fetchone()
+                if category_row is None:
+                    raise BudgetError(
+                        "There is no category called {}.".format(category))
+                category_id = category_row[0]
+            cur.execute(
+                "INSERT INTO RecurringTransactions(account_id, category_id,"
+                " amount, payee, memo, unit, every, day, next_date,"
+                " end_date) VALUES(?,?,?,?,?,?,?,?,?,?)", (
+                    account_row[0],
+                    category_id,
+                    amount,
+                    payee,
+                    memo,
+                    unit,
+                    every,
+                    start_date.day if unit == "month" else None,
+                    start_date,
+                    end_date,
+                    ))
+            return cur.lastrowid
+
+    @staticmethod
+    @timed
+    def catch_up(budget, today=None):
+        """Create every transaction which the recurring transactions have
+        made due, up to and including today, without prompting the user.
+        They're inserted as a single batch (see Budget.insert_many), in the
+        same unit of work as each rule's new next_date.
+
+        Only the rules which are due are read, from the index on next_date,
+        and their transactions are worked out from it, so the cost depends
+        on how many transactions are created rather than on how many the
+        budget already has.
+
+        The transactions are added in date order, keeping track of each
+        account's balance. If one would make the balance negative, its rule
+        stops there: neither it nor the rule's later transactions are
+        added, and it stays due, to be tried again next time. The other
+        rules' transactions are still added.
+
+        :param today: The last date to create transactions for, which is
+        today's date unless given.
+        :return: A tuple of (count, problems), where count is the number of
+        transactions created, and problems is a list of messages, one for
+        each rule which was stopped.
+        """
+
+        if today is None:
+            today = dt.today()
+        with budget.unit_of_work() as cur:
+            cur.execute("SELECT id, account_id, category_id, amount, payee,"
+                        " memo, unit, every, day, next_date, end_date"
+                        " FROM RecurringTransactions WHERE next_date<=?",
+                        (today,))
+            # Each transaction which is due, with the date that its rule
+            # will be due next once it has been added.
+            due = []
+            for (rule_id, account_id, category_id, amount, payee, memo, unit,
+                    every, day, date, end_date) in cur.fetchall():
+                while date is not None and date <= today:
+                    next_date = RecurringTransaction.advance(date, unit,
+                                                             every, day)
+                    if end_date is not None and next_date > end_date:
+                        # The rule has finished.
+                        next_date = None
+                    due.append((date, rule_id, account_id, category_id,
+                                amount, payee, memo, next_date))
+                    date = next_date
+            if len(due) == 0:
+                return 0, []
+            due.sort(key=lambda transaction: transaction[:2])
+
+            account_ids = sorted(set(transaction[2] for transaction in due))
+            cur.execute("SELECT id, name, balance FROM Accounts WHERE id IN"
+                        " ({})".format(", ".join("?" * len(account_ids))),
+                        account_ids)
+            names = {}
+            balances = {}
+            for account_id, name, balance in cur.fetchall():
+                names[account_id] = name
+                balances[account_id] = balance
+
+            rows = []
+            next_dates = {}
+            stopped = set()
+            problems = []
+            for (date, rule_id, account_id, category_id, amount, payee, memo,
+                    next_date) in due:
+                if rule_id in stopped:
+                    continue
+                if balances[account_id] + amount < 0:
+                    # Account balances aren't allowed to become negative.
+                    stopped.add(rule_id)
+                    problems.append(
+                        "{} on {} wasn't added, because the {} account's"
+                        " balance would become negative.".format(
+                            payee, date.strftime("%m/%d/%Y"),
+                            names[account_id]))
+                    continue
+                balances[account_id] += amount
+                rows.append(
+                    (account_id, category_id, amount, payee, date, memo))
+                next_dates[rule_id] = next_date
+            if len(rows) == 0:
+                return 0, problems
+
+            budget.insert_many(cur, rows)
+            cur.executemany(
+                "UPDATE RecurringTransactions SET next_date=? WHERE id=?",
+                [(next_date, rule_id)
+                 for rule_id, next_date in next_dates.items()])
+
+        # The transactions have been saved, so update the totals in memory.
+        budget.refresh_totals()
+        return len(rows), problems
+
+    @staticmethod
+    def menu_for_recurring(budget):
+        """Provide user with information regarding the recurring
+        transactions menu then direct them to the appropriate functions."""
+
+        print("\n~~You are now in the recurring transactions menu.~~")
+        while True:
+            menu_header({"RECURRING TRANSACTIONS MENU": ""})
+            choice = recite_menu_options(RECURRING_MENU_OPTIONS)
+            if choice == 1:
+                RecurringTransaction.display_x(budget)
+            elif choice == 2:
+                RecurringTransaction.new_recurring(budget)
+            elif choice == 3:
+                print()
+                instance = RecurringTransaction.choose_x(budget)
+                if instance is not None:
+                    instance.delete_recurring()
+            elif choice == 4:
+                break
+        print("\n~~You are now returning to the transaction menu.~~")
+
+    @staticmethod
+    @timed
+    def new_recurring(budget):
+        """Prompt the user to complete the fields of a recurring transaction
+        and then create it, along with any of its transactions which are
+        already due."""
+
+        if budget.fetch_value("SELECT COUNT(*) FROM Accounts") == 0 or \
+                budget.fetch_value("SELECT COUNT(*) FROM Categories") == 0:
+            output = "You need at least one account and at least one" \
+                     " category to add a recurring transaction."
+            print("\n%s" % output)
+            press_key_to_continue()
+            return
+
+        output = "\nWhat type of recurring transaction is this?" \
+                 "\n\t1) Income\n\t2) Expense"
+        print(output)
+        output = "Enter the corresponding number of your answer, or" \
+                 " enter 0 to cancel: "
+        is_expense = input_validation(output, int, num_lb=0, num_ub=2)
+        if is_expense == 0:
+            # User wants to cancel.
+            return
+        is_expense -= 1
+
+        output = "\nWhat is the amount of each transaction? Enter a blank" \
+                 " line to cancel: "
+        amount = input_validation(
+            output,
+            Money,
+            num_lb=0,
+            empty_string_allowed=True,
+            )
+        if amount == '':
+            # User wants to cancel.
+            return
+        if is_expense:
+            amount = Money(-amount)
+
+        print("\nChoose the account for these transactions.")
+        account_choice = Account.choose_x(budget)
+        if account_choice is None:
+            # User wants to cancel.
+            return
+
+        category = None
+        assign_category = True
+        if not is_expense:
+            output = "\nWould you like to assign a category to these" \
+                     " transactions? Enter 1 for 'Yes', 0 for 'No': "
+            assign_category = input_validation(
+                output, int, num_lb=0, num_ub=1)
+        if assign_category:
+            print("\nChoose the category for these transactions.")
+            category_choice = Category.choose_x(budget)
+            if category_choice is None:
+                # User wants to cancel.
+                return
+            category = category_choice.name
+
+        output = "\nWho is the payee for these transactions? Enter a blank" \
+                 " line to cancel: "
+        payee = input_validation(
+            output,
+            str,
+            is_titlecased=True,
+            empty_string_allowed=True,
+            )
+        if payee == '':
+            # User wants to cancel.
+            return
+
+        print("\nHow often does this transaction happen?")
+        for i in range(len(RECURRING_SCHEDULES)):
+            print("Press {} for {}.".format(i + 1, RECURRING_SCHEDULES[i][0]))
+        choice = input_validation(
+            "Enter your choice here, or 0 to cancel: ",
+            int,
+            num_lb=0,
+            num_ub=len(RECURRING_SCHEDULES),
+            )
+        if choice == 0:
+            # User wants to cancel.
+            return
+        unit, every = RECURRING_SCHEDULES[choice - 1][1:]
+
+        output = "\nEnter the date of the first transaction (MM/DD/YYYY), or" \
+                 " a blank line to cancel: "
+        start_date = input_validation(output, dt, empty_string_allowed=True)
+        if start_date == '':
+            # User wants to cancel.
+            return
+        output = "Enter the date of the last transaction (MM/DD/YYYY), or a" \
+                 " blank line to keep repeating: "
+        end_date = input_validation(output, dt, empty_string_allowed=True)
+        output = "Add an (optional) memo here: "
+        memo = input_validation(output, str, empty_string_allowed=True)
+
+        try:
+            RecurringTransaction.add_rule(
+                budget,
+                account_choice.name,
+                category,
+                amount,
+                payee,
+                start_date,
+                unit,
+                every,
+                end_date or None,
+                memo or None,
+                )
+        except BudgetError as error:
+            print("\n{} No change was made.".format(error))
+            press_key_to_continue()
+            return
+        print("\nYour recurring transaction has been added.")
+
+        # Any transactions which are already due are added straight away,
+        # rather than the next time the budget is opened.
+        count, problems = RecurringTransaction.catch_up(budget)
+        if count > 0:
+            print("{} of its transactions {} already due, and {} been"
+                  " added.".format(count,
+                                   "was" if count == 1 else "were",
+                                   "has" if count == 1 else "have"))
+        for problem in problems:
+            print(problem)
+        press_key_to_continue()
+
+    def delete_recurring(self):
+        """Ask user for confirmation before deleting this recurring
+        transaction. The transactions it has already created are kept."""
+
+        output = "\nAre you sure that you want to delete this recurring" \
+                 " transaction? The transactions it has already created will" \
+                 " be kept. Enter 1 for yes, 0 for no: "
+        confirmation = input_validation(output, int, num_lb=0, num_ub=1)
+        if confirmation:
+            with self.budget.unit_of_work() as cur:
+                cur.execute("DELETE FROM RecurringTransactions WHERE id=?",
+                            (self.rule_id,))
+            print("\nYou have successfully deleted the recurring"
+                  " transaction.")
+            press_key_to_continue()
+        return confirmation
+
+    @staticmethod
+    def instantiate(budget, attributes):
+        """Given the attribute fields as input, this method instantiates a
+        single object and returns it. The database query that produces the
+        input is performed elsewhere. The order of the attributes in the
+        inputs (represented by the index subscript) must match up with the
+        order of the attributes in the code below."""
+
+        return RecurringTransaction(
+            budget,
+            attributes[0],
+            attributes[1],
+            attributes[2],
+            Money(attributes[3]),
+            attributes[4],
+            attributes[5],
+            RecurringTransaction.describe_schedule(
+                attributes[6], attributes[7], attributes[8]),
+            attributes[9],
+            attributes[10],
+            )
+
+# ____________________________________________________________________________#
+
+
+class Report:
+    """Monthly reports, which are read from the CategoryMonths and
+    AccountMonths tables rather than from Transactions. The database's
+    triggers keep those tables up to date, so a report takes the same time
+    however many transactions the budget has."""
+
+    @staticmethod
+    def menu_for_reports(budget):
+        """Provide user with information regarding the reports menu then
+        direct them to the appropriate reports."""
+
+        print("\n~~You are now in the reports menu.~~")
+        while True:
+            menu_header({"REPORTS MENU": ""})
+            choice = recite_menu_options(REPORT_MENU_OPTIONS)
+            if choice == 4:
+                break
+            output = "\nHow many months would you like to see? Enter a" \
+                     " number from 1 to {}: ".format(REPORT_MAX_MONTHS)
+            months = input_validation(
+                output,
+                int,
+                num_lb=1,
+                num_ub=REPORT_MAX_MONTHS,
+                )
+            if choice == 1:
+                Report.by_month(budget, "CategoryMonths", "Categories",
+                                "category", months)
+            elif choice == 2:
+                Report.by_month(budget, "AccountMonths", "Accounts",
+                                "account", months)
+            elif choice == 3:
+                Report.income_and_spending(budget, months)
+            press_key_to_continue()
+
+    @staticmethod
+    def recent_months(budget, months):
+        """Return the most recent months (as 'YYYY-MM') which have any
+        transactions, oldest first.
 
-        return Account(
-            name=str(attributes[0]),    # str() is added for Python 2.X users
-            balance=attributes[1],
+        :param budget: The budget to report on.
+        :param months: The most months to return.
+        """
+
+        rows = budget.fetch_rows(
+            "SELECT DISTINCT month FROM AccountMonths"
+            " ORDER BY month DESC LIMIT ?", (months,))
+        return [str(row[0]) for row in reversed(rows)]
+
+    @staticmethod
+    @timed
+    def by_month(budget, table_name, names_table, column, months):
+        """Print a table with a row for each category (or account) and a
+        column for each month, showing the total of its transactions.
+
+        :param budget: The budget to report on.
+        :param table_name: Either 'CategoryMonths' or 'AccountMonths'.
+        :param names_table: The table which the names are read from, either
+        'Categories' or 'Accounts'.
+        :param column: Either 'category' or 'account'. The table's id column
+        is named after it.
+        :param months: The number of months to show.
+        """
+
+        month_list = Report.recent_months(budget, months)
+        if len(month_list) == 0:
+            print("\nThere are no transactions to report on yet.")
+            return
+
+        rows = []
+        sql = "SELECT COALESCE({2}.name, ''), month, total FROM {1}" \
+              " LEFT JOIN {2} ON {2}.id={1}.{0}_id WHERE month>=?" \
+              " ORDER BY 1, month".format(column, table_name, names_table)
+        for name, month, total in budget.fetch_rows(sql, (month_list[0],)):
+            if len(rows) == 0 or rows[-1].name != name:
+                # Months without any transactions are left blank.
+                rows.append(ReportRow(name=name))
+                for blank_month in month_list:
+                    setattr(rows[-1], blank_month, None)
+                # Transactions without a category are stored under 0, which
+                # has no name.
+                setattr(rows[-1], column,
+                        "(No category)" if name == '' else str(name))
+            setattr(rows[-1], str(month), Money(total))
+
+        print("\nHere are the totals for each {}, month by month:\n".format(
+            column))
+        BaseClass.print_rows(rows, [column] + month_list)
+
+    @staticmethod
+    @timed
+    def income_and_spending(budget, months):
+        """Print a table with a row for each month, showing the total of
+        the transactions without a category (income), the total of those
+        with one (spending), and the number of transactions.
+
+        :param budget: The budget to report on.
+        :param months: The number of months to show.
+        """
+
+        month_list = Report.recent_months(budget, months)
+        if len(month_list) == 0:
+            print("\nThere are no transactions to report on yet.")
+            return
+
+        rows = []
+        for month, income, spending, count in budget.fetch_rows(
+                "SELECT month,"
+                " SUM(CASE WHEN category_id=0 THEN total ELSE 0 END),"
+                " SUM(CASE WHEN category_id!=0 THEN total ELSE 0 END),"
+                " SUM(count) FROM CategoryMonths WHERE month>=?"
+                " GROUP BY month ORDER BY month", (month_list[0],)):
+            rows.append(ReportRow(
+                month=str(month),
+                income=Money(income),
+                spending=Money(spending),
+                net=Money(income + spending),
+                transactions=count,
+                ))
+
+        print("\nHere is your income and spending, month by month:\n")
+        BaseClass.print_rows(
+            rows,
+            ["month", "income", "spending", "net", "transactions"],
             )
 
+
+class ReportRow:
+    """A single row of a report, whose attributes are its columns."""
+
+    def __init__(self, **columns):
+        for column in columns:
+            setattr(self, column, columns[column])
+
+# ____________________________________________________________________________#
+
+
+# The tables which the command line's list command can show.
+COMMAND_LINE_TABLES = {
+    'accounts': Account,
+    'categories': Category,
+    'transactions': Transaction,
+    }
+
+# The file formats which transactions can be exported to, by file extension.
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    }
+
+
+def open_data_file(path, mode):
+    """Open a CSV or JSON Lines file the way the csv and json modules
+    expect under Python 2.X and 3.X. Files are written as UTF-8, and read
+    as whatever data_file_encoding finds they were saved in."""
+
+    if sys.version_info[0] < 3:
+        return open(path, mode + 'b')
+    if mode == 'r':
+        # Windows-1252 leaves no byte undecodable but five, which are
+        # replaced rather than stopping the import.
+        return io.open(path, mode, newline='',
+                       encoding=data_file_encoding(path), errors='replace')
+    return io.open(path, mode, newline='', encoding='utf-8')
+
+
+def data_file_encoding(path):
+    """Return the encoding of a file that's being imported: 'utf-8-sig' if
+    all of it is valid UTF-8, or else 'cp1252' (Windows-1252), which
+    spreadsheet programs on Windows often save text in. 'utf-8-sig' skips
+    the byte order mark which some spreadsheet programs put at the start of
+    the file."""
+
+    # The file is checked a piece at a time, so it needn't fit in memory.
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as data_file:
+        try:
+            for chunk in iter(lambda: data_file.read(65536), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', True)
+        except UnicodeDecodeError:
+            return 'cp1252'
+    return 'utf-8-sig'
+
+
+def read_csv_transactions(csv_file):
+    """Generator which reads a CSV file of transactions one row at a time,
+    yielding a (location, record) pair for each row. The first row must name
+    the columns: date, payee and amount are required, while account,
+    category and memo are optional. Columns may appear in any order, and
+    other columns are ignored. Each record is a dict of the row's raw text,
+    keyed by lowercase column name. Files written by
+    Transaction.export_records have this layout."""
+
+    reader = csv.reader(csv_file)
+    try:
+        header = next(reader, None)
+        if header is None:
+            # The file is empty.
+            return
+        header = [column.strip().lower() for column in header]
+        for column in ('date', 'payee', 'amount'):
+            if column not in header:
+                raise BudgetError("The file has no {} column.".format(
+                    column))
+
+        for row in reader:
+            if not any(field.strip() for field in row):
+                # Skip blank lines.
+                continue
+            yield "line {}".format(reader.line_num), dict(zip(header, row))
+    except csv.Error as error:
+        # Such as a field too long to be anything but a mistake.
+        raise BudgetError("There is a problem with line {} of the file:"
+                          " {}".format(reader.line_num, error))
+
+
+# Regexes for reading OFX and QFX bank statements. These files are either
+# SGML (which has no closing tags) or XML, so a field's value is taken to
+# be everything up to the next tag or line break.
+OFX_TRANSACTION = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.I | re.S)
+OFX_FIELD = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def read_ofx_transactions(ofx_file):
+    """Generator which reads an OFX or QFX bank statement one line at a
+    time, yielding a (location, record) pair for each transaction in it.
+    Each record is a dict of raw text, using the same field names as
+    read_csv_transactions (date, payee, amount and memo)."""
+
+    buffer = ''
+    number = 0
+    for line in ofx_file:
+        buffer += line
+        while True:
+            match = OFX_TRANSACTION.search(buffer)
+            if match is None:
+                break
+            buffer = buffer[match.end():]
+            number += 1
+            fields = {}
+            for tag, value in OFX_FIELD.findall(match.group(1)):
+                fields[tag.upper()] = value.strip()
+
+            # Dates look like YYYYMMDD, optionally followed by a time.
+            date = fields.get('DTPOSTED', '')
+            if re.match(r'^\d{8}', date):
+                date = "{}/{}/{}".format(date[4:6], date[6:8], date[0:4])
+            payee = fields.get('NAME') or fields.get('PAYEE') or \
+                fields.get('MEMO', '')
+            yield "transaction {}".format(number), {
+                'date': date,
+                'payee': payee,
+                'amount': fields.get('TRNAMT', ''),
+                'memo': fields.get('MEMO'),
+                }
+        if '<STMTTRN>' not in buffer.upper():
+            # Nothing worth keeping (such as headers or balances) has
+            # been read since the last transaction.
+            buffer = ''
+
 # ____________________________________________________________________________#
 
 
@@ -1731,9 +5214,6 @@ def main():
     navigate to get to all other parts."""
 
     # TODO replace 'cur.fetchall()[0][0]' with a better sqlite3 method.
-    # TODO: Instead of 'conn' being a global variable, make it a class attribute of some class (?)
-
-    global conn
 
     # All files affiliated with this program will be located at the path
     # stored in CONFIG_DIRECTORY.
@@ -1743,49 +5223,451 @@ def main():
     user_budgets = os.path.join(CONFIG_DIRECTORY, "User Budgets")
     if not os.path.exists(user_budgets):
         os.makedirs(user_budgets)
+    catalog = BudgetCatalog(user_budgets)
+    catalog.synchronize()
 
     # Here is where the user experience begins:
     print("\nWelcome to Ben's Budget Program!")
     while True:
-        conn, budget_name = which_budget(user_budgets)
-
-        # Now that a budget is selected, update the total account balance.
-        cur = conn.cursor()
-        cur.execute("SELECT SUM(balance) FROM Accounts")
-        Account.total_account_balance = cur.fetchone()[0]
-        # A brand new budget has no data, so cur.fetchall returns None.
-        if Account.total_account_balance is None:
-            Account.total_account_balance = 0
-
-        # Also update the unassigned funds.
-        cur.execute("SELECT SUM(value) FROM Categories")
-        temp = cur.fetchone()[0]
-        # A brand new budget has no data, so cur.fetchall returns None.
-        if temp is None:
-            temp = 0
-        Category.unassigned_funds = Account.total_account_balance - temp
-        cur.close()
+        budget = which_budget(catalog)
+
+        # Make sure that the stored balances can be trusted.
+        problems = budget.verify_ledger()
+        if len(problems) > 0:
+            print("\nThe balances saved in this budget don't match its"
+                  " transactions:")
+            for problem in problems:
+                print("\t%s" % problem)
+            output = "\nDo you want to correct the balances so that they" \
+                     " match the transactions? Enter 1 for yes, 0 for no: "
+            if input_validation(output, int, num_lb=0, num_ub=1):
+                budget.verify_ledger(repair=True)
+                print("\nThe balances have been corrected.")
+            press_key_to_continue()
+
+        # Add the recurring transactions which have come due since the
+        # budget was last opened.
+        count, problems = RecurringTransaction.catch_up(budget)
+        if count > 0:
+            print("\n{} recurring transaction{} came due, and {} been"
+                  " added.".format(count, "" if count == 1 else "s",
+                                   "has" if count == 1 else "have"))
+        if len(problems) > 0:
+            print("\nSome of your recurring transactions which are due"
+                  " couldn't be added:")
+            for problem in problems:
+                print("\t%s" % problem)
+        if count > 0 or len(problems) > 0:
+            press_key_to_continue()
 
         while True:
-            menu_header({"MAIN MENU:": budget_name})
+            menu_header({"MAIN MENU:": budget.name})
             choice = recite_menu_options(MAIN_MENU_OPTIONS)
             if choice == 1:
-                Category.menu_for_categories()
+                Category.menu_for_categories(budget)
             elif choice == 2:
-                Transaction.menu_for_transactions()
+                Transaction.menu_for_transactions(budget)
             elif choice == 3:
-                Account.menu_for_accounts()
+                Account.menu_for_accounts(budget)
             elif choice == 4:
+                Report.menu_for_reports(budget)
+            elif choice == 5:
                 print("\n~~"
                       "You are now returning to the budget selection menu.~~")
-                conn.close()
+                # Keep the catalog's totals for this budget up to date.
+                catalog.record(budget)
+                budget.close()
                 break
             print("\n~~You are now returning to the main menu.~~")
 
 # ____________________________________________________________________________#
 
 
-def which_budget(user_budgets):
+def command_line(args):
+    """Carry out a single operation given as command line arguments, without
+    any prompts, so that the program can be driven by scripts and scheduled
+    jobs. The budget is opened, the operation is committed once, and the
+    budget is closed again. Run with --help to see the available commands.
+
+    :param args: The command line arguments, not including the program name.
+    :return: The exit code, which is 0 on success and 1 if the operation
+    broke one of the budget's rules (in which case nothing was saved) or
+    verify found a problem that wasn't corrected.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog=os.path.basename(sys.argv[0]),
+        description="Work with a budget without going through the menus."
+                    " Run without any arguments to use the menus instead.",
+        )
+    parser.add_argument(
+        "--budget",
+        required=True,
+        help="the name of the budget to open",
+        )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(CONNECTION_PROFILES),
+        help="the connection profile to open the budget with",
+        )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="time the command and its SQL statements, and save a summary"
+             " to {} in the program's directory".format(TRACE_FILE_NAME),
+        )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    command = commands.add_parser(
+        "add-transaction",
+        help="add a transaction (amounts are negative for expenses)",
+        )
+    command.add_argument("--account", required=True)
+    command.add_argument("--category")
+    command.add_argument("--amount", required=True)
+    command.add_argument("--payee", required=True)
+    command.add_argument("--date", help="MM/DD/YYYY, today if left out")
+    command.add_argument("--memo")
+
+    command = commands.add_parser(
+        "transfer",
+        help="move money from one account to another",
+        )
+    command.add_argument("from_account")
+    command.add_argument("to_account")
+    command.add_argument("--amount", required=True)
+    command.add_argument("--date", help="MM/DD/YYYY, today if left out")
+    command.add_argument("--memo")
+
+    command = commands.add_parser(
+        "add-recurring",
+        help="add a transaction which repeats every so many days, weeks or"
+             " months (amounts are negative for expenses)",
+        )
+    command.add_argument("--account", required=True)
+    command.add_argument("--category")
+    command.add_argument("--amount", required=True)
+    command.add_argument("--payee", required=True)
+    command.add_argument("--start", help="MM/DD/YYYY, today if left out")
+    command.add_argument("--end", help="MM/DD/YYYY")
+    command.add_argument("--every", type=int, default=1)
+    command.add_argument("--unit", choices=RECURRING_UNITS, default="month")
+    command.add_argument("--memo")
+
+    commands.add_parser(
+        "recurring",
+        help="add the recurring transactions which are due",
+        )
+
+    command = commands.add_parser("add-category", help="add a category")
+    command.add_argument("name")
+    command.add_argument("--value", default="0")
+
+    command = commands.add_parser("add-account", help="add an account")
+    command.add_argument("name")
+    command.add_argument("--balance", default="0")
+
+    command = commands.add_parser("rename-category", help="rename a category")
+    command.add_argument("old_name")
+    command.add_argument("new_name")
+
+    command = commands.add_parser("rename-account", help="rename an account")
+    command.add_argument("old_name")
+    command.add_argument("new_name")
+
+    command = commands.add_parser(
+        "merge-category",
+        help="move a category's transactions and funds into another, then"
+             " delete it",
+        )
+    command.add_argument("name")
+    command.add_argument("into")
+
+    command = commands.add_parser(
+        "merge-account",
+        help="move an account's transactions into another, then delete it",
+        )
+    command.add_argument("name")
+    command.add_argument("into")
+
+    command = commands.add_parser("list", help="list the records in a table")
+    command.add_argument(
+        "--table",
+        choices=sorted(COMMAND_LINE_TABLES),
+        default="transactions",
+        )
+    command.add_argument("--limit", type=int, default=PAGE_SIZE)
+
+    command = commands.add_parser(
+        "search",
+        help="find transactions by words in their payee or memo",
+        )
+    command.add_argument("words", nargs="+")
+    command.add_argument("--limit", type=int, default=PAGE_SIZE)
+
+    commands.add_parser(
+        "balance",
+        help="show the account balances and unassigned funds",
+        )
+
+    command = commands.add_parser(
+        "verify",
+        help="check the stored balances against the transactions",
+        )
+    command.add_argument(
+        "--repair",
+        action="store_true",
+        help="correct any balances that don't match",
+        )
+
+    command = commands.add_parser(
+        "import",
+        help="import transactions from a CSV or OFX file",
+        )
+    command.add_argument("path")
+    command.add_argument("--account", help="for records that don't name one")
+    command.add_argument("--category", help="for expenses that don't name one")
+
+    command = commands.add_parser(
+        "export",
+        help="export transactions to a CSV or JSON Lines file",
+        )
+    command.add_argument("path")
+    command.add_argument("--start", help="MM/DD/YYYY")
+    command.add_argument("--end", help="MM/DD/YYYY")
+    command.add_argument("--account")
+    command.add_argument("--category")
+
+    options = parser.parse_args(args)
+    if options.command is None:
+        parser.error("a command is required")
+
+    def convert(text, desired_type):
+        # Apply the same rules as the menus do, but report any problem as
+        # a usage error rather than asking again.
+        if text is None:
+            return None
+        value, error_output = validate_input(text, desired_type)
+        if error_output is not None:
+            parser.error(error_output)
+        return value
+
+    # Check the arguments before the budget is opened.
+    if options.command == "transfer":
+        amount = convert(options.amount, Money)
+        date = convert(options.date, dt) or dt.today()
+    elif options.command == "add-recurring":
+        amount = convert(options.amount, Money)
+        start_date = convert(options.start, dt) or dt.today()
+        end_date = convert(options.end, dt)
+    elif options.command == "add-category":
+        value = convert(options.value, Money)
+    elif options.command == "add-account":
+        value = convert(options.balance, Money)
+    elif options.command in ("list", "search") and options.limit < 1:
+        parser.error("--limit must be at least 1")
+    elif options.command == "import":
+        file_path = os.path.expanduser(options.path)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in ('.csv', '.ofx', '.qfx'):
+            parser.error("the file name must end in .csv, .ofx or .qfx")
+        if not os.path.isfile(file_path):
+            parser.error("there is no file at {}".format(file_path))
+    elif options.command == "export":
+        file_path = os.path.expanduser(options.path)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in EXPORT_FORMATS:
+            parser.error("the file name must end in .csv or .jsonl")
+        start_date = convert(options.start, dt)
+        end_date = convert(options.end, dt)
+
+    path = os.path.join(CONFIG_DIRECTORY, "User Budgets",
+                        options.budget + ".db")
+    if not os.path.isfile(path):
+        parser.error("there is no budget called {}".format(options.budget))
+    if options.trace:
+        TRACER.enabled = True
+    started = timer()
+    try:
+        budget = Budget(path, options.profile)
+    except BudgetError as error:
+        sys.stderr.write("{}\n".format(error))
+        return 1
+    catalog = BudgetCatalog(os.path.dirname(path))
+
+    try:
+        if options.command == "add-transaction":
+            # A single transaction is held to the same rules as an
+            # imported one.
+            record = {
+                "account": options.account,
+                "category": options.category,
+                "amount": options.amount,
+                "payee": options.payee,
+                "date": options.date or dt.today().strftime("%m/%d/%Y"),
+                "memo": options.memo,
+                }
+            Transaction.import_records(
+                budget, [("the command line", record)])
+            print("Added the transaction.")
+
+        elif options.command == "transfer":
+            Transaction.add_transfer(budget, options.from_account,
+                                     options.to_account, amount, date,
+                                     options.memo)
+            print("Transferred {} from {} to {}.".format(
+                format_money(amount), options.from_account,
+                options.to_account))
+
+        elif options.command == "add-recurring":
+            RecurringTransaction.add_rule(
+                budget,
+                options.account,
+                options.category,
+                amount,
+                options.payee,
+                start_date,
+                options.unit,
+                options.every,
+                end_date,
+                options.memo,
+                )
+            print("Added the recurring transaction.")
+
+        elif options.command == "recurring":
+            count, problems = RecurringTransaction.catch_up(budget)
+            print("Added {} recurring transaction{}.".format(
+                count, "" if count == 1 else "s"))
+            for problem in problems:
+                print(problem)
+            if len(problems) > 0:
+                return 1
+
+        elif options.command == "add-category":
+            Category.add_category(budget, options.name, value)
+            print("Added the {} category.".format(options.name))
+
+        elif options.command == "add-account":
+            Account.add_account(budget, options.name, value)
+            print("Added the {} account.".format(options.name))
+
+        elif options.command in ("rename-category", "rename-account"):
+            cls = Category if options.command == "rename-category" \
+                else Account
+            instance = cls.find(budget, options.old_name)
+            if instance is None:
+                raise BudgetError("There is no {} called {}.".format(
+                    cls.__name__.lower(), options.old_name))
+            instance.rename(options.new_name)
+            print("Renamed {} to {}.".format(options.old_name,
+                                             options.new_name))
+
+        elif options.command in ("merge-category", "merge-account"):
+            cls = Category if options.command == "merge-category" \
+                else Account
+            instance = cls.find(budget, options.name)
+            if instance is None:
+                raise BudgetError("There is no {} called {}.".format(
+                    cls.__name__.lower(), options.name))
+            count = instance.merge_into(options.into)
+            print("Merged {} into {}, moving {} transaction{}.".format(
+                options.name, options.into, count,
+                "" if count == 1 else "s"))
+
+        elif options.command == "list":
+            cls = COMMAND_LINE_TABLES[options.table]
+            keys, objects, more = cls.fetch_page(
+                budget,
+                page_size=options.limit,
+                )
+            if len(objects) > 0:
+                cls.print_rows(objects, cls.display_col_names)
+
+        elif options.command == "search":
+            objects = Transaction.search(
+                budget,
+                " ".join(options.words),
+                limit=options.limit,
+                )
+            if len(objects) > 0:
+                Transaction.print_rows(objects, Transaction.display_col_names)
+
+        elif options.command == "balance":
+            objects = [
+                Account.instantiate(budget, row) for row in
+                budget.fetch_rows("SELECT * FROM Accounts ORDER BY id")
+                ]
+            if len(objects) > 0:
+                Account.print_rows(objects, Account.display_col_names)
+                print()
+            print("{}: {}".format(Account.tot_account_bal_name,
+                                  format_money(budget.total_account_balance)))
+            print("Unassigned Funds: {}".format(
+                format_money(budget.unassigned_funds)))
+
+        elif options.command == "verify":
+            problems = budget.verify_ledger(repair=options.repair)
+            for problem in problems:
+                print(problem)
+            if len(problems) == 0:
+                print("The balances match the transactions.")
+            elif options.repair:
+                print("The balances that could be corrected have been.")
+                # Check whether anything couldn't be corrected.
+                problems = budget.verify_ledger()
+            if len(problems) > 0:
+                return 1
+
+        elif options.command == "import":
+            with open_data_file(file_path, 'r') as in_file:
+                if extension == '.csv':
+                    records = read_csv_transactions(in_file)
+                else:
+                    records = read_ofx_transactions(in_file)
+                count = Transaction.import_records(
+                    budget,
+                    records,
+                    default_account=options.account,
+                    default_category=options.category,
+                    )
+            print("Imported {} transaction{}.".format(
+                count, "" if count == 1 else "s"))
+
+        elif options.command == "export":
+            with open_data_file(file_path, 'w') as out_file:
+                count = Transaction.export_records(
+                    budget,
+                    out_file,
+                    EXPORT_FORMATS[extension],
+                    TransactionFilter(
+                        account=options.account,
+                        category=options.category,
+                        start_date=start_date,
+                        end_date=end_date,
+                        ),
+                    )
+            print("Exported {} transaction{}.".format(
+                count, "" if count == 1 else "s"))
+
+    except BudgetError as error:
+        sys.stderr.write("{}\n".format(error))
+        return 1
+    finally:
+        # Keep the catalog's totals for this budget up to date.
+        catalog.record(budget, opened=True)
+        catalog.close()
+        budget.close()
+        if TRACER.enabled:
+            TRACER.record("command " + options.command, timer() - started)
+            sys.stderr.write("Saved a summary of the timings to {}.\n".format(
+                TRACER.write_summary()))
+    return 0
+
+# ____________________________________________________________________________#
+
+
+@timed
+def which_budget(catalog):
     """Top-level menu, determines which budget (database) to connect to."""
 
     # TODO: Make filenames distinct from user-supplied budget names. Then no need to limit user's input!
@@ -1807,8 +5689,7 @@ def which_budget(user_budgets):
 
                 # Now confirm that there isn't an existing budget that
                 # already has that name.
-                if os.path.isfile(os.path.join(
-                        user_budgets, budget_name + '.db')):
+                if os.path.isfile(catalog.path(budget_name)):
                     print("\nA budget already exists with that name. "
                           "Please enter a different name.")
                 else:
@@ -1817,119 +5698,833 @@ def which_budget(user_budgets):
                 # User wants to cancel. Loop to top of this function.
                 continue
             # Name has been approved, proceed with setting up new database
-            # and connecting to it.
-            # The 'detect_types' line allows the DATE type to survive the
-            # round-trip from Python to sqlite3 database to Python again.
-            connection = sqlite3.connect(
-                os.path.join(user_budgets, budget_name + '.db'),
-                detect_types=sqlite3.PARSE_DECLTYPES,
-                )
-            cur = connection.cursor()
-            cur.execute('CREATE TABLE Categories('
-                        'name TEXT,'
-                        'value REAL)'
-                        )
-            cur.execute('CREATE TABLE Accounts('
-                        'name TEXT,'
-                        'balance REAL)'
-                        )
-            cur.execute('CREATE TABLE Transactions('
-                        'uid INTEGER,'
-                        'account TEXT,'
-                        'category TEXT,'
-                        'amount REAL,'
-                        'payee TEXT,'
-                        'date DATE,'
-                        'memo TEXT)'
-                        )
-            cur.close()
-            connection.commit()
+            # and connecting to it. The budget's tables are created when it
+            # is opened for the first time.
+            try:
+                budget = Budget(catalog.path(budget_name))
+            except BudgetError as error:
+                print("\n{}".format(error))
+                press_key_to_continue()
+                continue
+            catalog.record(budget, opened=True)
             print("\nGreat! You have created a brand new budget called %s."
                   % budget_name)
             break
 
         if choice == 2:
             # The user wants to load an existing budget.
-            list_of_budgets = glob.glob(
-                "%s/*.db" % user_budgets)  # Pull up list of available budgets.
-            if len(list_of_budgets) == 0:
-                print("\nThere are no existing budgets. "
-                      "You should make a new one!")
-                press_key_to_continue()
-            else:
-                print("\nWhich budget would you like to load?")
-                for i in range(len(list_of_budgets)):
-                    print("\t%d)" % (i + 1), os.path.splitext(
-                        os.path.basename(list_of_budgets[i]))[0])
-                budget_number = input_validation(
-                    "Enter the number in front of the budget you wish to load,"
-                    " or enter 0 to cancel: ",
-                    int,
-                    num_lb=0,
-                    num_ub=len(list_of_budgets),
-                )
-
-                if budget_number > 0:
-                    # Load the budget that corresponds to the number
-                    # the user entered.
-                    # The 'detect_types' line allows the DATE type to
-                    # survive the round-trip from Python to sqlite3 database
-                    # to Python again.
-                    connection = sqlite3.connect(
-                        list_of_budgets[budget_number - 1],
-                        detect_types=sqlite3.PARSE_DECLTYPES,
-                        )
-                    budget_name = os.path.splitext(os.path.basename(
-                        list_of_budgets[budget_number - 1]))[0]
-                    print("\nBudget loaded: %s" % budget_name)
-                    break
+            entry = choose_budget(catalog, "load")
+            if entry is not None:
+                try:
+                    budget = Budget(catalog.path(entry.name))
+                except BudgetError as error:
+                    print("\n{}".format(error))
+                    press_key_to_continue()
+                    continue
+                catalog.record(budget, opened=True)
+                print("\nBudget loaded: %s" % budget.name)
+                break
 
         if choice == 3:
             # User wants to delete an existing budget.
-            list_of_budgets = glob.glob(
-                "%s/*.db" % user_budgets)  # Pull up list of available budgets.
-            if len(list_of_budgets) == 0:
-                print("\nThere are no existing budgets. "
-                      "You should make a new one!")
-                press_key_to_continue()
-            else:
-                print("\nWhich budget would you like to delete?")
-                for i in range(len(list_of_budgets)):
-                    print("\t%d)" % (i + 1), os.path.splitext(
-                        os.path.basename(list_of_budgets[i]))[0])
-                budget_number = input_validation(
-                    "Enter the number in front of the budget you wish to"
-                    " delete, or enter 0 to cancel: ",
+            entry = choose_budget(catalog, "delete")
+            if entry is not None:
+                # Ask the user to confirm their choice.
+                output = "Are you sure you want to delete {}? Press 1" \
+                         " for 'Yes', 0 for 'No': ".format(entry.name)
+                confirmation = input_validation(
+                    output,
                     int,
                     num_lb=0,
-                    num_ub=len(list_of_budgets),
+                    num_ub=1,
                 )
-
-                if budget_number > 0:
-                    # Ask the user to confirm their choice.
-                    selected_budget = os.path.splitext(os.path.basename(
-                            list_of_budgets[budget_number - 1]))[0]
-                    output = "Are you sure you want to delete {}? Press 1" \
-                             " for 'Yes', 0 for 'No': ".format(selected_budget)
-                    confirmation = input_validation(
-                        output,
-                        int,
-                        num_lb=0,
-                        num_ub=1,
-                    )
-                    if confirmation:
-                        # Delete the budget that corresponds to the number
-                        # the user entered.
-                        os.remove(list_of_budgets[budget_number-1])
-                        print("\nBudget deleted: {}".format(selected_budget))
-                        press_key_to_continue()
+                if confirmation:
+                    # Delete the budget that the user chose, along with any
+                    # write-ahead log files that were left behind.
+                    path = catalog.path(entry.name)
+                    os.remove(path)
+                    for suffix in ('-wal', '-shm'):
+                        if os.path.exists(path + suffix):
+                            os.remove(path + suffix)
+                    catalog.remove(entry.name)
+                    print("\nBudget deleted: {}".format(entry.name))
+                    press_key_to_continue()
 
         if choice == 4:
             # Quit the program!
+            catalog.close()
             exit_program()
 
     press_key_to_continue()
-    return connection, budget_name
+    return budget
+
+
+def choose_budget(catalog, action):
+    """Show the catalog of budgets a page at a time, and ask the user to
+    choose one of them.
+
+    :param catalog: The BudgetCatalog to choose from.
+    :param action: What will be done with the chosen budget, such as 'load'.
+    :return: The chosen budget's CatalogEntry, or None if the user cancels.
+    """
+
+    if catalog.count() == 0:
+        print("\nThere are no existing budgets. You should make a new one!")
+        press_key_to_continue()
+        return None
+
+    sort_order = 0
+    offset = 0
+    while True:
+        # Ask for one extra entry, to find out if there is another page.
+        entries = catalog.entries(sort_order, offset, PAGE_SIZE + 1)
+        has_next = len(entries) > PAGE_SIZE
+        entries = entries[:PAGE_SIZE]
+        print("\nWhich budget would you like to {}? They are sorted by"
+              " {}.\n".format(action, CATALOG_SORT_ORDERS[sort_order][0]))
+        BaseClass.print_rows(
+            entries,
+            CatalogEntry.display_col_names,
+            show_nums=True,
+            first_num=offset + 1,
+            )
+        print()
+
+        options = ['s']
+        prompt = ", 's' to sort them differently"
+        if has_next:
+            options.append('n')
+            prompt += ", 'n' for the next page"
+        if offset > 0:
+            options.append('p')
+            prompt += ", 'p' for the previous page"
+        choice_number = input_validation(
+            "Enter the number in front of the budget you wish to {}{},"
+            " or enter 0 to cancel: ".format(action, prompt),
+            int,
+            num_lb=0,
+            num_ub=offset + len(entries),
+            str_options=options,
+            )
+        if choice_number == 's':
+            sort_order = (sort_order + 1) % len(CATALOG_SORT_ORDERS)
+            offset = 0
+        elif choice_number == 'n':
+            offset += PAGE_SIZE
+        elif choice_number == 'p':
+            offset = max(offset - PAGE_SIZE, 0)
+        elif choice_number == 0:
+            return None
+        elif choice_number <= offset:
+            # The selected budget belongs to an earlier page.
+            print("\nInvalid entry, please choose a number from the"
+                  " current page.")
+        else:
+            return entries[choice_number - offset - 1]
+
+# ____________________________________________________________________________#
+
+
+def upgrade_budget(connection, migrations=None):
+    """Apply any schema migrations that the budget hasn't had yet. The
+    budget's schema version is stored in its 'user_version' pragma, which
+    is 0 for brand new budgets and for budgets created before versioning.
+
+    :param connection: The connection to the database to upgrade.
+    :param migrations: The list of migrations to apply, in order. This is
+    SCHEMA_MIGRATIONS unless another kind of database (such as the catalog
+    of budgets) is being upgraded.
+    """
+
+    if migrations is None:
+        migrations = SCHEMA_MIGRATIONS
+
+    cur = connection.cursor()
+    cur.execute("PRAGMA user_version")
+    version = cur.fetchone()[0]
+
+    # Manage the transaction by hand, so that each migration (including
+    # its DDL statements) is applied atomically under Python 2.X and 3.X.
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        for i in range(version, len(migrations)):
+            cur.execute("BEGIN")
+            try:
+                migrations[i](cur)
+                # PRAGMA statements can't take parameters.
+                cur.execute("PRAGMA user_version = %d" % (i + 1))
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            cur.execute("COMMIT")
+    finally:
+        connection.isolation_level = isolation_level
+        cur.close()
+
+
+def migration_create_tables(cur):
+    """Version 1: the original tables. Budgets created before schema
+    versioning already have them."""
+
+    cur.execute('CREATE TABLE IF NOT EXISTS Categories('
+                'name TEXT,'
+                'value REAL)'
+                )
+    cur.execute('CREATE TABLE IF NOT EXISTS Accounts('
+                'name TEXT,'
+                'balance REAL)'
+                )
+    cur.execute('CREATE TABLE IF NOT EXISTS Transactions('
+                'uid INTEGER,'
+                'account TEXT,'
+                'category TEXT,'
+                'amount REAL,'
+                'payee TEXT,'
+                'date DATE,'
+                'memo TEXT)'
+                )
+
+
+def migration_add_indexes(cur):
+    """Version 2: names are unique, and transactions are looked up by
+    account, category and date."""
+
+    cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS categories_name '
+                'ON Categories(name)')
+    cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS accounts_name '
+                'ON Accounts(name)')
+    cur.execute('CREATE INDEX IF NOT EXISTS transactions_account '
+                'ON Transactions(account)')
+    cur.execute('CREATE INDEX IF NOT EXISTS transactions_category '
+                'ON Transactions(category)')
+    cur.execute('CREATE INDEX IF NOT EXISTS transactions_date '
+                'ON Transactions(date)')
+
+
+def migration_uid_primary_key(cur):
+    """Version 3: uid becomes an INTEGER PRIMARY KEY (an alias for the
+    rowid), so SQLite allocates UIDs itself. SQLite can't change a column's
+    constraints in place, so the table is rebuilt."""
+
+    cur.execute('CREATE TABLE Transactions_new('
+                'uid INTEGER PRIMARY KEY,'
+                'account TEXT,'
+                'category TEXT,'
+                'amount REAL,'
+                'payee TEXT,'
+                'date DATE,'
+                'memo TEXT)'
+                )
+    cur.execute('INSERT OR IGNORE INTO Transactions_new '
+                'SELECT * FROM Transactions ORDER BY rowid')
+    # UIDs used to be allocated with 'SELECT MAX(uid) + 1', so two
+    # processes writing at once may have handed out the same UID. Keep the
+    # first of each such transaction and give the others fresh UIDs.
+    cur.execute('INSERT INTO Transactions_new(account, category, amount,'
+                ' payee, date, memo) '
+                'SELECT account, category, amount, payee, date, memo '
+                'FROM Transactions WHERE rowid NOT IN ('
+                'SELECT MIN(rowid) FROM Transactions GROUP BY uid)')
+    cur.execute('DROP TABLE Transactions')
+    cur.execute('ALTER TABLE Transactions_new RENAME TO Transactions')
+
+    # Dropping the old table also dropped its indexes.
+    cur.execute('CREATE INDEX transactions_account ON Transactions(account)')
+    cur.execute('CREATE INDEX transactions_category '
+                'ON Transactions(category)')
+    cur.execute('CREATE INDEX transactions_date ON Transactions(date)')
+
+
+def migration_integer_cents(cur):
+    """Version 4: amounts are stored as INTEGER cents instead of REAL
+    dollars. A column's type can't be changed in place, so the tables are
+    rebuilt (along with their indexes)."""
+
+    cur.execute('CREATE TABLE Categories_new('
+                'name TEXT,'
+                'value INTEGER)'
+                )
+    cur.execute('INSERT INTO Categories_new '
+                'SELECT name, CAST(ROUND(value * 100) AS INTEGER) '
+                'FROM Categories ORDER BY rowid')
+    cur.execute('DROP TABLE Categories')
+    cur.execute('ALTER TABLE Categories_new RENAME TO Categories')
+    cur.execute('CREATE UNIQUE INDEX categories_name ON Categories(name)')
+
+    cur.execute('CREATE TABLE Accounts_new('
+                'name TEXT,'
+                'balance INTEGER)'
+                )
+    cur.execute('INSERT INTO Accounts_new '
+                'SELECT name, CAST(ROUND(balance * 100) AS INTEGER) '
+                'FROM Accounts ORDER BY rowid')
+    cur.execute('DROP TABLE Accounts')
+    cur.execute('ALTER TABLE Accounts_new RENAME TO Accounts')
+    cur.execute('CREATE UNIQUE INDEX accounts_name ON Accounts(name)')
+
+    cur.execute('CREATE TABLE Transactions_new('
+                'uid INTEGER PRIMARY KEY,'
+                'account TEXT,'
+                'category TEXT,'
+                'amount INTEGER,'
+                'payee TEXT,'
+                'date DATE,'
+                'memo TEXT)'
+                )
+    cur.execute('INSERT INTO Transactions_new '
+                'SELECT uid, account, category,'
+                ' CAST(ROUND(amount * 100) AS INTEGER), payee, date, memo '
+                'FROM Transactions')
+    cur.execute('DROP TABLE Transactions')
+    cur.execute('ALTER TABLE Transactions_new RENAME TO Transactions')
+    cur.execute('CREATE INDEX transactions_account ON Transactions(account)')
+    cur.execute('CREATE INDEX transactions_category '
+                'ON Transactions(category)')
+    cur.execute('CREATE INDEX transactions_date ON Transactions(date)')
+
+
+def migration_balance_triggers(cur):
+    """Version 5: account balances and category values are kept up to date
+    by triggers on the Transactions table, so that every insert, update and
+    delete adjusts them inside SQLite.
+
+    Renaming an account or category renames it before its transactions, so
+    the update triggers skip a transaction whose old account or category no
+    longer exists. Otherwise a rename would count the transactions twice."""
+
+    cur.execute('CREATE TRIGGER transactions_insert '
+                'AFTER INSERT ON Transactions '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE name=NEW.account; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE name=NEW.category; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_delete '
+                'AFTER DELETE ON Transactions '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE name=OLD.account; '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE name=OLD.category; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_account '
+                'AFTER UPDATE OF account, amount ON Transactions '
+                'WHEN EXISTS (SELECT 1 FROM Accounts WHERE name=OLD.account) '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE name=OLD.account; '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE name=NEW.account; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_category '
+                'AFTER UPDATE OF category, amount ON Transactions '
+                'WHEN OLD.category IS NULL OR EXISTS ('
+                'SELECT 1 FROM Categories WHERE name=OLD.category) '
+                'BEGIN '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE name=OLD.category; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE name=NEW.category; '
+                'END')
+
+
+def migration_category_assigned(cur):
+    """Version 6: categories remember how much has been assigned to them,
+    so that their values can be checked against their transactions (a
+    category's value is its assigned funds plus its transactions). Existing
+    categories are assumed to be correct.
+
+    Balances are checked with a single grouped pass over Transactions,
+    which an index on (account, category, amount) answers without reading
+    the table itself. That index also serves every lookup by account."""
+
+    cur.execute('ALTER TABLE Categories '
+                'ADD COLUMN assigned INTEGER NOT NULL DEFAULT 0')
+    cur.execute('UPDATE Categories SET assigned=value-('
+                'SELECT TOTAL(amount) FROM Transactions '
+                'WHERE category=Categories.name)')
+    cur.execute('CREATE INDEX transactions_account_category '
+                'ON Transactions(account, category, amount)')
+    cur.execute('DROP INDEX transactions_account')
+
+
+def migration_monthly_rollups(cur):
+    """Version 7: the CategoryMonths and AccountMonths tables hold the total
+    and number of transactions for each category and each account, month by
+    month. Triggers on Transactions keep them up to date, so that reports
+    never need to read Transactions. Transactions without a category are
+    totalled under the category ''.
+
+    An update is treated as removing the old transaction and adding the new
+    one, which also keeps the tables right when an account or category is
+    renamed."""
+
+    for table_name, column, value in (
+            ("AccountMonths", "account", "{0}.account"),
+            ("CategoryMonths", "category", "COALESCE({0}.category, '')"),
+            ):
+        cur.execute('CREATE TABLE {0}('
+                    'month TEXT NOT NULL,'
+                    '{1} TEXT NOT NULL,'
+                    'total INTEGER NOT NULL,'
+                    'count INTEGER NOT NULL,'
+                    'PRIMARY KEY(month, {1}))'.format(table_name, column)
+                    )
+        cur.execute('INSERT INTO {} SELECT substr(date, 1, 7), {},'
+                    ' SUM(amount), COUNT(*) FROM Transactions'
+                    ' GROUP BY 1, 2'.format(
+                        table_name, value.format("Transactions")))
+
+        add = 'INSERT INTO {0}(month, {1}, total, count) ' \
+              'VALUES(substr(NEW.date, 1, 7), {2}, NEW.amount, 1) ' \
+              'ON CONFLICT(month, {1}) DO UPDATE SET ' \
+              'total=total+excluded.total, count=count+1; '.format(
+                table_name, column, value.format("NEW"))
+        remove = 'UPDATE {0} SET total=total-OLD.amount, count=count-1 ' \
+                 'WHERE month=substr(OLD.date, 1, 7) AND {1}={2}; ' \
+                 'DELETE FROM {0} WHERE count=0 ' \
+                 'AND month=substr(OLD.date, 1, 7) AND {1}={2}; '.format(
+                    table_name, column, value.format("OLD"))
+        prefix = table_name.lower()
+        cur.execute('CREATE TRIGGER {}_insert AFTER INSERT ON Transactions '
+                    'BEGIN {}END'.format(prefix, add))
+        cur.execute('CREATE TRIGGER {}_delete AFTER DELETE ON Transactions '
+                    'BEGIN {}END'.format(prefix, remove))
+        cur.execute('CREATE TRIGGER {}_update '
+                    'AFTER UPDATE OF {}, amount, date ON Transactions '
+                    'BEGIN {}{}END'.format(prefix, column, remove, add))
+
+
+def migration_transaction_search(cur):
+    """Version 8: TransactionSearch is a full-text index over the payee and
+    memo of each transaction, so that a search doesn't have to read every
+    transaction. It's an external-content FTS5 table, which stores only the
+    index and reads the text itself from Transactions; triggers keep the
+    two in step.
+
+    Some builds of SQLite leave out FTS5. Those budgets go without the index,
+    and Transaction.search falls back to scanning Transactions, until they
+    are opened where SQLite has FTS5 (see add_search_index)."""
+
+    create_transaction_search(cur)
+
+
+def create_transaction_search(cur):
+    """Create the TransactionSearch index, fill it in from Transactions and
+    add the triggers which keep it up to date. Returns False, having done
+    nothing, if this build of SQLite has no FTS5, or True otherwise."""
+
+    try:
+        cur.execute("CREATE VIRTUAL TABLE TransactionSearch USING fts5("
+                    "payee, memo, content='Transactions', content_rowid='uid')"
+                    )
+    except sqlite3.OperationalError:
+        return False
+    cur.execute("INSERT INTO TransactionSearch(TransactionSearch) "
+                "VALUES('rebuild')")
+    create_transaction_search_triggers(cur)
+    return True
+
+
+def create_transaction_search_triggers(cur):
+    """Create the triggers which keep TransactionSearch in step with
+    Transactions."""
+
+    # An external-content index is updated by handing it the old values
+    # through the special 'delete' command, then the new values.
+    add = 'INSERT INTO TransactionSearch(rowid, payee, memo) ' \
+          'VALUES(NEW.uid, NEW.payee, NEW.memo); '
+    remove = "INSERT INTO TransactionSearch(TransactionSearch, rowid, " \
+             "payee, memo) VALUES('delete', OLD.uid, OLD.payee, OLD.memo); "
+    cur.execute('CREATE TRIGGER transactionsearch_insert '
+                'AFTER INSERT ON Transactions BEGIN {}END'.format(add))
+    cur.execute('CREATE TRIGGER transactionsearch_delete '
+                'AFTER DELETE ON Transactions BEGIN {}END'.format(remove))
+    cur.execute('CREATE TRIGGER transactionsearch_update '
+                'AFTER UPDATE OF payee, memo ON Transactions '
+                'BEGIN {}{}END'.format(remove, add))
+
+
+def add_search_index(connection):
+    """Create the TransactionSearch index of a budget which is up to date
+    but doesn't have one, because it was created or upgraded where SQLite
+    had no FTS5, if this build of SQLite has it. Like a migration, it's
+    applied atomically.
+
+    :param connection: The connection to the budget.
+    """
+
+    cur = connection.cursor()
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        cur.execute("SELECT COUNT(*) FROM sqlite_master"
+                    " WHERE name='TransactionSearch'")
+        if cur.fetchone()[0] > 0:
+            return
+        cur.execute("BEGIN")
+        try:
+            create_transaction_search(cur)
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        cur.execute("COMMIT")
+    finally:
+        connection.isolation_level = isolation_level
+        cur.close()
+
+
+def migration_foreign_keys(cur):
+    """Version 9: transactions refer to their account and category by the
+    integer id of its row (account_id and category_id), with FOREIGN KEY
+    constraints, instead of by name. Renaming an account or category
+    changes a single row, and the ids take less space than the names.
+    Existing rows keep their rowids as their ids.
+
+    Transactions whose account or category doesn't exist get one, created
+    with the total of those transactions, so that none of them is lost.
+
+    The tables are rebuilt, so the triggers on Transactions are dropped
+    first and recreated (by id) afterwards. The monthly rollups are keyed
+    by id as well, with transactions without a category totalled under 0.
+    The TransactionDetails view adds the names back, for reading."""
+
+    cur.execute("SELECT name FROM sqlite_master"
+                " WHERE type='trigger' AND tbl_name='Transactions'")
+    for row in cur.fetchall():
+        cur.execute('DROP TRIGGER {}'.format(row[0]))
+
+    # The id is the last column, so that 'SELECT *' still starts with the
+    # columns which the instantiate methods read.
+    cur.execute('CREATE TABLE Accounts_new('
+                'name TEXT,'
+                'balance INTEGER,'
+                'id INTEGER PRIMARY KEY)'
+                )
+    cur.execute('INSERT INTO Accounts_new(id, name, balance) '
+                'SELECT rowid, name, balance FROM Accounts ORDER BY rowid')
+    cur.execute("INSERT INTO Accounts_new(name, balance) "
+                "SELECT COALESCE(account, 'Unknown Account'), SUM(amount) "
+                "FROM Transactions WHERE COALESCE(account, 'Unknown Account')"
+                " NOT IN (SELECT name FROM Accounts) GROUP BY 1")
+    cur.execute('DROP TABLE Accounts')
+    cur.execute('ALTER TABLE Accounts_new RENAME TO Accounts')
+    cur.execute('CREATE UNIQUE INDEX accounts_name ON Accounts(name)')
+
+    cur.execute('CREATE TABLE Categories_new('
+                'name TEXT,'
+                'value INTEGER,'
+                'assigned INTEGER NOT NULL DEFAULT 0,'
+                'id INTEGER PRIMARY KEY)'
+                )
+    cur.execute('INSERT INTO Categories_new(id, name, value, assigned) '
+                'SELECT rowid, name, value, assigned FROM Categories '
+                'ORDER BY rowid')
+    cur.execute('INSERT INTO Categories_new(name, value) '
+                'SELECT category, SUM(amount) FROM Transactions '
+                'WHERE category IS NOT NULL '
+                'AND category NOT IN (SELECT name FROM Categories) '
+                'GROUP BY category')
+    cur.execute('DROP TABLE Categories')
+    cur.execute('ALTER TABLE Categories_new RENAME TO Categories')
+    cur.execute('CREATE UNIQUE INDEX categories_name ON Categories(name)')
+
+    cur.execute('CREATE TABLE Transactions_new('
+                'uid INTEGER PRIMARY KEY,'
+                'account_id INTEGER NOT NULL REFERENCES Accounts(id),'
+                'category_id INTEGER REFERENCES Categories(id),'
+                'amount INTEGER,'
+                'payee TEXT,'
+                'date DATE,'
+                'memo TEXT)'
+                )
+    cur.execute("INSERT INTO Transactions_new "
+                "SELECT uid, (SELECT id FROM Accounts WHERE name="
+                "COALESCE(Transactions.account, 'Unknown Account')), "
+                "(SELECT id FROM Categories WHERE name=Transactions.category),"
+                " amount, payee, date, memo FROM Transactions ORDER BY uid")
+    cur.execute('DROP TABLE Transactions')
+    cur.execute('ALTER TABLE Transactions_new RENAME TO Transactions')
+    cur.execute('CREATE INDEX transactions_account_category '
+                'ON Transactions(account_id, category_id, amount)')
+    cur.execute('CREATE INDEX transactions_category '
+                'ON Transactions(category_id)')
+    cur.execute('CREATE INDEX transactions_date ON Transactions(date)')
+
+    cur.execute('CREATE TRIGGER transactions_insert '
+                'AFTER INSERT ON Transactions '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE id=NEW.account_id; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE id=NEW.category_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_delete '
+                'AFTER DELETE ON Transactions '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE id=OLD.account_id; '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE id=OLD.category_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_account '
+                'AFTER UPDATE OF account_id, amount ON Transactions '
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE id=OLD.account_id; '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE id=NEW.account_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_category '
+                'AFTER UPDATE OF category_id, amount ON Transactions '
+                'BEGIN '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE id=OLD.category_id; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE id=NEW.category_id; '
+                'END')
+
+    for table_name, column, value in (
+            ("AccountMonths", "account_id", "{0}.account_id"),
+            ("CategoryMonths", "category_id", "COALESCE({0}.category_id, 0)"),
+            ):
+        cur.execute('DROP TABLE {}'.format(table_name))
+        cur.execute('CREATE TABLE {0}('
+                    'month TEXT NOT NULL,'
+                    '{1} INTEGER NOT NULL,'
+                    'total INTEGER NOT NULL,'
+                    'count INTEGER NOT NULL,'
+                    'PRIMARY KEY(month, {1}))'.format(table_name, column)
+                    )
+        cur.execute('INSERT INTO {} SELECT substr(date, 1, 7), {},'
+                    ' SUM(amount), COUNT(*) FROM Transactions'
+                    ' GROUP BY 1, 2'.format(
+                        table_name, value.format("Transactions")))
+
+        add = 'INSERT INTO {0}(month, {1}, total, count) ' \
+              'VALUES(substr(NEW.date, 1, 7), {2}, NEW.amount, 1) ' \
+              'ON CONFLICT(month, {1}) DO UPDATE SET ' \
+              'total=total+excluded.total, count=count+1; '.format(
+                table_name, column, value.format("NEW"))
+        remove = 'UPDATE {0} SET total=total-OLD.amount, count=count-1 ' \
+                 'WHERE month=substr(OLD.date, 1, 7) AND {1}={2}; ' \
+                 'DELETE FROM {0} WHERE count=0 ' \
+                 'AND month=substr(OLD.date, 1, 7) AND {1}={2}; '.format(
+                    table_name, column, value.format("OLD"))
+        prefix = table_name.lower()
+        cur.execute('CREATE TRIGGER {}_insert AFTER INSERT ON Transactions '
+                    'BEGIN {}END'.format(prefix, add))
+        cur.execute('CREATE TRIGGER {}_delete AFTER DELETE ON Transactions '
+                    'BEGIN {}END'.format(prefix, remove))
+        cur.execute('CREATE TRIGGER {}_update '
+                    'AFTER UPDATE OF {}, amount, date ON Transactions '
+                    'BEGIN {}{}END'.format(prefix, column, remove, add))
+
+    # The uids haven't changed, so the full-text index is still right and
+    # only its triggers need recreating.
+    cur.execute("SELECT COUNT(*) FROM sqlite_master"
+                " WHERE name='TransactionSearch'")
+    if cur.fetchone()[0] > 0:
+        create_transaction_search_triggers(cur)
+
+    # The names are looked up by scalar subqueries rather than joins, so
+    # that queries which don't use them (such as COUNT(*)) never look them
+    # up. The ids come last, so that 'SELECT *' still starts with the
+    # columns which Transaction.instantiate reads.
+    cur.execute('CREATE VIEW TransactionDetails AS '
+                'SELECT uid,'
+                ' (SELECT name FROM Accounts WHERE id=account_id) AS account,'
+                ' (SELECT name FROM Categories WHERE id=category_id)'
+                ' AS category,'
+                ' amount, payee, date, memo, account_id, category_id '
+                'FROM Transactions'
+                )
+
+
+def migration_bulk_changes(cur):
+    """Version 10: the BulkSelection table lists the uids of the
+    transactions which a bulk change (see Budget.bulk_change) is about to
+    update or delete. It's empty at all other times.
+
+    While it isn't empty, the triggers which keep the balances, values and
+    monthly rollups up to date do nothing, since the bulk change adjusts
+    them itself with one grouped statement each, rather than once for every
+    transaction. The triggers are recreated with that condition; the
+    full-text index's triggers are left as they are."""
+
+    cur.execute('CREATE TABLE BulkSelection(uid INTEGER PRIMARY KEY)')
+    guard = 'WHEN NOT EXISTS (SELECT 1 FROM BulkSelection) '
+
+    for name in ('transactions_insert', 'transactions_delete',
+                 'transactions_update_account', 'transactions_update_category',
+                 'accountmonths_insert', 'accountmonths_delete',
+                 'accountmonths_update', 'categorymonths_insert',
+                 'categorymonths_delete', 'categorymonths_update'):
+        cur.execute('DROP TRIGGER {}'.format(name))
+
+    cur.execute('CREATE TRIGGER transactions_insert '
+                'AFTER INSERT ON Transactions ' + guard +
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE id=NEW.account_id; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE id=NEW.category_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_delete '
+                'AFTER DELETE ON Transactions ' + guard +
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE id=OLD.account_id; '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE id=OLD.category_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_account '
+                'AFTER UPDATE OF account_id, amount ON Transactions ' + guard +
+                'BEGIN '
+                'UPDATE Accounts SET balance=balance-OLD.amount '
+                'WHERE id=OLD.account_id; '
+                'UPDATE Accounts SET balance=balance+NEW.amount '
+                'WHERE id=NEW.account_id; '
+                'END')
+    cur.execute('CREATE TRIGGER transactions_update_category '
+                'AFTER UPDATE OF category_id, amount ON Transactions ' +
+                guard +
+                'BEGIN '
+                'UPDATE Categories SET value=value-OLD.amount '
+                'WHERE id=OLD.category_id; '
+                'UPDATE Categories SET value=value+NEW.amount '
+                'WHERE id=NEW.category_id; '
+                'END')
+
+    for table_name, column, value in (
+            ("AccountMonths", "account_id", "{0}.account_id"),
+            ("CategoryMonths", "category_id", "COALESCE({0}.category_id, 0)"),
+            ):
+        add = 'INSERT INTO {0}(month, {1}, total, count) ' \
+              'VALUES(substr(NEW.date, 1, 7), {2}, NEW.amount, 1) ' \
+              'ON CONFLICT(month, {1}) DO UPDATE SET ' \
+              'total=total+excluded.total, count=count+1; '.format(
+                table_name, column, value.format("NEW"))
+        remove = 'UPDATE {0} SET total=total-OLD.amount, count=count-1 ' \
+                 'WHERE month=substr(OLD.date, 1, 7) AND {1}={2}; ' \
+                 'DELETE FROM {0} WHERE count=0 ' \
+                 'AND month=substr(OLD.date, 1, 7) AND {1}={2}; '.format(
+                    table_name, column, value.format("OLD"))
+        prefix = table_name.lower()
+        cur.execute('CREATE TRIGGER {}_insert AFTER INSERT ON Transactions '
+                    '{}BEGIN {}END'.format(prefix, guard, add))
+        cur.execute('CREATE TRIGGER {}_delete AFTER DELETE ON Transactions '
+                    '{}BEGIN {}END'.format(prefix, guard, remove))
+        cur.execute('CREATE TRIGGER {}_update '
+                    'AFTER UPDATE OF {}, amount, date ON Transactions '
+                    '{}BEGIN {}{}END'.format(
+                        prefix, column, guard, remove, add))
+
+
+def migration_transfers(cur):
+    """Version 11: each leg of a transfer between two accounts refers to
+    the other by its uid (transfer_uid), so that the two can be edited and
+    deleted together. transfer_uid is NULL for every other transaction.
+
+    The FOREIGN KEY constraint stops one leg being deleted without the
+    other. It's checked against the index whenever a transaction is
+    deleted; the index only lists the legs of transfers, so it stays
+    small. The TransactionDetails view is recreated to include the new
+    column."""
+
+    cur.execute('ALTER TABLE Transactions ADD COLUMN '
+                'transfer_uid INTEGER REFERENCES Transactions(uid)')
+    cur.execute('CREATE INDEX transactions_transfer '
+                'ON Transactions(transfer_uid) '
+                'WHERE transfer_uid IS NOT NULL')
+    cur.execute('DROP VIEW TransactionDetails')
+    cur.execute('CREATE VIEW TransactionDetails AS '
+                'SELECT uid,'
+                ' (SELECT name FROM Accounts WHERE id=account_id) AS account,'
+                ' (SELECT name FROM Categories WHERE id=category_id)'
+                ' AS category,'
+                ' amount, payee, date, memo, account_id, category_id,'
+                ' transfer_uid '
+                'FROM Transactions'
+                )
+
+
+def migration_recurring_transactions(cur):
+    """Version 12: the RecurringTransactions table holds the rules for
+    transactions which repeat, such as rent or a paycheck. Each rule
+    repeats every so many days, weeks or months (unit and every); monthly
+    rules keep to the same day of the month (day), or the month's last day
+    if it's shorter. next_date is the date of the rule's next transaction,
+    or NULL once end_date has passed, so the rules which are due are found
+    from the index without looking at any transactions.
+
+    A rule is deleted along with its account or category. The
+    RecurringDetails view adds their names, for reading."""
+
+    cur.execute('CREATE TABLE RecurringTransactions('
+                'id INTEGER PRIMARY KEY,'
+                'account_id INTEGER NOT NULL'
+                ' REFERENCES Accounts(id) ON DELETE CASCADE,'
+                'category_id INTEGER'
+                ' REFERENCES Categories(id) ON DELETE CASCADE,'
+                'amount INTEGER NOT NULL,'
+                'payee TEXT NOT NULL,'
+                'memo TEXT,'
+                'unit TEXT NOT NULL,'
+                'every INTEGER NOT NULL,'
+                'day INTEGER,'
+                'next_date DATE,'
+                'end_date DATE)'
+                )
+    cur.execute('CREATE INDEX recurringtransactions_next_date '
+                'ON RecurringTransactions(next_date)')
+    cur.execute('CREATE VIEW RecurringDetails AS '
+                'SELECT id,'
+                ' (SELECT name FROM Accounts WHERE id=account_id) AS account,'
+                ' (SELECT name FROM Categories WHERE id=category_id)'
+                ' AS category,'
+                ' amount, payee, memo, unit, every, day, next_date, end_date,'
+                ' account_id, category_id '
+                'FROM RecurringTransactions'
+                )
+
+
+# Never edit or reorder these, since existing budgets have already had them
+# applied. Change the schema by adding a new migration to the end instead.
+SCHEMA_MIGRATIONS = [
+    migration_create_tables,
+    migration_add_indexes,
+    migration_uid_primary_key,
+    migration_integer_cents,
+    migration_balance_triggers,
+    migration_category_assigned,
+    migration_monthly_rollups,
+    migration_transaction_search,
+    migration_foreign_keys,
+    migration_bulk_changes,
+    migration_transfers,
+    migration_recurring_transactions,
+    ]
+
+
+def catalog_migration_create_tables(cur):
+    """Version 1 of the catalog of budgets."""
+
+    cur.execute('CREATE TABLE Budgets('
+                'name TEXT PRIMARY KEY,'
+                'opened TEXT,'
+                'transactions INTEGER,'
+                'balance INTEGER,'
+                'size INTEGER)'
+                )
+
+
+# The same rules apply as for SCHEMA_MIGRATIONS.
+CATALOG_MIGRATIONS = [
+    catalog_migration_create_tables,
+    ]
 
 # ____________________________________________________________________________#
 
@@ -1960,6 +6555,7 @@ def input_validation(
         str_bad_chars_positions=None,
         is_titlecased=False,
         empty_string_allowed=False,
+        str_options=None,
         ):
 
     """
@@ -1976,18 +6572,19 @@ def input_validation(
     :param is_titlecased: Specifies whether a string should be made titlecased.
     :param empty_string_allowed: Flag to specify whether the empty string
             is acceptable input.
+    :param str_options: A list of lowercase strings (such as menu commands)
+            which are accepted as-is, in addition to input of input_type.
+            If input_type is str, only these strings are accepted.
     :return: The user input, once confirmed that it's acceptable.
     """
 
-    # TODO: Use regexes when input is str, pass regex as argument? Replaces str_bad_chars and str_bad_chars_positions
-
     while True:
 
-        error_output = None
-        try:
-            user_input = raw_input(prompt).strip()  # Python 2.X
-        except NameError:
-            user_input = input(prompt).strip()      # Python 3.X
+        with TRACER.waiting():
+            try:
+                user_input = raw_input(prompt).strip()  # Python 2.X
+            except NameError:
+                user_input = input(prompt).strip()      # Python 3.X
 
         # user_input is a string.
 
@@ -2001,120 +6598,157 @@ def input_validation(
                 print("\nInvalid entry, please try again.")
                 continue
 
-        if input_type is str:
+        # Next check for one of the accepted strings (if there are any).
+        if str_options is not None:
+            if user_input.lower() in str_options:
+                user_input = user_input.lower()
+                break
+            elif input_type is str:
+                print("\nInvalid entry, please try again.")
+                continue
 
-            if is_titlecased:
-                user_input = user_input.title()
+        user_input, error_output = validate_input(
+            user_input,
+            input_type,
+            num_lb=num_lb,
+            num_ub=num_ub,
+            str_bad_chars=str_bad_chars,
+            str_bad_chars_positions=str_bad_chars_positions,
+            is_titlecased=is_titlecased,
+            )
+        if error_output is not None:
+            print("\n%s" % error_output)
+            continue
 
-            if str_bad_chars is None:
-                # No forbidden characters, so user input is good to go.
-                break
+        # user_input is good to go.
+        break
 
-            for i in range(len(str_bad_chars)):
-                # Make sure each member of str_bad_chars doesn't
-                # appear in the input at the wrong position.
-                if str_bad_chars_positions[i] is None:
-                    # str_bad_chars[i] is not allowed anywhere within string.
-                    if str_bad_chars[i] in user_input:
-                        # Reject input.
-                        error_output = "Invalid entry, cannot contain" \
-                                       " {}".format(str_bad_chars[i])
-                        break
-                else:
-                    # str_bad_chars[i] is not allowed at the specific location
-                    # specified by str_bad_chars_positions[i], but allowed
-                    # elsewhere.
-                    if str_bad_chars[i] in user_input[
-                            str_bad_chars_positions[i]]:
-                        # Reject input.
-                        error_output = "Invalid entry, character at position" \
-                                       " {} cannot be '{}'".format(
-                                        str_bad_chars_positions[i],
-                                        str_bad_chars[i],
-                                        )
-                        break
-
-            if error_output is not None:
-                print("\n%s" % error_output)
-                continue
+    return user_input
 
-        elif input_type is int:
-            try:
-                user_input = int(user_input)
-            except ValueError:
-                print("\nInvalid entry, please try again.")
-                continue
-            # Now check to make sure user_input is in range.
-            if (user_input < num_lb) or (user_input > num_ub):
-                error_output = "Invalid entry, must be between {} and" \
-                         " {} (inclusive).".format(
-                            num_lb,
-                            num_ub,
-                            )
-                print("\n%s" % error_output)
-                continue
+# ____________________________________________________________________________#
 
-        elif input_type is float:
-            try:
-                user_input = float(user_input)
-            except ValueError:
-                print("\nInvalid entry, please try again.")
-                continue
-            # Now check to make sure user_input is in range.
-            if (user_input < num_lb) or (user_input > num_ub):
-                error_output = "Invalid entry, must be between {:,.2f} and" \
-                         " {:,.2f} (inclusive).".format(
+
+def validate_input(
+        user_input,
+        input_type,
+        num_lb=float('-inf'),
+        num_ub=float('inf'),
+        str_bad_chars=None,
+        str_bad_chars_positions=None,
+        is_titlecased=False,
+        ):
+
+    """
+    Check a single non-empty piece of text against the rules for its type,
+    and convert it to that type. This is shared by input_validation (for
+    text typed by the user) and by the importer (for text read from files).
+
+    :param user_input: The text to check, with whitespace already stripped.
+    :param input_type: The type which the text should represent.
+    The remaining parameters are the same as for input_validation.
+    :return: A tuple of (value, error_output). If the text is acceptable,
+    error_output is None; otherwise it's a message explaining the problem.
+    """
+
+    # TODO: Use regexes when input is str, pass regex as argument? Replaces str_bad_chars and str_bad_chars_positions
+
+    if input_type is str:
+
+        if is_titlecased:
+            user_input = user_input.title()
+
+        if str_bad_chars is None:
+            # No forbidden characters, so user input is good to go.
+            return user_input, None
+
+        for i in range(len(str_bad_chars)):
+            # Make sure each member of str_bad_chars doesn't
+            # appear in the input at the wrong position.
+            if str_bad_chars_positions[i] is None:
+                # str_bad_chars[i] is not allowed anywhere within string.
+                if str_bad_chars[i] in user_input:
+                    # Reject input.
+                    return None, "Invalid entry, cannot contain" \
+                                 " {}".format(str_bad_chars[i])
+            else:
+                # str_bad_chars[i] is not allowed at the specific location
+                # specified by str_bad_chars_positions[i], but allowed
+                # elsewhere.
+                if str_bad_chars[i] in user_input[
+                        str_bad_chars_positions[i]]:
+                    # Reject input.
+                    return None, "Invalid entry, character at position" \
+                                 " {} cannot be '{}'".format(
+                                    str_bad_chars_positions[i],
+                                    str_bad_chars[i],
+                                    )
+
+    elif input_type is int:
+        try:
+            user_input = int(user_input)
+        except ValueError:
+            return None, "Invalid entry, please try again."
+        # Now check to make sure user_input is in range.
+        if (user_input < num_lb) or (user_input > num_ub):
+            return None, "Invalid entry, must be between {} and" \
+                         " {} (inclusive).".format(
                             num_lb,
                             num_ub,
                             )
-                print("\n%s" % error_output)
-                continue
-            # Finally, if '-0' was entered, turn into +0.
-            user_input += 0
-
-        elif input_type is dt:
-            # Input type is a datetime.date object.
-            # Input should be in MM/DD/YYYY format.
-            regex = '^\d\d/\d\d/\d\d\d\d$'
-            match = re.search(regex, user_input)
-            if not match:
-                # User input didn't match the regex.
-                error_output = "Invalid entry, must be in 'MM/DD/YYYY' format."
-                print("\n%s" % error_output)
-                continue
-            # User input matched the regex. Convert to datetime.date format.
-            temp = user_input.split('/')
-            month = int(temp[0])
-            day = int(temp[1])
-            year = int(temp[2])
-            try:
-                user_input = dt(month=month, day=day, year=year)
-            except ValueError:
-                print("\nInvalid entry, not a real date.")
-                continue
-            try:
-                user_input.strftime("%m/%d/%Y")
-            except ValueError:
-                # User is running Python 2.x and date precedes 01/01/1900.
-                print("\nInvalid entry, cannot precede 01/01/1900.")
-                continue
-        else:
-            raise Exception("Ben Katz - developer error.")
 
-        # user_input is good to go.
-        break
+    elif input_type is Money:
+        # Amounts may have extra decimal places, which are rounded
+        # to the nearest cent.
+        try:
+            user_input = Money.parse(user_input)
+        except ValueError:
+            return None, "Invalid entry, please try again."
+        # Now check to make sure user_input is in range.
+        if user_input < num_lb:
+            return None, "Invalid entry, must be at least" \
+                         " {}.".format(format_money(num_lb))
+        if user_input > num_ub:
+            return None, "Invalid entry, must be at most" \
+                         " {}.".format(format_money(num_ub))
+
+    elif input_type is dt:
+        # Input type is a datetime.date object.
+        # Input should be in MM/DD/YYYY format.
+        regex = '^\d\d/\d\d/\d\d\d\d$'
+        match = re.search(regex, user_input)
+        if not match:
+            # User input didn't match the regex.
+            return None, "Invalid entry, must be in 'MM/DD/YYYY' format."
+        # User input matched the regex. Convert to datetime.date format.
+        temp = user_input.split('/')
+        month = int(temp[0])
+        day = int(temp[1])
+        year = int(temp[2])
+        try:
+            user_input = dt(month=month, day=day, year=year)
+        except ValueError:
+            return None, "Invalid entry, not a real date."
+        try:
+            user_input.strftime("%m/%d/%Y")
+        except ValueError:
+            # User is running Python 2.x and date precedes 01/01/1900.
+            return None, "Invalid entry, cannot precede 01/01/1900."
+    else:
+        raise Exception("Ben Katz - developer error.")
 
-    return user_input
+    # user_input is good to go.
+    return user_input, None
 
 # ____________________________________________________________________________#
 
 
 def press_key_to_continue():
     """Prompts the user to hit a button before displaying the next menu."""
-    try:
-        raw_input("Press Enter to continue... ")    # Python 2.X
-    except NameError:
-        input("Press Enter to continue... ")        # Python 3.X
+    with TRACER.waiting():
+        try:
+            raw_input("Press Enter to continue... ")    # Python 2.X
+        except NameError:
+            input("Press Enter to continue... ")        # Python 3.X
     print()     # Prints a blank line.
 
 # ____________________________________________________________________________#
@@ -2123,7 +6757,7 @@ def press_key_to_continue():
 def menu_header(header_dict):
     """Print a menu header showing the items within header_list. The keys
     of the dictionary are expected to be strings, and the values are expected
-    to be floats, strings, datetime.date objects, or NoneType."""
+    to be Money, strings, datetime.date objects, or NoneType."""
 
     output = ""
     gap = "    "
@@ -2132,9 +6766,9 @@ def menu_header(header_dict):
         if type(header_dict[key]) == str:
             item_gap = " "
             value = header_dict[key]
-        elif type(header_dict[key]) == float:
-            item_gap = " -$" if header_dict[key] < 0 else " $"
-            value = "{:,.2f}".format(abs(header_dict[key]))
+        elif type(header_dict[key]) == Money:
+            item_gap = " "
+            value = format_money(header_dict[key])
         elif type(header_dict[key]) == dt:
             item_gap = " "
             value = str(header_dict[key].strftime("%m/%d/%Y"))
@@ -2155,16 +6789,16 @@ def menu_header(header_dict):
 def exit_program():
     """Exit the program gracefully (with exit code 0)."""
 
+    if TRACER.enabled:
+        print("\nA summary of this session's timings has been saved to"
+              " {}.".format(TRACER.write_summary()))
     print("\nThanks for using Ben's Budget Program. See you later!")
-    try:
-        conn.close()
-    except NameError:
-        # The variable conn was never set.
-        pass
     raise SystemExit
 
 # ____________________________________________________________________________#
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        raise SystemExit(command_line(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks for Ben's Budget Program.
+
+Generates budgets of the chosen sizes, then times the program's own code
+paths against them: opening a budget the way main() does, loading
+transactions, printing them, adding a transaction through the menu prompts,
+the checks made before deleting a category, renaming a category and an
+account, and catching up a year of recurring transactions. The menus are
+driven by scripted answers instead of the keyboard, and everything they
+print is discarded.
+
+The results are written as JSON, so that they can be compared with an
+earlier run:
+
+    python benchmark.py --sizes 10000 100000 --output before.json
+    (make a change)
+    python benchmark.py --sizes 10000 100000 --baseline before.json
+
+Generated budgets are kept in the --directory (a temporary directory by
+default) and reused by later runs with the same settings.
+"""
+
+from __future__ import print_function   # For users running Python 2.X
+import os
+import sys
+import json
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import contextlib
+from timeit import default_timer as timer
+from datetime import date as dt
+from datetime import datetime, timedelta
+
+import BensBudgetProject as bbp
+
+# The number of times each benchmark is run, unless --repeat is given.
+DEFAULT_REPEAT = 5
+
+# The budget sizes (numbers of transactions) benchmarked, unless --sizes is
+# given.
+DEFAULT_SIZES = [10000, 100000]
+
+# The number of distinct payees in a generated budget.
+PAYEE_COUNT = 200
+
+# Generated transactions are spread over this many days, ending on
+# FIRST_DATE + DAY_COUNT.
+FIRST_DATE = dt(2015, 1, 1)
+DAY_COUNT = 5 * 365
+
+# The number of recurring transactions whose catch-up is timed.
+RECURRING_RULES = 20
+
+# Every generated account starts with this much money, so that no expense
+# can overdraw it.
+STARTING_BALANCE = bbp.Money(10 ** 12)
+
+# ____________________________________________________________________________#
+
+
+def generate_budget(path, transactions, accounts, categories, seed=0):
+    """Create a budget at path, filled with random but repeatable data.
+
+    :param path: Where to create the budget. Any existing file is replaced.
+    :param transactions: The number of transactions to add, not counting
+    each account's starting balance.
+    :param accounts: The number of accounts.
+    :param categories: The number of categories.
+    :param seed: The seed for the random data.
+    """
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    generator = random.Random(seed)
+    budget = bbp.Budget(path)
+    account_names = ["Account {}".format(i + 1) for i in range(accounts)]
+    category_names = ["Category {}".format(i + 1) for i in range(categories)]
+    payees = ["Payee {}".format(i + 1) for i in range(PAYEE_COUNT)]
+    for name in account_names:
+        bbp.Account.add_account(budget, name, STARTING_BALANCE)
+    for name in category_names:
+        bbp.Category.add_category(budget, name)
+
+    remaining = transactions
+    while remaining > 0:
+        rows = []
+        for i in range(min(remaining, bbp.BATCH_SIZE)):
+            if generator.random() < 0.1:
+                # Income, which is left without a category.
+                category = None
+                amount = generator.randint(1, 500000)
+            else:
+                category = generator.choice(category_names)
+                amount = -generator.randint(1, 20000)
+            rows.append((
+                generator.choice(account_names),
+                category,
+                bbp.Money(amount),
+                generator.choice(payees),
+                FIRST_DATE + timedelta(generator.randrange(DAY_COUNT)),
+                "Memo {}".format(i) if generator.random() < 0.3 else None,
+                ))
+        with budget.unit_of_work() as cur:
+            cur.executemany(bbp.INSERT_TRANSACTION_SQL, rows)
+        remaining -= len(rows)
+    budget.close()
+
+
+def prepare_budget(directory, transactions, accounts, categories, seed):
+    """Return the path of a generated budget with the given settings,
+    generating it only if an earlier run hasn't already. The budget is
+    opened once, so that any schema upgrades aren't included in the
+    timings."""
+
+    path = os.path.join(directory, "benchmark_{}_{}_{}_{}.db".format(
+        transactions, accounts, categories, seed))
+    if not os.path.isfile(path):
+        print("Generating a budget with {:,} transactions...".format(
+            transactions))
+        start = timer()
+        generate_budget(path + ".partial", transactions, accounts,
+                        categories, seed)
+        os.rename(path + ".partial", path)
+        print("Generated in {:.1f} seconds.".format(timer() - start))
+    bbp.Budget(path).close()
+    return path
+
+
+def copy_budget(source, destination):
+    """Copy a budget, including its write-ahead log if it has one."""
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(destination + suffix):
+            os.remove(destination + suffix)
+        if os.path.exists(source + suffix):
+            shutil.copyfile(source + suffix, destination + suffix)
+
+# ____________________________________________________________________________#
+
+
+@contextlib.contextmanager
+def scripted_input(answers):
+    """Answer the program's prompts with the given strings, in order, and
+    discard everything it prints, for the duration of the 'with' block.
+    Raises an exception if the program asks more questions than there are
+    answers, or fewer."""
+
+    answers = list(answers)
+
+    def answer(prompt=""):
+        if len(answers) == 0:
+            raise Exception("Unexpected prompt: {!r}".format(prompt))
+        return answers.pop(0)
+
+    # The program reads input through raw_input, falling back to input on
+    # Python 3.X. A module-level raw_input is found first on both.
+    stdout = sys.stdout
+    bbp.raw_input = answer
+    sys.stdout = open(os.devnull, "w")
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        del bbp.raw_input
+    if len(answers) > 0:
+        raise Exception("Unused answers: {!r}".format(answers))
+
+
+def time_runs(function, repeat, setup=None):
+    """Run function repeat times, calling setup (if given) before each run
+    without timing it, and return the duration of each run in seconds."""
+
+    durations = []
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = timer()
+        function()
+        durations.append(timer() - start)
+    return durations
+
+# ____________________________________________________________________________#
+
+
+def benchmark_size(path, work_path, repeat):
+    """Run every benchmark against a copy of the budget at path.
+
+    :param path: The generated budget, which is left unchanged.
+    :param work_path: Where to copy the budget, for benchmarks which change
+    it.
+    :param repeat: The number of times to run each benchmark.
+    :return: A dict of the durations of each run, keyed by benchmark name.
+    """
+
+    results = {}
+    copy_budget(path, work_path)
+
+    def open_budget():
+        # main() verifies the ledger and catches up the recurring
+        # transactions each time it opens a budget.
+        budget = bbp.Budget(work_path)
+        budget.verify_ledger()
+        bbp.RecurringTransaction.catch_up(budget)
+        budget.close()
+    results["open_budget"] = time_runs(open_budget, repeat)
+
+    budget = bbp.Budget(work_path)
+    try:
+        results["database_to_memory"] = time_runs(
+            lambda: list(bbp.Transaction.database_to_memory(budget)), repeat)
+
+        def lookup():
+            objects = bbp.Transaction.database_to_memory(budget)
+            return objects[len(objects) // 2]
+        results["database_to_memory_lookup"] = time_runs(lookup, repeat)
+
+        objects = bbp.Transaction.database_to_memory(budget)[:bbp.BATCH_SIZE]
+
+        def render():
+            with scripted_input([]):
+                bbp.Transaction.print_rows(
+                    objects, bbp.Transaction.display_col_names)
+        results["print_rows_{}".format(len(objects))] = time_runs(
+            render, repeat)
+
+        def new_transaction():
+            # Expense, amount, first account, first category, payee, date,
+            # no memo, then the closing 'Press Enter to continue'.
+            answers = ["2", "12.34", "1", "1", "Benchmark Payee",
+                       "06/15/2016", "", ""]
+            with scripted_input(answers):
+                bbp.Transaction.new_transaction(budget)
+        results["new_transaction"] = time_runs(new_transaction, repeat)
+
+        category = bbp.Category.find(budget, "Category 1")
+
+        def delete_category():
+            # The category has transactions, so it isn't deleted.
+            with scripted_input([""]):
+                category.delete_category()
+        results["delete_category_check"] = time_runs(delete_category, repeat)
+
+        account = bbp.Account.find(budget, "Account 1")
+        for name, instance, method in (
+                ("update_category_name", category,
+                 bbp.Category.update_category_name),
+                ("update_account_name", account,
+                 bbp.Account.update_account_name),
+                ):
+            names = [instance.name, instance.name + " Renamed"]
+
+            def rename():
+                # Alternate between the two names.
+                with scripted_input([names[1], ""]):
+                    method(instance)
+                names.reverse()
+            results[name] = time_runs(rename, repeat)
+
+        # A year's worth of weekly and monthly transactions, as if the
+        # budget hadn't been opened since.
+        last_date = FIRST_DATE + timedelta(DAY_COUNT)
+        first_due = last_date - timedelta(365)
+        for i in range(RECURRING_RULES):
+            bbp.RecurringTransaction.add_rule(
+                budget, account.name, category.name, bbp.Money(-100),
+                "Recurring {}".format(i), first_due,
+                "week" if i % 2 else "month", 1)
+
+        def reset_recurring():
+            # Delete the transactions made by the last run, and start the
+            # rules again.
+            with budget.bulk_change("WHERE payee LIKE 'Recurring %'") as cur:
+                cur.execute("DELETE FROM Transactions WHERE uid IN ("
+                            "SELECT uid FROM BulkSelection)")
+                cur.execute("UPDATE RecurringTransactions SET next_date=?",
+                            (first_due,))
+        results["recurring_catch_up"] = time_runs(
+            lambda: bbp.RecurringTransaction.catch_up(budget, last_date),
+            repeat, setup=reset_recurring)
+    finally:
+        budget.close()
+    return results
+
+# ____________________________________________________________________________#
+
+
+def summarize(durations):
+    """Return the best and median of a list of durations, with the list."""
+
+    ordered = sorted(durations)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        median = ordered[middle]
+    else:
+        median = (ordered[middle - 1] + ordered[middle]) / 2.0
+    return {"best": ordered[0], "median": median, "runs": durations}
+
+
+def compare(results, baseline):
+    """Print the best time of each benchmark next to its best time in an
+    earlier set of results."""
+
+    print("\n{:>10}  {:<28}{:>12}{:>12}{:>10}".format(
+        "size", "benchmark", "baseline", "now", "change"))
+    for size in sorted(results["results"], key=int):
+        for name in sorted(results["results"][size]):
+            now = results["results"][size][name]["best"]
+            try:
+                before = baseline["results"][size][name]["best"]
+            except KeyError:
+                continue
+            change = "" if before == 0 else "{:+.0%}".format(
+                now / before - 1)
+            print("{:>10}  {:<28}{:>11.4f}s{:>11.4f}s{:>10}".format(
+                size, name, before, now, change))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Time Ben's Budget Program against generated budgets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="the numbers of transactions to benchmark")
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument(
+        "--directory",
+        default=os.path.join(tempfile.gettempdir(), "bens_budget_benchmark"),
+        help="where to keep the generated budgets")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="the JSON file to write the results to")
+    parser.add_argument("--baseline",
+                        help="a JSON file from an earlier run to compare with")
+    options = parser.parse_args(args)
+    if options.accounts < 1 or options.categories < 1:
+        parser.error("there must be at least one account and category")
+    if options.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    baseline = None
+    if options.baseline is not None:
+        with open(options.baseline) as in_file:
+            baseline = json.load(in_file)
+
+    if not os.path.isdir(options.directory):
+        os.makedirs(options.directory)
+    results = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "accounts": options.accounts,
+        "categories": options.categories,
+        "repeat": options.repeat,
+        "results": {},
+        }
+    for size in options.sizes:
+        path = prepare_budget(options.directory, size, options.accounts,
+                              options.categories, options.seed)
+        print("Benchmarking {:,} transactions...".format(size))
+        durations = benchmark_size(
+            path, os.path.join(options.directory, "work.db"), options.repeat)
+        results["results"][str(size)] = dict(
+            (name, summarize(runs)) for name, runs in durations.items())
+        for name in sorted(durations):
+            print("    {:<28}{:.4f}s".format(name, min(durations[name])))
+
+    with open(options.output, "w") as out_file:
+        json.dump(results, out_file, indent=2, sort_keys=True)
+    print("Wrote the results to {}.".format(options.output))
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
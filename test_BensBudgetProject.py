@@ -0,0 +1,151 @@
+"""Tests for BensBudgetProject. Run them with 'python -m unittest' from
+this directory."""
+
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import unittest
+
+import BensBudgetProject as bbp
+from BensBudgetProject import Money, dt
+
+
+class TransferTests(unittest.TestCase):
+    """Transfers between accounts, as they're changed by the account-wide
+    operations."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.budget = bbp.Budget(os.path.join(self.directory, "Test.db"))
+        bbp.Account.add_account(self.budget, "Checking", Money(100000))
+        bbp.Account.add_account(self.budget, "Savings", Money(50000))
+        bbp.Category.add_category(self.budget, "Food", Money(20000))
+        bbp.Transaction.add_transfer(
+            self.budget, "Checking", "Savings", Money(1000), dt(2024, 3, 1))
+        bbp.Transaction.add_transfer(
+            self.budget, "Savings", "Checking", Money(300), dt(2024, 3, 2))
+
+    def tearDown(self):
+        self.budget.close()
+        shutil.rmtree(self.directory)
+
+    def account(self, name):
+        return bbp.Account.find(self.budget, name)
+
+    def assert_rollups_match(self):
+        """Check AccountMonths and CategoryMonths against the transactions
+        they total."""
+
+        for name, months_table in (("account", "AccountMonths"),
+                                   ("category", "CategoryMonths")):
+            expected = self.budget.fetch_rows(
+                "SELECT substr(date, 1, 7), COALESCE({}_id, 0), SUM(amount),"
+                " COUNT(*) FROM Transactions GROUP BY 1, 2"
+                " ORDER BY 1, 2".format(name))
+            stored = self.budget.fetch_rows(
+                "SELECT month, {}_id, total, count FROM {}"
+                " ORDER BY 1, 2".format(name, months_table))
+            self.assertEqual(stored, expected)
+        self.assertEqual(self.budget.verify_ledger(), [])
+
+    def test_merge_deletes_transfers_between_the_accounts(self):
+        self.account("Checking").merge_into("Savings")
+        self.assertEqual(self.budget.fetch_value(
+            "SELECT COUNT(*) FROM Transactions WHERE transfer_uid IS NOT"
+            " NULL"), 0)
+        self.assertEqual(self.account("Savings").balance, Money(150000))
+        self.assert_rollups_match()
+
+    def test_reassign_keeps_other_transfers(self):
+        bbp.Account.add_account(self.budget, "Cash", Money(0))
+        self.account("Checking").reassign_transactions("Cash")
+        self.assertEqual(sorted(self.budget.fetch_rows(
+            "SELECT account, payee FROM TransactionDetails WHERE"
+            " transfer_uid IS NOT NULL")), [
+                ("Cash", "Transfer From Savings"),
+                ("Cash", "Transfer To Savings"),
+                ("Savings", "Transfer From Cash"),
+                ("Savings", "Transfer To Cash"),
+                ])
+        self.assert_rollups_match()
+
+    def test_rename_renames_other_legs(self):
+        bbp.Transaction.add_transfer(
+            self.budget, "Checking", "Savings", Money(50), dt(2024, 3, 3))
+        # A payee which the user has changed is kept.
+        with self.budget.unit_of_work() as cur:
+            cur.execute("UPDATE Transactions SET payee='Rainy day fund'"
+                        " WHERE date='2024-03-03' AND amount>0")
+        self.account("Checking").rename("Main")
+        self.assertEqual(self.budget.fetch_rows(
+            "SELECT account, payee FROM TransactionDetails WHERE"
+            " transfer_uid IS NOT NULL ORDER BY uid"), [
+                ("Main", "Transfer To Savings"),
+                ("Savings", "Transfer From Main"),
+                ("Savings", "Transfer To Main"),
+                ("Main", "Transfer From Savings"),
+                ("Main", "Transfer To Savings"),
+                ("Savings", "Rainy day fund"),
+                ])
+
+
+class LedgerTests(unittest.TestCase):
+    """Budget.verify_ledger."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.budget = bbp.Budget(os.path.join(self.directory, "Test.db"))
+        bbp.Account.add_account(self.budget, "Checking", Money(100000))
+        bbp.Category.add_category(self.budget, "Food", Money(20000))
+        with self.budget.unit_of_work() as cur:
+            cur.execute(bbp.INSERT_TRANSACTION_SQL, (
+                "Checking", "Food", Money(-1250), "Grocer", dt(2024, 3, 5),
+                None))
+
+    def tearDown(self):
+        self.budget.close()
+        shutil.rmtree(self.directory)
+
+    def test_stale_monthly_rollups_are_found_and_repaired(self):
+        with self.budget.unit_of_work() as cur:
+            cur.execute("INSERT INTO CategoryMonths(month, category_id,"
+                        " total, count) VALUES('2024-03', 0, 0, 2)")
+            cur.execute("UPDATE AccountMonths SET total=total+1"
+                        " WHERE month='2024-03'")
+        problems = self.budget.verify_ledger()
+        self.assertEqual(len(problems), 2)
+        self.assertEqual(self.budget.verify_ledger(repair=True), problems)
+        self.assertEqual(self.budget.verify_ledger(), [])
+        for name, months_table in (("account", "AccountMonths"),
+                                   ("category", "CategoryMonths")):
+            self.assertEqual(
+                self.budget.fetch_rows(
+                    "SELECT month, {}_id, total, count FROM {}"
+                    " ORDER BY 1, 2".format(name, months_table)),
+                self.budget.fetch_rows(
+                    "SELECT substr(date, 1, 7), COALESCE({}_id, 0),"
+                    " SUM(amount), COUNT(*) FROM Transactions"
+                    " GROUP BY 1, 2 ORDER BY 1, 2".format(name)))
+
+
+class SQLiteVersionTests(unittest.TestCase):
+    """Budgets can't be opened with too old a version of SQLite."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.version_info = bbp.sqlite3.sqlite_version_info
+
+    def tearDown(self):
+        bbp.sqlite3.sqlite_version_info = self.version_info
+        shutil.rmtree(self.directory)
+
+    def test_old_sqlite_is_refused(self):
+        bbp.sqlite3.sqlite_version_info = (3, 23, 1)
+        path = os.path.join(self.directory, "Test.db")
+        self.assertRaises(bbp.BudgetError, bbp.Budget, path)
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()